@@ -0,0 +1,332 @@
+"""
+命令行批量转换入口（不依赖PyQt6，可在无显示环境的服务器或容器中运行）
+
+用法示例:
+    python -m src.cli decks/ -o output/ --columns 3 --portrait
+    python -m src.cli "decks/**/*.pptx" -o output/ --jobs 4 --summary summary.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 添加当前目录的父目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.version import VERSION as APP_VERSION
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG
+from src.utils.pdf_images import COMPRESSION_MODES, DEFAULT_IMAGE_CONFIG
+from src.utils.build_collapse import DEFAULT_BUILD_CONFIG
+from src.utils.font_registry import get_font_registry
+
+# 支持的演示文稿格式
+DECK_EXTENSIONS = (".pptx", ".ppt")
+
+
+def _glob_root(pattern):
+    """通配符中第一个含通配符的部分之前的目录"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def collect_decks(inputs):
+    """
+    将命令行给出的目录、通配符和文件展开为演示文稿列表
+
+    Args:
+        inputs (list): 目录、通配符或文件路径
+
+    Returns:
+        list: 去重并保持顺序的 (文件绝对路径, 相对子目录)；子目录是文件相对于所在的输入目录
+              或通配符起始目录的位置，指定输出目录时按它保留目录结构，单个文件为空字符串
+    """
+    decks = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            root_dir = item
+            matches = []
+            for root, _, files in os.walk(item):
+                matches.extend(os.path.join(root, name) for name in files)
+            matches.sort()
+        elif glob.has_magic(item):
+            root_dir = _glob_root(item)
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            root_dir = None
+            matches = [item]
+
+        for path in matches:
+            name = os.path.basename(path)
+            # 跳过PowerPoint打开文件时留下的锁文件
+            if name.startswith("~$") or not name.lower().endswith(DECK_EXTENSIONS):
+                continue
+            subdir = os.path.relpath(os.path.dirname(path), root_dir) if root_dir else ""
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                decks.append((path, "" if subdir == os.curdir else subdir))
+    return decks
+
+
+def build_layout_config(args):
+    """根据命令行参数生成布局配置"""
+    config = dict(DEFAULT_LAYOUT_CONFIG, **DEFAULT_IMAGE_CONFIG, **DEFAULT_BUILD_CONFIG)
+    config.update({
+        "columns": args.columns,
+        "is_landscape": not args.portrait,
+        "h_spacing": args.h_spacing,
+        "v_spacing": args.v_spacing,
+        "show_ppt_numbers": not args.no_slide_numbers,
+        "show_page_numbers": not args.no_page_numbers,
+        "vector_mode": args.vector,
+        "print_dpi": args.print_dpi,
+        "image_compression": args.image_compression,
+        "jpeg_quality": args.jpeg_quality,
+        "collapse_builds": args.collapse_builds,
+        "build_threshold": args.build_threshold,
+        "target_size_mb": args.target_size_mb,
+        "sharded_export": args.sharded,
+    })
+    for side in ("left", "right", "top", "bottom"):
+        value = getattr(args, f"margin_{side}")
+        config[f"margin_{side}"] = args.margin if value is None else value
+    return config
+
+
+def output_path_for(deck_path, output_dir, subdir=""):
+    """
+    输出PDF路径：与演示文稿同名，放在输出目录下保留输入的子目录结构（未指定输出目录时与源文件同目录）
+    """
+    base = os.path.splitext(os.path.basename(deck_path))[0] + ".pdf"
+    if not output_dir:
+        return os.path.join(os.path.dirname(deck_path), base)
+    return os.path.join(output_dir, subdir, base)
+
+
+def assign_output_paths(decks, output_dir):
+    """
+    为每个演示文稿分配输出路径，并找出输出路径重复的文件（如同名的.ppt和.pptx）
+
+    Args:
+        decks (list): collect_decks 的结果
+        output_dir (str): 输出目录
+
+    Returns:
+        tuple: ({文件路径: 输出路径}, {文件路径: 先占用该输出路径的文件路径})
+    """
+    outputs = {}
+    conflicts = {}
+    owners = {}
+    for deck, subdir in decks:
+        output_path = output_path_for(deck, output_dir, subdir)
+        outputs[deck] = output_path
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in owners:
+            conflicts[deck] = owners[key]
+        else:
+            owners[key] = deck
+    return outputs, conflicts
+
+
+def new_result(deck_path, output_path, error=None):
+    """单个文件的处理结果，初始状态为失败"""
+    return {"input": deck_path, "output": output_path, "status": "failed",
+            "slides": 0, "original_slides": 0, "pages": 0, "mode": None, "seconds": 0.0, "error": error,
+            "size": None}
+
+
+def process_deck(deck_path, output_path, config, overwrite=False, encode_workers=None):
+    """
+    转换单个演示文稿并导出排版后的PDF
+
+    Args:
+        deck_path (str): 演示文稿路径
+        output_path (str): 输出PDF路径
+        config (dict): 布局配置
+        overwrite (bool): 输出文件已存在时是否覆盖
+        encode_workers (int, optional): 导出时并行编码图像（或分段生成）的进程数
+
+    Returns:
+        dict: 该文件的处理结果
+    """
+    from src.utils.ppt_processor import PPTProcessor
+
+    result = new_result(deck_path, output_path)
+    if os.path.exists(output_path) and not overwrite:
+        result["status"] = "skipped"
+        result["error"] = "输出文件已存在"
+        return result
+
+    started = time.perf_counter()
+    processor = PPTProcessor()
+    processor.encode_workers = encode_workers
+    try:
+        slide_images = processor.convert_ppt_to_images(deck_path)
+        if not slide_images:
+            result["error"] = "转换失败或没有幻灯片"
+            return result
+        result["original_slides"] = len(slide_images)
+        if config.get("collapse_builds"):
+            slide_images = processor.collapse_builds(slide_images, config["build_threshold"])
+
+        layout_result = LayoutCalculator().plan(slide_images, config)
+        result["slides"] = len(slide_images)
+        result["pages"] = layout_result["pages_needed"]
+
+        # 与图形界面一致：矢量直通模式需要中间PDF，否则回退到图像模式
+        source_pdf_path = processor.source_pdf_path
+        if config.get("vector_mode") and source_pdf_path and os.path.exists(source_pdf_path):
+            result["mode"] = "vector"
+            success = processor.generate_vector_pdf(source_pdf_path, output_path, layout_result, config,
+                                                    page_indices=getattr(slide_images, "indices", None))
+        elif config.get("target_size_mb"):
+            result["mode"] = "raster"
+            success = processor.generate_pdf_within_budget(slide_images, output_path, layout_result, config,
+                                                           config["target_size_mb"])
+            result["size"] = processor.last_size_report
+        else:
+            result["mode"] = "raster"
+            success = processor.generate_pdf(slide_images, output_path, layout_result, config)
+
+        if success:
+            result["status"] = "ok"
+        else:
+            result["error"] = "生成PDF失败"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        processor.cleanup_temp_files()
+    return result
+
+
+def parse_args(argv=None):
+    defaults = dict(DEFAULT_LAYOUT_CONFIG, **DEFAULT_IMAGE_CONFIG, **DEFAULT_BUILD_CONFIG)
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="批量将PPT排版导出为PDF（无图形界面）",
+    )
+    parser.add_argument("inputs", nargs="+", help="演示文稿文件、目录或通配符（如 \"decks/**/*.pptx\"）")
+    parser.add_argument("-o", "--output-dir", help="输出目录，默认与源文件同目录")
+    parser.add_argument("-j", "--jobs", type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help="同时处理的文件数")
+    parser.add_argument("--summary", help="将JSON格式的处理结果另存到该文件")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的输出文件")
+
+    layout = parser.add_argument_group("布局选项")
+    layout.add_argument("--columns", type=int, default=defaults["columns"], help="每行幻灯片数")
+    layout.add_argument("--portrait", action="store_true", help="使用纵向A4（默认横向）")
+    layout.add_argument("--margin", type=float, default=defaults["margin_left"], help="四边页边距（mm）")
+    for side, label in (("left", "左"), ("right", "右"), ("top", "上"), ("bottom", "下")):
+        layout.add_argument(f"--margin-{side}", type=float, help=f"{label}边距（mm），覆盖--margin")
+    layout.add_argument("--h-spacing", type=float, default=defaults["h_spacing"], help="水平间距（mm）")
+    layout.add_argument("--v-spacing", type=float, default=defaults["v_spacing"], help="垂直间距（mm）")
+    layout.add_argument("--no-slide-numbers", action="store_true", help="不显示幻灯片编号")
+    layout.add_argument("--no-page-numbers", action="store_true", help="不显示页码")
+    layout.add_argument("--vector", action="store_true", help="矢量直通模式（需要LibreOffice）")
+    layout.add_argument("--print-dpi", type=int, default=defaults["print_dpi"], help="图像模式的打印分辨率")
+    layout.add_argument("--image-compression", choices=COMPRESSION_MODES, default=defaults["image_compression"],
+                        help="图像压缩方式：auto按内容选择，lossless全部无损，jpeg全部有损")
+    layout.add_argument("--jpeg-quality", type=int, default=defaults["jpeg_quality"], help="JPEG质量（1-95）")
+    layout.add_argument("--target-size-mb", type=float, default=defaults["target_size_mb"],
+                        help="目标文件大小（MB），自动选择压缩方式、质量和分辨率；0表示不限制")
+    layout.add_argument("--sharded", action="store_true",
+                        help="分段并行生成PDF，最后拼接为一个文件（幻灯片很多时更快）")
+    layout.add_argument("--collapse-builds", action="store_true",
+                        help="合并连续的动画分步幻灯片，每组只保留最后一步")
+    layout.add_argument("--build-threshold", type=float, default=defaults["build_threshold"],
+                        help="相邻幻灯片视为同一组动画步骤的最大差异比例（0-1）")
+
+    args = parser.parse_args(argv)
+    if args.columns < 1:
+        parser.error("--columns 必须大于0")
+    if args.jobs < 1:
+        parser.error("--jobs 必须大于0")
+    if not 1 <= args.jpeg_quality <= 95:
+        parser.error("--jpeg-quality 必须在1到95之间")
+    if args.target_size_mb < 0:
+        parser.error("--target-size-mb 不能为负数")
+    if not 0 <= args.build_threshold <= 1:
+        parser.error("--build-threshold 必须在0到1之间")
+    return args
+
+
+def main(argv=None):
+    """
+    Returns:
+        int: 进程退出码，全部成功为0，有失败为1，没有找到文件为2
+    """
+    args = parse_args(argv)
+    decks = collect_decks(args.inputs)
+    if not decks:
+        print("没有找到PPT文件", file=sys.stderr)
+        return 2
+
+    config = build_layout_config(args)
+    # 转换期间在后台解析中文字体，所有文件共用
+    get_font_registry().preload()
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # 多个文件同时处理时平分CPU核数，避免编码进程过多
+    encode_workers = max(1, (os.cpu_count() or 1) // min(args.jobs, len(decks)))
+
+    started = time.perf_counter()
+    results = []
+    outputs, conflicts = assign_output_paths(decks, args.output_dir)
+    # 处理过程中的日志输出到stderr，stdout只保留最终的JSON结果
+    with contextlib.redirect_stdout(sys.stderr):
+        # 输出路径与前面的文件相同的不处理，避免两个线程同时写同一个文件
+        for deck, owner in conflicts.items():
+            print(f"输出路径重复，跳过: {deck}（与 {owner} 相同）")
+            results.append(new_result(deck, outputs[deck], f"输出路径与 {owner} 相同"))
+
+        pending = [deck for deck, _ in decks if deck not in conflicts]
+        for deck in pending:
+            os.makedirs(os.path.dirname(outputs[deck]), exist_ok=True)
+
+        # 转换和栅格化都在LibreOffice/poppler子进程中进行，线程只负责调度和等待
+        with ThreadPoolExecutor(max_workers=min(args.jobs, max(1, len(pending)))) as executor:
+            futures = {
+                executor.submit(process_deck, deck, outputs[deck], config, args.overwrite, encode_workers): deck
+                for deck in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                print(f"[{done}/{len(pending)}] {result['status']}: {result['input']}")
+
+    # 按输入顺序输出结果
+    order = {deck: i for i, (deck, _) in enumerate(decks)}
+    results.sort(key=lambda r: order[r["input"]])
+    summary = {
+        "version": APP_VERSION,
+        "total": len(results),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "skipped": sum(r["status"] == "skipped" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "seconds": round(time.perf_counter() - started, 3),
+        "layout": config,
+        "results": results,
+    }
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    print(text)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
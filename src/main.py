@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # 添加当前目录的父目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -33,4 +34,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 打包后的程序启动导出用的工作进程时需要
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
@@ -8,13 +8,20 @@ from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
                            QScrollArea, QGroupBox, QDoubleSpinBox, QMessageBox,
                            QSizePolicy, QFrame, QGridLayout,
                            QStatusBar, QStackedWidget, QRadioButton, QButtonGroup,
-                           QCheckBox, QTextEdit, QApplication)
+                           QCheckBox, QTextEdit, QApplication, QComboBox)
 from PyQt6.QtCore import Qt, QRectF, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup, QRect, QSettings, QUrl, QTimer
-from PyQt6.QtGui import QPixmap, QPainter, QPen, QColor, QFont, QIcon, QAction, QDesktopServices
+from PyQt6.QtGui import QPixmap, QImage, QPainter, QPen, QColor, QFont, QIcon, QAction, QDesktopServices
 from PyQt6.QtSvg import QSvgRenderer
 
 from src.utils.ppt_processor import PPTProcessor
-from src.utils.layout_calculator import LayoutCalculator
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG
+from src.utils.pdf_images import DEFAULT_IMAGE_CONFIG
+from src.utils.build_collapse import DEFAULT_BUILD_CONFIG
+from src.utils.pdf_rasterizer import iter_slide_images
+from src.utils.placement import cell_origins, sheet_placements
+from src.utils.layout_optimizer import (optimize_layout, describe_candidate,
+                                        OBJECTIVE_MIN_SHEETS, OBJECTIVE_MAX_AREA)
+from src.utils.font_registry import get_font_registry
 from src.ui.styles import STYLESHEET, COLORS, WELCOME_TEXT, STEPS_GUIDE
 from src.ui.loading_overlay import LoadingOverlay
 from src.ui.worker import Worker
@@ -22,6 +29,30 @@ from src.ui.spinner_widget import SpinnerWidget
 
 GITHUB_REPO = "monthwolf/ppt-layout-tool" # 替换为自己GitHub仓库
 
+PREVIEW_DPI = 50  # 预览缩略图的栅格化分辨率
+
+
+def load_preview_images(slide_images, count, progress_callback=None):
+    """
+    在工作线程中取出前count张幻灯片并转换为QImage（QPixmap只能在界面线程中创建）
+
+    Args:
+        slide_images: 图像列表或惰性幻灯片序列
+        count (int): 张数
+        progress_callback (callable, optional): 进度回调函数
+
+    Returns:
+        list: QImage列表
+    """
+    images = []
+    for image in iter_slide_images(slide_images, 0, count, dpi=PREVIEW_DPI, progress_callback=progress_callback):
+        rgb = image.convert("RGB")
+        data = rgb.tobytes("raw", "RGB")
+        qimage = QImage(data, rgb.width, rgb.height, rgb.width * 3, QImage.Format.Format_RGB888)
+        # QImage不持有data的所有权，复制一份
+        images.append(qimage.copy())
+    return images
+
 def get_resource_path(relative_path):
     """一个健壮的函数，用于在开发和打包环境中都能找到资源文件。"""
     try:
@@ -212,13 +243,16 @@ class MainWindow(QMainWindow):
         
         self.content_pdf_path = None
         self.current_ppt_path = None
+        # 转换得到的全部幻灯片；合并动画步骤后 slide_images 是它的子集视图
+        self.source_slide_images = []
         self.slide_images = []
-        self.layout_config = {
-            "columns": 2, "page_width": 210, "page_height": 297,
-            "margin_left": 10, "margin_top": 10, "margin_right": 10, "margin_bottom": 10,
-            "h_spacing": 5, "v_spacing": 5, "is_landscape": True,
-            "show_ppt_numbers": True, "show_page_numbers": True,
-        }
+        self.layout_config = dict(DEFAULT_LAYOUT_CONFIG, **DEFAULT_IMAGE_CONFIG, **DEFAULT_BUILD_CONFIG)
+        # 已启动的工作线程。回调可能在线程的 run() 返回前触发并启动下一个任务，
+        # 线程结束前必须一直持有引用，否则QThread会在运行中被销毁
+        self._workers = []
+        # 预览的序号，用于丢弃过期的缩略图结果；进入第三步时由预览负责隐藏加载覆盖层
+        self._preview_generation = 0
+        self._preview_owns_overlay = False
         
         self.setStyleSheet(STYLESHEET)
         
@@ -237,6 +271,9 @@ class MainWindow(QMainWindow):
 
     def initial_checks(self):
         """执行启动时的检查，如更新检查和首次启动欢迎"""
+        # 在后台解析中文字体，首次导出时不必等待
+        get_font_registry().preload()
+
         # 启动时静默检查更新
         self.check_for_updates(silent=True)
 
@@ -506,6 +543,56 @@ class MainWindow(QMainWindow):
         self.show_page_numbers_check.stateChanged.connect(self.update_page_numbers)
         settings_layout.addWidget(self.show_page_numbers_check, 4, 3)
         
+        # 添加矢量直通模式选项
+        settings_layout.addWidget(QLabel("导出模式:"), 5, 0)
+        
+        self.vector_mode_check = QCheckBox("矢量直通（不栅格化幻灯片，仅限PPTX）")
+        self.vector_mode_check.setChecked(self.layout_config["vector_mode"])
+        self.vector_mode_check.stateChanged.connect(self.update_vector_mode)
+        settings_layout.addWidget(self.vector_mode_check, 5, 1, 1, 3)
+        
+        # 打印分辨率设置，决定幻灯片栅格化的像素尺寸
+        settings_layout.addWidget(QLabel("打印分辨率 (dpi):"), 6, 0)
+        
+        self.print_dpi_spin = QSpinBox()
+        self.print_dpi_spin.setRange(72, 600)
+        self.print_dpi_spin.setSingleStep(50)
+        self.print_dpi_spin.setValue(self.layout_config["print_dpi"])
+        self.print_dpi_spin.valueChanged.connect(self.update_print_dpi)
+        settings_layout.addWidget(self.print_dpi_spin, 6, 1)
+        
+        # 合并动画分步幻灯片
+        settings_layout.addWidget(QLabel("动画步骤:"), 7, 0)
+        
+        self.collapse_builds_check = QCheckBox("合并连续的动画分步幻灯片，每组只保留最后一步")
+        self.collapse_builds_check.setChecked(self.layout_config["collapse_builds"])
+        self.collapse_builds_check.stateChanged.connect(self.update_collapse_builds)
+        settings_layout.addWidget(self.collapse_builds_check, 7, 1, 1, 3)
+        
+        # 自动搜索列数、方向和间距
+        settings_layout.addWidget(QLabel("自动布局:"), 8, 0)
+        
+        self.optimize_objective_combo = QComboBox()
+        self.optimize_objective_combo.addItem("纸张最少（幻灯片最小宽度）", OBJECTIVE_MIN_SHEETS)
+        self.optimize_objective_combo.addItem("幻灯片最大（纸张数上限）", OBJECTIVE_MAX_AREA)
+        self.optimize_objective_combo.currentIndexChanged.connect(self.update_optimize_objective)
+        settings_layout.addWidget(self.optimize_objective_combo, 8, 1)
+        
+        self.optimize_value_spin = QSpinBox()
+        self.optimize_value_spin.setRange(1, 999)
+        settings_layout.addWidget(self.optimize_value_spin, 8, 2)
+        
+        self.optimize_btn = QPushButton("搜索布局")
+        self.optimize_btn.clicked.connect(self.optimize_layout)
+        settings_layout.addWidget(self.optimize_btn, 8, 3)
+        
+        self.optimize_candidates_combo = QComboBox()
+        self.optimize_candidates_combo.setEnabled(False)
+        self.optimize_candidates_combo.activated.connect(self.apply_layout_candidate)
+        settings_layout.addWidget(self.optimize_candidates_combo, 9, 1, 1, 3)
+        self.layout_candidates = []
+        self.update_optimize_objective()
+        
         layout.addWidget(settings_group)
         
         # 提示信息
@@ -588,6 +675,31 @@ class MainWindow(QMainWindow):
         export_hint.setAlignment(Qt.AlignmentFlag.AlignCenter)
         export_layout.addWidget(export_hint)
         
+        # 目标文件大小（如学习平台的上传限制），0表示不限制
+        size_layout = QHBoxLayout()
+        size_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        size_layout.addWidget(QLabel("目标文件大小 (MB):"))
+        
+        self.target_size_spin = QDoubleSpinBox()
+        self.target_size_spin.setRange(0, 2000)
+        self.target_size_spin.setSingleStep(5)
+        self.target_size_spin.setSpecialValueText("不限制")
+        self.target_size_spin.setValue(self.layout_config["target_size_mb"])
+        self.target_size_spin.valueChanged.connect(self.update_target_size)
+        size_layout.addWidget(self.target_size_spin)
+        
+        export_layout.addLayout(size_layout)
+        
+        # 分段并行生成：幻灯片很多时按核数分段生成后拼接
+        sharded_layout = QHBoxLayout()
+        sharded_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.sharded_export_check = QCheckBox("多进程分段生成（幻灯片很多时更快）")
+        self.sharded_export_check.setChecked(self.layout_config["sharded_export"])
+        self.sharded_export_check.stateChanged.connect(self.update_sharded_export)
+        sharded_layout.addWidget(self.sharded_export_check)
+        
+        export_layout.addLayout(sharded_layout)
+        
         # 导出按钮
         export_btn_layout = QHBoxLayout()
         export_btn_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -745,13 +857,14 @@ class MainWindow(QMainWindow):
             self.next_btn.setEnabled(not is_last_regular_step)
 
     def _generate_preview_with_loading(self):
-        """带加载覆盖层的预览生成"""
+        """带加载覆盖层的预览生成，覆盖层在缩略图生成完成后隐藏"""
+        self._preview_owns_overlay = True
+        started = False
         try:
-            # 刷新预览
-            self.refresh_preview()
+            started = self.refresh_preview()
         finally:
-            # 无论成功与否，都隐藏加载覆盖层
-            self.loading_overlay.hide()
+            if not started:
+                self._finish_preview_loading()
 
     def go_to_prev_step(self):
         current_index = self.stacked_widget.currentIndex()
@@ -785,14 +898,7 @@ class MainWindow(QMainWindow):
             self.loading_overlay.set_progress(0, 100, "准备处理PPT文件...")
 
             # 关闭之前的图像以释放资源
-            if self.slide_images:
-                for img in self.slide_images:
-                    try:
-                        if hasattr(img, 'close'):
-                            img.close()
-                    except:
-                        pass
-                self.slide_images = []
+            self._release_slide_images()
 
             # 定义进度回调函数
             def progress_callback(current, total, message):
@@ -811,7 +917,33 @@ class MainWindow(QMainWindow):
             # 连接进度信号
             self.worker.progress.connect(self._update_progress)
             
-            self.worker.start()
+            self._start_worker(self.worker)
+
+    def _start_worker(self, worker):
+        """启动工作线程，并在它结束前保留引用"""
+        self._workers = [w for w in self._workers if w.isRunning()]
+        self._workers.append(worker)
+        worker.start()
+
+    def _release_slide_images(self):
+        """关闭当前持有的幻灯片图像并清空列表"""
+        # 合并动画步骤得到的子集只是视图，释放的是转换得到的全部幻灯片
+        source = self.source_slide_images
+        self.source_slide_images = []
+        self.slide_images = []
+        if not source:
+            return
+        
+        # 惰性幻灯片流和集合自己负责释放，遍历它们反而会触发栅格化或解码
+        if hasattr(source, "close"):
+            source.close()
+        else:
+            for img in source:
+                try:
+                    if hasattr(img, 'close'):
+                        img.close()
+                except:
+                    pass
 
     def _update_progress(self, current, total, message):
         """更新加载覆盖层的进度"""
@@ -820,6 +952,7 @@ class MainWindow(QMainWindow):
     def _on_ppt_conversion_finished(self, slide_images):
         """PPT转换完成后的回调"""
         self.loading_overlay.hide()
+        self.source_slide_images = slide_images
         self.slide_images = slide_images
         
         if self.slide_images:
@@ -829,11 +962,55 @@ class MainWindow(QMainWindow):
             self.next_btn.setEnabled(True)
             if self.current_ppt_path:
                 self.status_bar.showMessage(f"文件已加载: {os.path.basename(self.current_ppt_path)}")
+            if self.layout_config["collapse_builds"]:
+                self._apply_build_collapse()
         else:
             self.file_preview.setText(f"<p style='color:{COLORS['error']};'>文件处理失败</p><p>请选择有效的PPT文件或检查依赖项</p>")
             self.next_btn.setEnabled(False)
             self.status_bar.showMessage("文件处理失败")
 
+    def _apply_build_collapse(self):
+        """按设置合并动画分步幻灯片，更新当前使用的幻灯片序列"""
+        if not self.source_slide_images:
+            return
+        if not self.layout_config["collapse_builds"]:
+            self.slide_images = self.source_slide_images
+            self.status_bar.showMessage(f"已恢复全部 {len(self.slide_images)} 张幻灯片")
+            self._on_slide_images_changed()
+            return
+        
+        self.loading_overlay.set_text("正在合并动画步骤...")
+        self.loading_overlay.show()
+        self.loading_overlay.set_progress(0, 100, "正在比较幻灯片...")
+        
+        self.worker = Worker(
+            self.ppt_processor.collapse_builds,
+            self.source_slide_images,
+            self.layout_config["build_threshold"],
+            progress_callback=self._update_progress
+        )
+        self.worker.finished.connect(self._on_build_collapse_finished)
+        self.worker.error.connect(self._on_task_error)
+        self.worker.progress.connect(self._update_progress)
+        self._start_worker(self.worker)
+
+    def _on_build_collapse_finished(self, collapsed):
+        """合并动画步骤完成后的回调"""
+        self.loading_overlay.hide()
+        self.slide_images = collapsed
+        self.status_bar.showMessage(
+            f"已合并动画步骤: 保留 {len(collapsed)}/{len(self.source_slide_images)} 张幻灯片"
+        )
+        self._on_slide_images_changed()
+
+    def _on_slide_images_changed(self):
+        """当前使用的幻灯片序列变化后，重新生成已经显示过的预览和导出摘要"""
+        current_index = self.stacked_widget.currentIndex()
+        if current_index >= 2:
+            self.refresh_preview()
+        if current_index == 3:
+            self._update_export_summary()
+
     def _on_task_error(self, exception):
         """任务错误处理"""
         self.loading_overlay.hide()
@@ -895,32 +1072,121 @@ class MainWindow(QMainWindow):
         else:
             self.status_bar.showMessage("已禁用所有页码显示")
     
-    def refresh_preview(self):
-        """刷新预览"""
+    def update_vector_mode(self):
+        """更新矢量直通模式设置"""
+        self.layout_config["vector_mode"] = self.vector_mode_check.isChecked()
+        if self.layout_config["vector_mode"]:
+            self.status_bar.showMessage("已启用矢量直通模式，导出时将直接排版幻灯片PDF页面")
+        else:
+            self.status_bar.showMessage("已禁用矢量直通模式")
+    
+    def update_collapse_builds(self):
+        """更新合并动画步骤设置"""
+        self.layout_config["collapse_builds"] = self.collapse_builds_check.isChecked()
+        self._apply_build_collapse()
+    
+    def update_target_size(self):
+        """更新目标文件大小设置"""
+        self.layout_config["target_size_mb"] = self.target_size_spin.value()
+        if self.layout_config["target_size_mb"]:
+            self.status_bar.showMessage(
+                f"导出时将自动调整图像压缩，使文件不超过 {self.layout_config['target_size_mb']:.1f} MB"
+            )
+        else:
+            self.status_bar.showMessage("不限制导出文件大小")
+    
+    def update_sharded_export(self):
+        """更新分段并行生成设置"""
+        self.layout_config["sharded_export"] = self.sharded_export_check.isChecked()
+        if self.layout_config["sharded_export"]:
+            self.status_bar.showMessage("导出时将按CPU核数分段并行生成PDF，最后拼接为一个文件")
+        else:
+            self.status_bar.showMessage("已禁用分段并行生成")
+    
+    def update_optimize_objective(self):
+        """切换自动布局的优化目标，输入框随之表示最小宽度或纸张数上限"""
+        if self.optimize_objective_combo.currentData() == OBJECTIVE_MIN_SHEETS:
+            self.optimize_value_spin.setSuffix(" mm")
+            self.optimize_value_spin.setRange(1, 280)
+            self.optimize_value_spin.setValue(60)
+        else:
+            self.optimize_value_spin.setSuffix(" 张")
+            self.optimize_value_spin.setRange(1, 999)
+            self.optimize_value_spin.setValue(10)
+    
+    def optimize_layout(self):
+        """搜索列数、方向和间距的组合，列出最优的几个候选布局"""
         if not self.slide_images:
+            QMessageBox.warning(self, "警告", "请先选择PPT文件")
             return
         
+        objective = self.optimize_objective_combo.currentData()
+        if objective == OBJECTIVE_MIN_SHEETS:
+            options = {"min_slide_width": self.optimize_value_spin.value()}
+        else:
+            options = {"sheet_budget": self.optimize_value_spin.value()}
+        options["max_columns"] = self.columns_spin.maximum()
+        self.layout_candidates = optimize_layout(self.slide_images, self.layout_config,
+                                                 objective=objective, **options)
+        
+        self.optimize_candidates_combo.clear()
+        for candidate in self.layout_candidates:
+            self.optimize_candidates_combo.addItem(describe_candidate(candidate))
+        self.optimize_candidates_combo.setEnabled(bool(self.layout_candidates))
+        
+        if self.layout_candidates:
+            self.apply_layout_candidate(0)
+            self.status_bar.showMessage(f"找到 {len(self.layout_candidates)} 个候选布局，已应用最优布局")
+        else:
+            self.status_bar.showMessage("没有满足条件的布局，请放宽最小宽度或纸张数上限")
+    
+    def apply_layout_candidate(self, index):
+        """把候选布局的列数、方向和间距填入布局设置"""
+        if not 0 <= index < len(self.layout_candidates):
+            return
+        layout = self.layout_candidates[index]["config"]
+        # 输入框的信号会同步更新布局配置；方向单选框只响应点击，需要手动同步
+        self.columns_spin.setValue(layout["columns"])
+        self.h_spacing_spin.setValue(layout["h_spacing"])
+        self.v_spacing_spin.setValue(layout["v_spacing"])
+        self.landscape_radio.setChecked(layout["is_landscape"])
+        self.portrait_radio.setChecked(not layout["is_landscape"])
+        self.update_orientation()
+    
+    def update_print_dpi(self):
+        """更新打印分辨率设置"""
+        self.layout_config["print_dpi"] = self.print_dpi_spin.value()
+        self.status_bar.showMessage(f"打印分辨率: {self.layout_config['print_dpi']} dpi")
+    
+    def refresh_preview(self):
+        """
+        刷新预览：布局信息和格子立即显示，第一页纸的缩略图在工作线程中生成后再补上
+
+        Returns:
+            bool: 是否启动了缩略图生成任务
+        """
+        if not self.slide_images:
+            return False
+        
         # 更新状态栏
         self.status_bar.showMessage("正在生成预览...")
         
-        # 清除当前预览
-        for i in reversed(range(self.preview_layout.count())):
-            item = self.preview_layout.itemAt(i)
-            if item.widget():
-                item.widget().deleteLater()
-            self.preview_layout.removeItem(item)
-        
-        # 计算布局
-        layout_result = self.layout_calculator.calculate_layout(
-            self.slide_images, self.layout_config
-        )
+        # 获取布局方案，与导出共用
+        layout_result = self.layout_calculator.plan(self.slide_images, self.layout_config)
         
         # 显示计算结果
-        orientation_text = "横向" if self.layout_config["is_landscape"] else "纵向"
+        orientation_text = "横向" if layout_result["is_landscape"] else "纵向"
         result_text = f"<p>页面方向: <b>{orientation_text}A4</b></p>"
         result_text += f"<p>布局结果: 每页 <b>{layout_result['rows']}</b> 行 × <b>{layout_result['columns']}</b> 列</p>"
         result_text += f"<p>每个PPT尺寸: <b>{layout_result['item_width']:.1f}</b> × <b>{layout_result['item_height']:.1f}</b> mm</p>"
+        pixel_width, pixel_height = LayoutCalculator.required_pixel_size(layout_result, self.layout_config["print_dpi"])
+        result_text += f"<p>栅格尺寸: <b>{pixel_width}</b> × <b>{pixel_height}</b> 像素 ({self.layout_config['print_dpi']} dpi)</p>"
         result_text += f"<p>预计页数: <b>{layout_result['pages_needed']}</b> 页</p>"
+        placements = layout_result["placements"]
+        letterboxed = int(((placements["w"] < layout_result["item_width"] - 0.01)
+                           | (placements["h"] < layout_result["item_height"] - 0.01)).sum())
+        if letterboxed:
+            result_text += f"<p>宽高比不同的幻灯片: <b>{letterboxed}</b> 张（按原比例居中）</p>"
         
         # 添加页码设置信息
         page_numbers_text = []
@@ -936,12 +1202,70 @@ class MainWindow(QMainWindow):
             
         self.preview_info.setText(result_text)
         
+        self._draw_preview(layout_result, [])
+        
+        # 布局已经确定，不必等缩略图即可进入下一步
+        self.next_btn.setEnabled(True)
+        
+        # 从幻灯片流中只取第一页纸需要的缩略图；较早的任务完成时预览可能已经过期，按序号丢弃
+        self._preview_generation += 1
+        generation = self._preview_generation
+        items_per_page = layout_result["rows"] * layout_result["columns"]
+        worker = Worker(load_preview_images, self.slide_images, items_per_page,
+                        progress_callback=self._update_preview_progress)
+        worker.finished.connect(lambda images: self._on_preview_images_ready(generation, layout_result, images))
+        worker.error.connect(lambda e: self._on_preview_images_failed(generation, e))
+        worker.progress.connect(self._update_preview_progress)
+        self._start_worker(worker)
+        return True
+    
+    def _update_preview_progress(self, current, total, message):
+        """缩略图生成进度，只在加载覆盖层显示时更新"""
+        if self.loading_overlay.isVisible():
+            self.loading_overlay.set_progress(current, total, message)
+    
+    def _on_preview_images_ready(self, generation, layout_result, images):
+        """缩略图生成完成后重新绘制预览"""
+        if generation != self._preview_generation:
+            return
+        self._draw_preview(layout_result, [QPixmap.fromImage(image) for image in images])
+        self.status_bar.showMessage("预览已生成")
+        self._finish_preview_loading()
+    
+    def _on_preview_images_failed(self, generation, exception):
+        """缩略图生成失败时保留只有格子的预览"""
+        print(f"生成预览缩略图失败: {exception}")
+        if generation == self._preview_generation:
+            self.status_bar.showMessage("预览缩略图生成失败")
+            self._finish_preview_loading()
+    
+    def _finish_preview_loading(self):
+        """预览由进入第三步触发时，缩略图完成后隐藏加载覆盖层"""
+        if self._preview_owns_overlay:
+            self._preview_owns_overlay = False
+            self.loading_overlay.hide()
+    
+    def _draw_preview(self, layout_result, thumbnails):
+        """
+        绘制第一页纸的预览
+        
+        Args:
+            layout_result (LayoutPlan): 布局方案
+            thumbnails (list): 第一页纸上各幻灯片的QPixmap，缺少的位置显示幻灯片编号
+        """
+        # 清除当前预览
+        for i in reversed(range(self.preview_layout.count())):
+            item = self.preview_layout.itemAt(i)
+            if item.widget():
+                item.widget().deleteLater()
+            self.preview_layout.removeItem(item)
+        
         # 创建预览
         preview_label = QLabel()
         preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # 根据方向设置画布大小
-        if self.layout_config["is_landscape"]:
+        if layout_result["is_landscape"]:
             pixmap = QPixmap(900, 650)  # 横向A4比例
         else:
             pixmap = QPixmap(650, 900)  # 纵向A4比例
@@ -950,21 +1274,16 @@ class MainWindow(QMainWindow):
         
         painter = QPainter(pixmap)
         
-        # 计算缩放因子，使A4页面适合画布大小
-        if self.layout_config["is_landscape"]:
-            scale_factor = pixmap.width() / 297  # A4横向宽度为297mm
-        else:
-            scale_factor = pixmap.width() / 210  # A4纵向宽度为210mm
+        # 根据方向获取页面尺寸，计算缩放因子，使A4页面适合画布大小
+        page_width = layout_result["page_width"]
+        page_height = layout_result["page_height"]
+        scale_factor = pixmap.width() / page_width
         
         # 设置画笔
         pen = QPen(QColor(COLORS['divider']))
         pen.setWidth(1)
         painter.setPen(pen)
         
-        # 根据方向获取页面尺寸
-        page_width = 297 if self.layout_config["is_landscape"] else 210
-        page_height = 210 if self.layout_config["is_landscape"] else 297
-        
         # 绘制A4页面边框
         page_width_px = int(page_width * scale_factor)
         page_height_px = int(page_height * scale_factor)
@@ -973,48 +1292,43 @@ class MainWindow(QMainWindow):
         painter.drawRect(0, 0, page_width_px, page_height_px)
         
         # 绘制PPT预览
-        left_margin = self.layout_config["margin_left"] * scale_factor
-        top_margin = self.layout_config["margin_top"] * scale_factor
-        right_margin = self.layout_config["margin_right"] * scale_factor
-        bottom_margin = self.layout_config["margin_bottom"] * scale_factor
+        right_margin = layout_result.config["margin_right"] * scale_factor
+        bottom_margin = layout_result.config["margin_bottom"] * scale_factor
         item_width = layout_result["item_width"] * scale_factor
         item_height = layout_result["item_height"] * scale_factor
-        h_spacing = self.layout_config["h_spacing"] * scale_factor
-        v_spacing = self.layout_config["v_spacing"] * scale_factor
         
         # 设置字体
         font = QFont("Arial", 9)
         painter.setFont(font)
         
-        # 示例模拟几个PPT位置
-        for row in range(layout_result["rows"]):
-            for col in range(layout_result["columns"]):
-                x = left_margin + col * (item_width + h_spacing)
-                y = top_margin + row * (item_height + v_spacing)
-                
-                # 绘制PPT边框
-                painter.setPen(QPen(QColor(COLORS['primary_dark']), 1))
-                painter.fillRect(int(x), int(y), int(item_width), int(item_height), QColor(COLORS['background']))
-                painter.drawRect(int(x), int(y), int(item_width), int(item_height))
-                
-                # 绘制编号
-                painter.setPen(QColor(COLORS['text_primary']))
-                item_num = row * layout_result["columns"] + col + 1
-                if item_num <= len(self.slide_images):
-                    painter.drawText(
-                        QRectF(int(x), int(y), int(item_width), int(item_height)),
-                        Qt.AlignmentFlag.AlignCenter,
-                        f"PPT {item_num}"
-                    )
-                    
-                    # 显示PPT定位页码
-                    if self.layout_config["show_ppt_numbers"]:
-                        painter.setFont(QFont("Arial", 8))
-                        painter.drawText(
-                            int(x), int(y + item_height + 12),
-                            f"{item_num}"
-                        )
-                        painter.setFont(font)  # 恢复字体
+        # 绘制第一页纸上的格子，位置直接取自布局表，与导出一致
+        _, _, cell_xs, cell_ys = cell_origins(layout_result, layout_result.config)
+        _, first_sheet = sheet_placements(layout_result["placements"], 0)
+        for pos, (cell_x, cell_y) in enumerate(zip(cell_xs * scale_factor, cell_ys * scale_factor)):
+            cell_rect = QRect(int(cell_x), int(cell_y), int(item_width), int(item_height))
+            painter.setPen(QPen(QColor(COLORS['primary_dark']), 1))
+            painter.fillRect(cell_rect, QColor(COLORS['background']))
+            
+            # 绘制幻灯片，宽高比与格子不同时按原比例居中
+            painter.setPen(QColor(COLORS['text_primary']))
+            if pos < len(first_sheet):
+                placement = first_sheet[pos]
+                slide_rect = QRect(int(placement["x"] * scale_factor), int(placement["y"] * scale_factor),
+                                   int(placement["w"] * scale_factor), int(placement["h"] * scale_factor))
+                if pos < len(thumbnails):
+                    painter.drawPixmap(slide_rect, thumbnails[pos])
+                else:
+                    painter.drawText(QRectF(slide_rect), Qt.AlignmentFlag.AlignCenter, f"PPT {pos + 1}")
+            
+            painter.setPen(QPen(QColor(COLORS['primary_dark']), 1))
+            painter.drawRect(cell_rect)
+            painter.setPen(QColor(COLORS['text_primary']))
+            
+            # 显示PPT定位页码，与导出的标记相同（合并过动画步骤时附带原幻灯片编号）
+            if pos < len(first_sheet) and self.layout_config["show_ppt_numbers"]:
+                painter.setFont(QFont("Arial", 8))
+                painter.drawText(int(cell_x), int(cell_y + item_height + 12), layout_result.labels[pos])
+                painter.setFont(font)  # 恢复字体
         
         # 显示纸张页码
         if self.layout_config["show_page_numbers"]:
@@ -1033,12 +1347,6 @@ class MainWindow(QMainWindow):
         # 显示预览图
         preview_label.setPixmap(pixmap)
         self.preview_layout.addWidget(preview_label)
-        
-        # 更新状态栏
-        self.status_bar.showMessage("预览已生成")
-        
-        # 启用下一步按钮
-        self.next_btn.setEnabled(True)
     
     def process_ppt(self):
         """处理PPT并导出PDF（异步）"""
@@ -1050,31 +1358,55 @@ class MainWindow(QMainWindow):
             return
 
         self.content_pdf_path = output_path
+        self.ppt_processor.last_size_report = None
         
         self.loading_overlay.set_text("正在生成内容PDF...")
         self.loading_overlay.show()
         self.loading_overlay.set_progress(0, 100, "准备生成PDF...")
         self.export_btn.setEnabled(False)
 
-        layout_result = self.layout_calculator.calculate_layout(self.slide_images, self.layout_config)
+        layout_result = self.layout_calculator.plan(self.slide_images, self.layout_config)
         
         # 定义进度回调函数
         def progress_callback(current, total, message):
             # 在UI线程中更新进度条
             self.loading_overlay.set_progress(current, total, message)
         
-        self.worker = Worker(
-            self.ppt_processor.generate_pdf, 
-            self.slide_images, 
-            self.content_pdf_path,
-            layout_result, 
-            self.layout_config,
-            progress_callback=self._update_progress
-        )
+        # 矢量直通模式需要LibreOffice转换得到的中间PDF，否则回退到图像模式
+        source_pdf_path = self.ppt_processor.source_pdf_path
+        if self.layout_config.get("vector_mode") and source_pdf_path and os.path.exists(source_pdf_path):
+            self.worker = Worker(
+                self.ppt_processor.generate_vector_pdf,
+                source_pdf_path,
+                self.content_pdf_path,
+                layout_result,
+                self.layout_config,
+                progress_callback=self._update_progress,
+                page_indices=getattr(self.slide_images, "indices", None)
+            )
+        elif self.layout_config.get("target_size_mb"):
+            self.worker = Worker(
+                self.ppt_processor.generate_pdf_within_budget,
+                self.slide_images,
+                self.content_pdf_path,
+                layout_result,
+                self.layout_config,
+                self.layout_config["target_size_mb"],
+                progress_callback=self._update_progress
+            )
+        else:
+            self.worker = Worker(
+                self.ppt_processor.generate_pdf, 
+                self.slide_images, 
+                self.content_pdf_path,
+                layout_result, 
+                self.layout_config,
+                progress_callback=self._update_progress
+            )
         self.worker.finished.connect(lambda success: self._on_content_pdf_generated(success, self.content_pdf_path))
         self.worker.error.connect(self._on_task_error)
         self.worker.progress.connect(self._update_progress)
-        self.worker.start()
+        self._start_worker(self.worker)
 
     def _on_content_pdf_generated(self, success, output_path):
         """内容PDF生成完成后的回调"""
@@ -1082,7 +1414,17 @@ class MainWindow(QMainWindow):
         self.export_btn.setEnabled(True)
 
         if success:
-            self.export_result.setText(f"<p style='color:{COLORS['success']};'><b>PDF导出成功!</b></p><p>文件保存在: {output_path}</p>")
+            result_text = f"<p style='color:{COLORS['success']};'><b>PDF导出成功!</b></p><p>文件保存在: {output_path}</p>"
+            report = self.ppt_processor.last_size_report
+            if report:
+                predicted = report["predicted_bytes"]
+                predicted_text = f"{predicted / 1048576:.1f} MB" if predicted is not None else "未知"
+                result_text += (f"<p>目标大小 <b>{report['target_bytes'] / 1048576:.1f} MB</b>，"
+                                f"预测 <b>{predicted_text}</b>，"
+                                f"实际 <b>{report['achieved_bytes'] / 1048576:.1f} MB</b></p>")
+                if not report["within_target"]:
+                    result_text += f"<p style='color:{COLORS['error']};'>实际大小超出了目标，可以调低目标大小后重新导出</p>"
+            self.export_result.setText(result_text)
             QMessageBox.information(self, "成功", f"PDF已保存到:\n{output_path}")
             
             # 显示AI索引按钮
@@ -1122,9 +1464,7 @@ class MainWindow(QMainWindow):
         if not self.slide_images:
             return
 
-        layout_result = self.layout_calculator.calculate_layout(
-            self.slide_images, self.layout_config
-        )
+        layout_result = self.layout_calculator.plan(self.slide_images, self.layout_config)
         total_slides = len(self.slide_images)
         items_per_page = layout_result["rows"] * layout_result["columns"]
 
@@ -1146,6 +1486,21 @@ class MainWindow(QMainWindow):
 请确保索引覆盖所有关键知识点，并准确地将每个知识点定位到对应的幻灯片编号。
 内容请具体到各个内容标题下的知识点，给出的更多的知识点内容及其索引。
 """
+        groups = getattr(self.slide_images, "groups", None)
+        if groups and len(groups) != len(self.source_slide_images):
+            # 合并动画步骤后，排版位置与原幻灯片编号不再一一对应，需要给出对照表
+            lines = []
+            for position, group in enumerate(groups):
+                page, pos = divmod(position, items_per_page)
+                first, last = group[0] + 1, group[-1] + 1
+                source_text = f"{first}" if first == last else f"{first}-{last}"
+                lines.append(f"- 原幻灯片 {source_text} → 索引 {page + 1}-{pos + 1}")
+            prompt += (
+                f"\n注意：原演示文稿共有 {len(self.source_slide_images)} 张幻灯片，连续的动画分步幻灯片已合并，"
+                f"每组只保留最后一步，排版中共 {total_slides} 张。\n"
+                "请按下面的对照表将原幻灯片编号换算为索引，不要使用上面的计算公式：\n"
+                + "\n".join(lines) + "\n"
+            )
         self.ai_prompt_text.setText(prompt.strip())
     
     def export_final_pdf(self):
@@ -1184,7 +1539,7 @@ class MainWindow(QMainWindow):
         self.worker.finished.connect(lambda success: self._on_final_pdf_generated(success, final_output_path))
         self.worker.error.connect(self._on_task_error)
         self.worker.progress.connect(self._update_progress)
-        self.worker.start()
+        self._start_worker(self.worker)
 
     def _on_final_pdf_generated(self, success, final_output_path):
         """最终PDF生成完成后的回调"""
@@ -1199,9 +1554,11 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "失败", "生成最终PDF时出错，请检查日志。")
     
     def _update_export_summary(self):
-        layout_result = self.layout_calculator.calculate_layout(self.slide_images, self.layout_config)
-        orientation_text = "横向" if self.layout_config["is_landscape"] else "纵向"
+        layout_result = self.layout_calculator.plan(self.slide_images, self.layout_config)
+        orientation_text = "横向" if layout_result["is_landscape"] else "纵向"
         summary = f"<p>将导出 <b>{len(self.slide_images)}</b> 张PPT幻灯片</p>"
+        if len(self.slide_images) != len(self.source_slide_images):
+            summary += f"<p>已合并动画步骤（原有 <b>{len(self.source_slide_images)}</b> 张）</p>"
         summary += f"<p>页面方向: <b>{orientation_text}A4</b></p>"
         summary += f"<p>布局: 每页 <b>{layout_result['rows']}</b> 行 × <b>{layout_result['columns']}</b> 列</p>"
         summary += f"<p>预计页数: <b>{layout_result['pages_needed']}</b> 页PDF</p>"
@@ -1219,13 +1576,8 @@ class MainWindow(QMainWindow):
                 self.status_bar.showMessage("已清理所有临时文件")
             
             # 关闭所有可能仍然打开的图像
-            if hasattr(self, 'slide_images') and self.slide_images:
-                for img in self.slide_images:
-                    try:
-                        if hasattr(img, 'close'):
-                            img.close()
-                    except:
-                        pass
+            if hasattr(self, 'slide_images'):
+                self._release_slide_images()
             
             # 继续正常关闭
             event.accept()
@@ -0,0 +1,318 @@
+import copy
+from collections import namedtuple
+
+from src.utils.pdf_rasterizer import iter_slide_images
+
+# 差值哈希的边长：16×16共256位，足以区分只多出一行文字的动画步骤
+HASH_SIZE = 16
+
+# 计算哈希时的栅格化分辨率，只需要能看清版面结构
+HASH_DPI = 24
+
+# 相邻幻灯片的哈希差异位数不超过该比例时视为同一组动画步骤
+DEFAULT_BUILD_THRESHOLD = 0.15
+
+# 合并动画步骤相关配置项的默认值，与 DEFAULT_LAYOUT_CONFIG 合并后作为完整的导出配置
+DEFAULT_BUILD_CONFIG = {"collapse_builds": False, "build_threshold": DEFAULT_BUILD_THRESHOLD}
+
+# 判断"只增加内容"时使用的灰度缩略图尺寸、视为变化的灰度差，
+# 以及变化的格子中允许原本就有内容的比例（新内容紧挨旧内容时缩略图格子会混合）
+THUMBNAIL_SIZE = (48, 27)
+CHANGE_TOLERANCE = 32
+MAX_REMOVED_RATIO = 0.25
+
+# 逐像素确认"只增加内容"时的分辨率：低分辨率的哈希和缩略图看不出正文里改了一个数字
+CONTAINMENT_DPI = 72
+
+# 前一张中变化的内容像素最多允许占其内容像素的比例（只容许个别抗锯齿像素），
+# 后一张至少要新增的像素数，以及前一张至少要有的内容比例（空白页后面的内容页不算动画步骤）
+MAX_ALTERED_INK_RATIO = 0.001
+MIN_ADDED_PIXELS = 16
+MIN_CONTENT_RATIO = 0.002
+
+# 每张幻灯片的签名：感知哈希、灰度缩略图和背景灰度
+SlideSignature = namedtuple("SlideSignature", ["hash", "thumbnail", "background"])
+
+
+def perceptual_hash(image, hash_size=HASH_SIZE):
+    """
+    计算图像的差值哈希（dHash）：缩小为灰度图后比较相邻像素的明暗
+
+    Args:
+        image (PIL.Image.Image): 图像
+        hash_size (int): 哈希边长
+
+    Returns:
+        int: hash_size*hash_size 位的哈希值
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """两个哈希值不同的位数"""
+    return bin(a ^ b).count("1")
+
+
+def slide_signature(image):
+    """
+    计算幻灯片的签名
+
+    Returns:
+        SlideSignature: 感知哈希、灰度缩略图（bytes）和出现最多的灰度值
+    """
+    from PIL import Image
+
+    thumbnail = image.convert("L").resize(THUMBNAIL_SIZE, Image.Resampling.BOX)
+    histogram = thumbnail.histogram()
+    background = histogram.index(max(histogram))
+    return SlideSignature(perceptual_hash(image), thumbnail.tobytes(), background)
+
+
+def is_additive(previous, current):
+    """
+    后一张是否只是在前一张的基础上增加了内容（动画的下一步）
+
+    发生变化的位置在前一张中应当基本都是背景；标题换了、内容被替换的幻灯片不算。
+    """
+    changed = removed = 0
+    for before, after in zip(previous.thumbnail, current.thumbnail):
+        if abs(before - after) > CHANGE_TOLERANCE:
+            changed += 1
+            if abs(before - previous.background) > CHANGE_TOLERANCE:
+                removed += 1
+    return removed <= changed * MAX_REMOVED_RATIO
+
+
+def contains_previous(previous_image, current_image):
+    """
+    逐像素检查后一张是否完整保留了前一张的内容，并且确实增加了内容
+
+    前一张中所有非背景像素在后一张中都应保持不变；后一张新增的像素应落在前一张的背景上。
+    前一张几乎空白时不算（空白页后面的内容页不是动画步骤），两张相同时也不算。
+
+    Args:
+        previous_image (PIL.Image.Image): 前一张幻灯片
+        current_image (PIL.Image.Image): 后一张幻灯片
+
+    Returns:
+        bool: 后一张是否为前一张的下一个动画步骤
+    """
+    import numpy as np
+
+    if previous_image.size != current_image.size:
+        return False
+    before = np.asarray(previous_image.convert("L"), dtype=np.int16)
+    after = np.asarray(current_image.convert("L"), dtype=np.int16)
+
+    background = np.bincount(before.ravel(), minlength=256).argmax()
+    ink = np.abs(before - background) > CHANGE_TOLERANCE
+    ink_count = int(ink.sum())
+    if ink_count < before.size * MIN_CONTENT_RATIO:
+        return False
+
+    changed = np.abs(before - after) > CHANGE_TOLERANCE
+    altered = int((changed & ink).sum())
+    added = int((changed & ~ink).sum())
+    return altered <= ink_count * MAX_ALTERED_INK_RATIO and added >= MIN_ADDED_PIXELS
+
+
+class ContainmentChecker:
+    """
+    以 CONTAINMENT_DPI 取出相邻两张幻灯片并用 contains_previous 确认动画步骤
+
+    只检查通过哈希和缩略图初筛的相邻幻灯片；结果按幻灯片对缓存，调整阈值重新分组时不重复栅格化。
+    """
+
+    def __init__(self, slide_images, dpi=CONTAINMENT_DPI):
+        """
+        Args:
+            slide_images: 幻灯片序列
+            dpi (int): 幻灯片流的栅格化分辨率
+        """
+        self.slide_images = slide_images
+        self.dpi = dpi
+        self._results = {}
+
+    def __call__(self, previous_index, index):
+        key = (previous_index, index)
+        if key not in self._results:
+            images = list(iter_slide_images(self.slide_images, previous_index, index + 1, dpi=self.dpi))
+            self._results[key] = len(images) == 2 and contains_previous(images[0], images[-1])
+        return self._results[key]
+
+
+def group_builds(signatures, threshold=DEFAULT_BUILD_THRESHOLD, hash_size=HASH_SIZE, verify=None):
+    """
+    将连续的动画分步幻灯片分为一组
+
+    只比较相邻的两张：逐条出现的动画步骤每一步都与上一步相似，并且只增加内容。
+    哈希和缩略图只用于初筛，给出 verify 时通过初筛的相邻两张还要经它逐像素确认。
+
+    Args:
+        signatures (list): 每张幻灯片的签名
+        threshold (float): 视为同一组的最大哈希差异比例
+        hash_size (int): 哈希边长
+        verify (callable, optional): verify(前一张索引, 后一张索引)，返回是否为同一组
+
+    Returns:
+        list: 各组的幻灯片索引列表，按原顺序排列
+    """
+    max_distance = int(threshold * hash_size * hash_size)
+    groups = []
+    for index, signature in enumerate(signatures):
+        previous = signatures[index - 1] if index else None
+        if (previous is not None
+                and hamming_distance(previous.hash, signature.hash) <= max_distance
+                and is_additive(previous, signature)
+                and (verify is None or verify(index - 1, index))):
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    return groups
+
+
+class SlideSubset:
+    """
+    幻灯片序列的只读子集视图，按原顺序保留部分幻灯片
+
+    不复制也不持有像素，取图时转发给原序列；slide_numbers 记录保留的幻灯片在原演示文稿中的编号，
+    用于定位标记和AI提示词。原序列由调用方负责关闭。
+    """
+
+    def __init__(self, source, indices, groups=None):
+        """
+        Args:
+            source: 原幻灯片序列（图像列表、幻灯片流、集合或存储）
+            indices (list): 保留的幻灯片索引，按升序排列
+            groups (list, optional): 每张保留的幻灯片所代表的原幻灯片索引
+        """
+        self.source = source
+        self.indices = list(indices)
+        self.groups = groups or [[index] for index in self.indices]
+
+    @property
+    def slide_numbers(self):
+        """保留的幻灯片在原演示文稿中的编号（从1开始）"""
+        return [index + 1 for index in self.indices]
+
+    @property
+    def page_size_pts(self):
+        return getattr(self.source, "page_size_pts", None)
+
+    @property
+    def workers(self):
+        return getattr(self.source, "workers", 1)
+
+    @workers.setter
+    def workers(self, value):
+        # 只修改本视图持有的副本，不影响原序列
+        if hasattr(self.source, "workers"):
+            self.source = copy.copy(self.source)
+            self.source.workers = value
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __bool__(self):
+        return bool(self.indices)
+
+    def __iter__(self):
+        return self.iter_images()
+
+    def __getitem__(self, index):
+        return self.source[self.indices[index]]
+
+    @property
+    def aspect_ratio(self):
+        if hasattr(self.source, "aspect_ratio"):
+            return self.source.aspect_ratio
+        width, height = self[0].size
+        return width / height
+
+    def aspect_ratios(self):
+        """保留的幻灯片各自的宽高比"""
+        from src.utils.placement import slide_aspect_ratios
+
+        return slide_aspect_ratios(self.source)[self.indices]
+
+    def dpi_for_pixel_width(self, pixel_width):
+        if hasattr(self.source, "dpi_for_pixel_width"):
+            return self.source.dpi_for_pixel_width(pixel_width)
+        return None
+
+    def iter_images(self, start=0, stop=None, dpi=None, progress_callback=None):
+        """
+        逐张产出保留的幻灯片图像，原序列中连续的一段一次取出
+
+        Args:
+            start (int): 起始索引（子集中的位置）
+            stop (int, optional): 结束索引（不包含）
+            dpi (int, optional): 目标分辨率
+            progress_callback (callable, optional): 进度回调函数，报告已产出的张数
+
+        Yields:
+            PIL.Image.Image: 幻灯片图像
+        """
+        selected = self.indices[start:stop]
+        total = len(selected)
+        done = 0
+        run_start = 0
+        while run_start < total:
+            run_end = run_start + 1
+            while run_end < total and selected[run_end] == selected[run_end - 1] + 1:
+                run_end += 1
+            for image in iter_slide_images(self.source, selected[run_start], selected[run_end - 1] + 1, dpi=dpi):
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, f"已加载 {done}/{total} 张幻灯片...")
+                yield image
+            run_start = run_end
+
+    def close(self):
+        """子集不持有资源，原序列由调用方关闭"""
+        pass
+
+
+def compute_slide_signatures(slide_images, dpi=HASH_DPI, progress_callback=None):
+    """
+    以低分辨率取出每张幻灯片并计算签名
+
+    Args:
+        slide_images: 幻灯片序列
+        dpi (int): 幻灯片流的栅格化分辨率
+        progress_callback (callable, optional): 进度回调函数
+
+    Returns:
+        list: 每张幻灯片的 SlideSignature
+    """
+    # 取图（栅格化）占大部分时间，进度由幻灯片源按已取出的张数报告
+    return [slide_signature(image)
+            for image in iter_slide_images(slide_images, dpi=dpi, progress_callback=progress_callback)]
+
+
+def collapse_builds(slide_images, signatures, threshold=DEFAULT_BUILD_THRESHOLD, checker=None):
+    """
+    合并连续的动画分步幻灯片，每组只保留最后一步（内容最完整的状态）
+
+    Args:
+        slide_images: 幻灯片序列
+        signatures (list): 每张幻灯片的签名
+        threshold (float): 视为同一组的最大哈希差异比例
+        checker (ContainmentChecker, optional): 逐像素确认器，默认新建一个
+
+    Returns:
+        SlideSubset: 合并后的幻灯片视图
+    """
+    if checker is None:
+        checker = ContainmentChecker(slide_images)
+    groups = group_builds(signatures, threshold, verify=checker)
+    return SlideSubset(slide_images, [group[-1] for group in groups], groups)
@@ -0,0 +1,345 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# 缓存格式版本，变更缓存布局或转换方式时递增，使旧条目自然失效
+CACHE_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+PDF_NAME = "slides.pdf"
+RASTER_DIR_NAME = "rasters"
+STAGING_PREFIX = ".staging_"
+
+# 超过该时间的临时写入目录视为中断的写入（其他进程可能正在写入较新的目录）
+STALE_STAGING_SECONDS = 3600
+
+# 本进程中正在使用的条目目录及其引用数，所有缓存实例共用；正在使用的条目不会被淘汰或替换
+_entries_in_use = {}
+_entries_in_use_lock = threading.Lock()
+
+
+def default_cache_dir():
+    """
+    获取默认的缓存目录
+
+    Returns:
+        str: Windows下位于 %LOCALAPPDATA%，其他系统位于 ~/.cache
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ppt_layout_tool", "conversions")
+
+
+def hash_file(path, hasher=None, chunk_size=1024 * 1024):
+    """
+    计算文件内容的SHA-256
+
+    Args:
+        path (str): 文件路径
+        hasher (optional): 已有的hashlib对象，传入时在其基础上继续更新
+
+    Returns:
+        hashlib对象
+    """
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(block)
+    return hasher
+
+
+class ConversionCache:
+    """
+    按内容寻址的转换结果磁盘缓存
+
+    键由输入文件内容的哈希和转换设置共同决定，每个条目保存中间PDF及其栅格缓存目录。
+    条目带有校验信息，读取时校验失败会被丢弃；总大小超过上限时按最近访问时间淘汰，
+    本进程中通过 acquire 标记为正在使用的条目除外。
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=2048):
+        """
+        Args:
+            cache_dir (str, optional): 缓存根目录，默认使用 default_cache_dir()
+            max_size_mb (int): 缓存总大小上限（MB）
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size_mb = max_size_mb
+        self._lock = threading.Lock()
+        self._remove_stale_staging()
+
+    def make_key(self, file_path, settings=None):
+        """
+        计算缓存键
+
+        Args:
+            file_path (str): 输入文件路径
+            settings (dict, optional): 影响转换结果的设置
+
+        Returns:
+            str: 十六进制键
+        """
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps({"version": CACHE_VERSION, "settings": settings or {}},
+                                 sort_keys=True).encode("utf-8"))
+        return hash_file(file_path, hasher).hexdigest()
+
+    def entry_dir(self, key):
+        """条目目录，按键的前两位分桶"""
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def raster_dir(self, key):
+        """条目的栅格缓存目录"""
+        path = os.path.join(self.entry_dir(key), RASTER_DIR_NAME)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def acquire(self, key):
+        """
+        标记条目正在使用，在对应的 release 之前不会被淘汰或被重新写入替换
+
+        Args:
+            key (str): 缓存键
+        """
+        entry = os.path.abspath(self.entry_dir(key))
+        with _entries_in_use_lock:
+            _entries_in_use[entry] = _entries_in_use.get(entry, 0) + 1
+
+    def release(self, key):
+        """解除一次 acquire 的标记"""
+        entry = os.path.abspath(self.entry_dir(key))
+        with _entries_in_use_lock:
+            count = _entries_in_use.get(entry, 0) - 1
+            if count > 0:
+                _entries_in_use[entry] = count
+            else:
+                _entries_in_use.pop(entry, None)
+
+    def in_use(self, key):
+        """条目是否正被本进程使用"""
+        with _entries_in_use_lock:
+            return os.path.abspath(self.entry_dir(key)) in _entries_in_use
+
+    def get_pdf(self, key, verify=False):
+        """
+        查找缓存的中间PDF
+
+        命中时只比较文件大小和修改时间，与清单不一致（文件被改动过）或 verify 为True时
+        才重新计算整个文件的哈希。
+
+        Args:
+            key (str): 缓存键
+            verify (bool): 是否无条件校验文件哈希
+
+        Returns:
+            str: PDF路径，未命中或校验失败时返回None
+        """
+        entry = self.entry_dir(key)
+        manifest = self._read_manifest(entry)
+        if manifest is None:
+            return None
+
+        pdf_path = os.path.join(entry, PDF_NAME)
+        try:
+            stat = os.stat(pdf_path)
+            unchanged = (stat.st_size == manifest["pdf_size"]
+                         and stat.st_mtime_ns == manifest.get("pdf_mtime_ns"))
+            valid = stat.st_size == manifest["pdf_size"]
+            if valid and (verify or not unchanged):
+                valid = hash_file(pdf_path).hexdigest() == manifest["pdf_sha256"]
+                if valid and not unchanged:
+                    # 内容未变而只是修改时间变了，记下新的修改时间，下次命中不再计算哈希
+                    manifest["pdf_mtime_ns"] = stat.st_mtime_ns
+                    self._write_manifest(entry, manifest)
+        except (OSError, KeyError):
+            valid = False
+
+        if not valid:
+            print(f"缓存条目校验失败，已丢弃: {key}")
+            self.remove(key)
+            return None
+
+        # 更新清单文件的修改时间作为访问时间，用于LRU淘汰，不重写清单
+        try:
+            os.utime(os.path.join(entry, MANIFEST_NAME))
+        except OSError:
+            pass
+        return pdf_path
+
+    def store_pdf(self, key, pdf_path, extra=None, protect=()):
+        """
+        将中间PDF存入缓存
+
+        Args:
+            key (str): 缓存键
+            pdf_path (str): 要缓存的PDF
+            extra (dict, optional): 需要一并记录到清单中的附加信息
+            protect (iterable): 本次写入后的淘汰中需要保留的其他键
+
+        Returns:
+            str: 缓存中的PDF路径，失败时返回None
+        """
+        entry = self.entry_dir(key)
+        staging = None
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+            # 先写入临时目录再整体改名，避免留下不完整的条目
+            staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=os.path.dirname(entry))
+            staged_pdf = os.path.join(staging, PDF_NAME)
+            shutil.copyfile(pdf_path, staged_pdf)
+            # 记录缓存副本的大小和修改时间，命中时据此判断文件是否被改动（改名不改变修改时间）
+            stat = os.stat(staged_pdf)
+            manifest = {
+                "version": CACHE_VERSION,
+                "pdf_size": stat.st_size,
+                "pdf_mtime_ns": stat.st_mtime_ns,
+                "pdf_sha256": hash_file(staged_pdf).hexdigest(),
+                "created": time.time(),
+            }
+            manifest.update(extra or {})
+            self._write_manifest(staging, manifest)
+
+            with self._lock:
+                if self.in_use(key) and self._read_manifest(entry) is not None:
+                    # 内容相同的条目正被其他任务读取，保留原条目
+                    shutil.rmtree(staging, ignore_errors=True)
+                else:
+                    if os.path.exists(entry):
+                        shutil.rmtree(entry, ignore_errors=True)
+                    os.replace(staging, entry)
+        except Exception as e:
+            print(f"写入转换缓存失败: {e}")
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+            return None
+
+        self.evict(keep=(key,) + tuple(protect))
+        return os.path.join(entry, PDF_NAME)
+
+    def get_manifest(self, key):
+        """读取条目清单，不存在时返回None"""
+        return self._read_manifest(self.entry_dir(key))
+
+    def find_latest(self, source_path):
+        """
+        查找同一路径的源文件最近一次转换的条目
+
+        Args:
+            source_path (str): 源文件路径
+
+        Returns:
+            tuple: (键, 清单)，没有找到时返回 (None, None)
+        """
+        source_path = os.path.abspath(source_path)
+        latest_key, latest_manifest = None, None
+        for key, entry in self._iter_entries():
+            manifest = self._read_manifest(entry)
+            if not manifest or manifest.get("source_path") != source_path:
+                continue
+            if latest_manifest is None or manifest.get("created", 0) > latest_manifest.get("created", 0):
+                latest_key, latest_manifest = key, manifest
+        return latest_key, latest_manifest
+
+    def remove(self, key):
+        """删除一个条目"""
+        with self._lock:
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+
+    def evict(self, keep=()):
+        """
+        按最近访问时间淘汰条目，直到总大小低于上限
+
+        Args:
+            keep (iterable): 不允许淘汰的键（通常是刚写入的条目）；本进程中正在使用的条目也不会被淘汰
+        """
+        entries = []
+        total = 0
+        for key, entry in self._iter_entries():
+            size = _dir_size(entry)
+            total += size
+            entries.append((_last_access(entry), key, size))
+
+        limit = self.max_size_mb * 1024 * 1024
+        for _, key, size in sorted(entries):
+            if total <= limit:
+                break
+            if key in keep or self.in_use(key):
+                continue
+            self.remove(key)
+            total -= size
+
+    def _iter_entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for bucket in os.listdir(self.cache_dir):
+            bucket_dir = os.path.join(self.cache_dir, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for key in os.listdir(bucket_dir):
+                entry = os.path.join(bucket_dir, key)
+                if key.startswith(STAGING_PREFIX):
+                    continue
+                if os.path.isdir(entry):
+                    yield key, entry
+
+    def _remove_stale_staging(self):
+        """删除中断的写入留下的临时目录"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        cutoff = time.time() - STALE_STAGING_SECONDS
+        for bucket in os.listdir(self.cache_dir):
+            bucket_dir = os.path.join(self.cache_dir, bucket)
+            if not os.path.isdir(bucket_dir):
+                continue
+            for name in os.listdir(bucket_dir):
+                path = os.path.join(bucket_dir, name)
+                try:
+                    if name.startswith(STAGING_PREFIX) and os.path.getmtime(path) < cutoff:
+                        shutil.rmtree(path, ignore_errors=True)
+                except OSError:
+                    pass
+
+    def _read_manifest(self, entry):
+        try:
+            with open(os.path.join(entry, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != CACHE_VERSION:
+                return None
+            return manifest
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, entry, manifest):
+        path = os.path.join(entry, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+
+def _last_access(entry):
+    """条目的最近访问时间，即清单文件的修改时间；没有清单的条目最先淘汰"""
+    try:
+        return os.path.getmtime(os.path.join(entry, MANIFEST_NAME))
+    except OSError:
+        return 0
+
+
+def _dir_size(path):
+    """目录下所有文件的总字节数"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
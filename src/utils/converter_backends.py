@@ -0,0 +1,297 @@
+import io
+import os
+import sys
+import json
+import threading
+import subprocess
+import importlib.util
+
+from src.utils.conversion_cache import default_cache_dir
+
+# 探测结果的持久化文件，与转换缓存放在同一个应用缓存目录下
+STATE_FILE_NAME = "backends.json"
+
+
+class ConverterBackend:
+    """
+    PPT转换方式的基类
+
+    子类只在真正使用时才导入各自的依赖；可用性探测（可执行文件路径、版本等）
+    只进行一次，结果由注册表缓存。
+    """
+
+    # 后端名称，用于日志和持久化
+    name = ""
+    # 优先级，数值越小越优先。顺序按转换结果决定而不是速度：LibreOffice同时提供矢量直通模式
+    # 需要的中间PDF，PowerPoint次之，整页图片提取只适用于少数演示文稿
+    priority = 50
+    # 支持的文件扩展名
+    extensions = (".pptx", ".ppt")
+
+    def supports(self, path):
+        """是否支持该格式的文件"""
+        return path.lower().endswith(self.extensions)
+
+    def probe_token(self):
+        """
+        廉价的探测环境标识，标识不变时可以直接复用上次持久化的探测结果
+
+        Returns:
+            str: 标识，返回None表示探测结果不跨进程复用
+        """
+        return None
+
+    def probe(self):
+        """
+        探测后端是否可用
+
+        Returns:
+            dict: 后端信息（如路径、版本），不可用时返回None
+        """
+        raise NotImplementedError
+
+    def convert(self, processor, path, info, progress_callback=None):
+        """
+        将演示文稿转换为幻灯片图像
+
+        Args:
+            processor (PPTProcessor): 调用方的处理器，提供临时文件和缓存等资源
+            path (str): 演示文稿路径
+            info (dict): probe() 返回的后端信息
+            progress_callback (callable, optional): 进度回调函数
+
+        Returns:
+            list: 图像列表或惰性幻灯片流，失败时返回空列表
+        """
+        raise NotImplementedError
+
+
+class LibreOfficeBackend(ConverterBackend):
+    """通过常驻LibreOffice进程池转换为PDF，再按需栅格化"""
+
+    name = "libreoffice"
+    priority = 10
+    extensions = (".pptx",)
+
+    def probe_token(self):
+        from src.utils.libreoffice_pool import find_soffice_path
+
+        path = find_soffice_path()
+        if not path:
+            return None
+        try:
+            return f"{path}|{os.path.getmtime(path)}"
+        except OSError:
+            return path
+
+    def probe(self):
+        from src.utils.libreoffice_pool import find_soffice_path
+
+        path = find_soffice_path()
+        if not path:
+            return None
+
+        version = None
+        try:
+            output = subprocess.run(
+                [path, "--version"], capture_output=True, text=True, timeout=30,
+                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+            ).stdout.strip()
+            version = output.splitlines()[0] if output else None
+        except Exception as e:
+            print(f"读取LibreOffice版本失败: {e}")
+        return {"path": path, "version": version}
+
+    def convert(self, processor, path, info, progress_callback=None):
+        from src.utils.libreoffice_pool import get_shared_pool
+
+        # 用探测到的路径创建共享进程池，之后的转换不再查找soffice
+        get_shared_pool(info["path"])
+        return processor._convert_pptx_to_images(path, progress_callback)
+
+
+class ComBackend(ConverterBackend):
+    """通过COM接口调用本机安装的PowerPoint导出幻灯片图像（仅Windows）"""
+
+    name = "com"
+    priority = 20
+
+    def probe_token(self):
+        return f"{sys.platform}|{sys.version_info[:2]}"
+
+    def probe(self):
+        if sys.platform != "win32" or importlib.util.find_spec("comtypes") is None:
+            return None
+        return {"module": "comtypes"}
+
+    def convert(self, processor, path, info, progress_callback=None):
+        return processor._convert_ppt_via_com(path, progress_callback)
+
+
+class PictureSlidesBackend(ConverterBackend):
+    """
+    直接提取整页图片
+
+    适用于每张幻灯片只有一张铺满页面的图片的演示文稿（如由PDF或扫描件生成的PPT），
+    不需要任何外部程序；只要有一张幻灯片不满足条件就放弃，交给下一个后端。
+    """
+
+    name = "pictures"
+    priority = 90
+    extensions = (".pptx",)
+
+    # 图片至少覆盖幻灯片面积的比例
+    MIN_COVERAGE = 0.95
+
+    def probe_token(self):
+        return f"{sys.version_info[:2]}"
+
+    def probe(self):
+        if importlib.util.find_spec("pptx") is None or importlib.util.find_spec("PIL") is None:
+            return None
+        return {"module": "python-pptx"}
+
+    def convert(self, processor, path, info, progress_callback=None):
+        from pptx import Presentation
+        from pptx.enum.shapes import MSO_SHAPE_TYPE
+        from PIL import Image
+
+        presentation = Presentation(path)
+        slide_area = presentation.slide_width * presentation.slide_height
+        slides = list(presentation.slides)
+
+        # 提取的图片交给按需解码的集合，超出内存预算时溢出到磁盘
+        emu_per_pt = 12700
+        images = processor.create_slide_collection(
+            (presentation.slide_width / emu_per_pt, presentation.slide_height / emu_per_pt)
+        )
+        for i, slide in enumerate(slides):
+            shapes = list(slide.shapes)
+            if len(shapes) != 1 or shapes[0].shape_type != MSO_SHAPE_TYPE.PICTURE:
+                return []
+            picture = shapes[0]
+            cropped = any((picture.crop_left, picture.crop_right, picture.crop_top, picture.crop_bottom))
+            if cropped or picture.width * picture.height < slide_area * self.MIN_COVERAGE:
+                return []
+
+            images.add_image(Image.open(io.BytesIO(picture.image.blob)).convert("RGB"))
+            if progress_callback:
+                progress_callback(int((i + 1) / len(slides) * 100), 100,
+                                  f"已提取 {i + 1}/{len(slides)} 张幻灯片...")
+        return images
+
+
+class BackendRegistry:
+    """
+    转换后端注册表
+
+    每个后端的探测结果在进程内只计算一次，并持久化到磁盘，下次启动时环境标识不变就直接复用。
+    候选后端按优先级排序。
+    """
+
+    def __init__(self, state_path=None):
+        """
+        Args:
+            state_path (str, optional): 持久化文件路径，默认位于应用缓存目录
+        """
+        self.state_path = state_path or os.path.join(os.path.dirname(default_cache_dir()), STATE_FILE_NAME)
+        self._backends = []
+        self._probed = {}
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def register(self, backend):
+        """注册一个后端"""
+        self._backends.append(backend)
+
+    def get(self, name):
+        """按名称获取后端"""
+        for backend in self._backends:
+            if backend.name == name:
+                return backend
+        return None
+
+    def capabilities(self, backend):
+        """
+        获取后端的探测结果，进程内只探测一次
+
+        Returns:
+            dict: 后端信息，不可用时返回None
+        """
+        with self._lock:
+            if backend.name in self._probed:
+                return self._probed[backend.name]
+
+            info = None
+            token = None
+            try:
+                token = backend.probe_token()
+                saved = self._state["probes"].get(backend.name)
+                if token is not None and saved and saved.get("token") == token:
+                    info = saved.get("info")
+                else:
+                    info = backend.probe()
+                    if token is not None:
+                        self._state["probes"][backend.name] = {"token": token, "info": info}
+                        self._save_state()
+            except Exception as e:
+                print(f"探测转换方式 {backend.name} 失败: {e}")
+                info = None
+
+            self._probed[backend.name] = info
+            return info
+
+    def candidates(self, path):
+        """
+        按优先顺序列出可以转换该文件的后端
+
+        Returns:
+            list: [(后端, 后端信息)]
+        """
+        result = []
+        for backend in self._backends:
+            if not backend.supports(path):
+                continue
+            info = self.capabilities(backend)
+            if info is not None:
+                result.append((backend, info))
+        result.sort(key=lambda item: item[0].priority)
+        return result
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return {"probes": dict(state.get("probes", {}))}
+        except (OSError, ValueError, AttributeError):
+            return {"probes": {}}
+
+    def _save_state(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp_path = self.state_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"保存转换方式状态失败: {e}")
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry():
+    """
+    获取进程级共享的后端注册表，包含内置的全部后端
+
+    Returns:
+        BackendRegistry: 共享实例
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = BackendRegistry()
+            for backend in (LibreOfficeBackend(), ComBackend(), PictureSlidesBackend()):
+                _default_registry.register(backend)
+        return _default_registry
@@ -0,0 +1,108 @@
+import os
+import threading
+
+# 项目自带的中文字体
+BUNDLED_FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                 "resources", "SourceHanSans.ttf")
+
+# 没有自带字体时依次尝试的系统中文字体
+SYSTEM_FONT_PATHS = (
+    # Windows 中文字体路径
+    "C:/Windows/Fonts/simhei.ttf",           # 黑体
+    "C:/Windows/Fonts/simsun.ttc",           # 宋体
+    "C:/Windows/Fonts/simkai.ttf",           # 楷体
+    "C:/Windows/Fonts/msyh.ttc",             # 微软雅黑
+    # Mac OS 中文字体路径
+    "/System/Library/Fonts/PingFang.ttc",    # 苹方
+    # Linux 中文字体路径
+    "/usr/share/fonts/truetype/arphic/uming.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+)
+
+# 找不到中文字体时使用的reportlab内置字体
+FALLBACK_FONT_NAME = "Helvetica"
+
+
+class FontRegistry:
+    """
+    进程级的字体注册表
+
+    中文字体文件很大，解析一次要明显的时间。字体路径只查找一次，TTFont 只解析并向
+    reportlab 注册一次，之后所有导出（包括不同线程中的导出）共用同一个字体对象。
+    可以在启动时于后台线程中预加载。导出时 reportlab 按文档记录实际用到的字符，
+    PDF中只嵌入这些字符的子集字体。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cjk_font_name = None
+        self._preload_thread = None
+
+    def cjk_font(self):
+        """
+        获取已注册的中文字体名称，首次调用时查找并解析字体
+
+        Returns:
+            str: 可用于绘制的字体名称，没有可用的中文字体时返回Helvetica
+        """
+        if self._cjk_font_name is not None:
+            return self._cjk_font_name
+
+        # 预加载尚未完成时在这里等待，不会重复解析
+        with self._lock:
+            if self._cjk_font_name is None:
+                self._cjk_font_name = self._register_cjk_font()
+            return self._cjk_font_name
+
+    def _register_cjk_font(self):
+        """查找、解析并注册中文字体"""
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        try:
+            if os.path.exists(BUNDLED_FONT_PATH):
+                font_name, font_file = "SourceHanSans", BUNDLED_FONT_PATH
+            else:
+                font_file = next((path for path in SYSTEM_FONT_PATHS if os.path.exists(path)), None)
+                if font_file is None:
+                    print("警告: 未找到合适的中文字体文件")
+                    return FALLBACK_FONT_NAME
+                font_name = "SimHei" if "simhei" in font_file.lower() else "ChineseFont"
+
+            pdfmetrics.registerFont(TTFont(font_name, font_file))
+            print(f"已注册中文字体: {font_name} 从 {font_file}")
+            return font_name
+        except Exception as e:
+            print(f"注册中文字体时出错: {e}")
+            return FALLBACK_FONT_NAME
+
+    def preload(self):
+        """
+        在后台线程中解析字体，首次导出时不必再等待
+
+        Returns:
+            threading.Thread: 预加载线程，字体已加载或正在加载时返回None
+        """
+        if self._cjk_font_name is not None or self._preload_thread is not None:
+            return None
+        self._preload_thread = threading.Thread(target=self.cjk_font, name="font-preload", daemon=True)
+        self._preload_thread.start()
+        return self._preload_thread
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_font_registry():
+    """
+    获取进程级共享的字体注册表
+
+    Returns:
+        FontRegistry: 共享实例
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = FontRegistry()
+        return _default_registry
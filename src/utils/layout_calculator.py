@@ -1,8 +1,91 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from src.utils.placement import slide_aspect_ratios, dominant_aspect_ratio, compute_placements
+from src.utils.layout_plan import LayoutPlan, layout_config_key, slide_labels, PLAN_CACHE_SIZE
+
+MM_PER_INCH = 25.4
+
+# A4纸张尺寸(mm)
+A4_WIDTH_MM = 210
+A4_HEIGHT_MM = 297
+
+# 默认打印分辨率
+DEFAULT_PRINT_DPI = 300
+
+# 默认布局配置（尺寸单位为mm），图形界面和命令行共用；图像编码和合并动画步骤的默认值
+# 分别见 pdf_images.DEFAULT_IMAGE_CONFIG 和 build_collapse.DEFAULT_BUILD_CONFIG
+DEFAULT_LAYOUT_CONFIG = {
+    "columns": 2, "page_width": 210, "page_height": 297,
+    "margin_left": 10, "margin_top": 10, "margin_right": 10, "margin_bottom": 10,
+    "h_spacing": 5, "v_spacing": 5, "is_landscape": True,
+    "show_ppt_numbers": True, "show_page_numbers": True,
+    "vector_mode": False, "print_dpi": DEFAULT_PRINT_DPI,
+    "target_size_mb": 0, "sharded_export": False,
+}
+
 class LayoutCalculator:
     """
     计算PPT在A4页面上的布局
     """
     
+    def __init__(self):
+        self._plans = OrderedDict()
+        # 最近一次 plan() 的幻灯片来源及其元数据，同一来源再次计划时不必逐张读取宽高比
+        self._source = None
+        self._source_token = None
+        self._source_metadata = None
+    
+    def plan(self, slide_images, config):
+        """
+        获取布局方案，布局配置和幻灯片元数据都没有变化时直接返回缓存的方案
+        
+        同一个来源对象在长度和元数据版本（来源的 metadata_version 属性，没有时为None）都不变时
+        视为元数据未变，直接使用上次读取的宽高比和原编号；图像列表应整体替换而不是原地修改。
+        
+        Args:
+            slide_images: 图像列表、幻灯片流、集合、存储或子集
+            config (dict): 布局配置
+            
+        Returns:
+            LayoutPlan: 不可变的布局方案
+        """
+        aspect_ratios, slide_numbers, metadata_key = self._slide_metadata(slide_images)
+        key = (layout_config_key(config), metadata_key)
+        
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            return plan
+        
+        layout_result = self._layout(aspect_ratios, config)
+        plan = LayoutPlan(layout_result, config,
+                          slide_labels(layout_result["placements"], layout_result["columns"], slide_numbers),
+                          key)
+        self._plans[key] = plan
+        if len(self._plans) > PLAN_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        return plan
+    
+    def _slide_metadata(self, slide_images):
+        """
+        幻灯片的宽高比、原编号和据此生成的缓存键，同一来源的元数据未变时直接复用
+        
+        Returns:
+            tuple: (宽高比数组, 原编号列表或None, 元数据缓存键)
+        """
+        token = (len(slide_images), getattr(slide_images, "metadata_version", None))
+        if slide_images is self._source and token == self._source_token:
+            return self._source_metadata
+        
+        aspect_ratios = slide_aspect_ratios(slide_images) if slide_images else np.zeros(0)
+        slide_numbers = getattr(slide_images, "slide_numbers", None)
+        metadata_key = (aspect_ratios.tobytes(), tuple(slide_numbers) if slide_numbers else None)
+        self._source, self._source_token = slide_images, token
+        self._source_metadata = (aspect_ratios, slide_numbers, metadata_key)
+        return self._source_metadata
+    
     def calculate_layout(self, slide_images, config):
         """
         计算PPT在A4页面上的最佳布局
@@ -14,64 +97,46 @@ class LayoutCalculator:
         Returns:
             字典，包含布局信息
         """
-        if not slide_images:
+        return self._layout(slide_aspect_ratios(slide_images) if slide_images else np.zeros(0), config)
+    
+    def _layout(self, aspect_ratios, config):
+        """按每张幻灯片的宽高比计算布局"""
+        if len(aspect_ratios) == 0:
             return {
                 "rows": 0,
                 "columns": config["columns"],
                 "item_width": 0,
                 "item_height": 0,
                 "pages_needed": 0,
-                "is_landscape": config.get("is_landscape", True)
+                "is_landscape": config.get("is_landscape", True),
+                "placements": compute_placements([], {"rows": 0, "columns": config["columns"]}, config)
             }
         
-        # 获取第一张幻灯片的宽高比作为参考
-        # 获取PPT图像的原始尺寸
-        sample_image = slide_images[0]
-        orig_width, orig_height = sample_image.size
-        aspect_ratio = orig_width / orig_height
-        
-        # 获取A4页面尺寸设置
-        std_page_width = 210  # A4宽度(mm)
-        std_page_height = 297  # A4高度(mm)
+        # 以出现最多的宽高比作为格子的宽高比，其余比例的幻灯片在格子内按原比例居中
+        aspect_ratio = dominant_aspect_ratio(aspect_ratios)
         
-        # 根据用户选择设置页面方向
-        is_landscape = config.get("is_landscape", True)  # 默认横向
-        
-        if is_landscape:
-            # 横向A4 (297×210mm)
-            page_width = std_page_height   # 宽度为297mm
-            page_height = std_page_width   # 高度为210mm
-        else:
-            # 纵向A4 (210×297mm)
-            page_width = std_page_width    # 宽度为210mm
-            page_height = std_page_height  # 高度为297mm
+        # 根据用户选择设置页面方向，默认横向
+        is_landscape = config.get("is_landscape", True)
+        page_width, page_height = self.page_dimensions(is_landscape)
         
         # 计算可用区域，考虑边距
         available_width = page_width - config["margin_left"] - config["margin_right"]
         available_height = page_height - config["margin_top"] - config["margin_bottom"]
         
-        # 根据列数计算每个PPT的宽度
         columns = config["columns"]
-        h_spacing = config["h_spacing"]
-        total_h_spacing = h_spacing * (columns - 1)
-        
-        # 计算PPT在页面上的最大宽度
-        item_width = (available_width - total_h_spacing) / columns
-        item_height = item_width / aspect_ratio
-        
-        # 计算能放几行
-        v_spacing = config["v_spacing"]
-        rows = int((available_height + v_spacing) / (item_height + v_spacing))
-        
-        # 确保至少有一行
-        rows = max(1, rows)
+        item_width, item_height, rows = self.grid_metrics(
+            available_width, available_height, columns,
+            config["h_spacing"], config["v_spacing"], aspect_ratio)
+        item_width = float(item_width)
+        item_height = float(item_height)
+        rows = int(rows)
         
         # 计算需要多少页
         items_per_page = rows * columns
-        total_slides = len(slide_images)
+        total_slides = len(aspect_ratios)
         pages_needed = (total_slides + items_per_page - 1) // items_per_page
         
-        return {
+        layout_result = {
             "rows": rows,
             "columns": columns,
             "item_width": item_width,
@@ -82,4 +147,63 @@ class LayoutCalculator:
             "is_landscape": is_landscape,
             "page_width": page_width,
             "page_height": page_height
-        } 
\ No newline at end of file
+        }
+        
+        # 所有幻灯片的位置一次算好，预览和导出共用
+        layout_result["placements"] = compute_placements(aspect_ratios, layout_result, config)
+        return layout_result
+    
+    @staticmethod
+    def page_dimensions(is_landscape):
+        """
+        A4页面按方向的尺寸
+        
+        Returns:
+            tuple: (宽, 高)，单位为mm；横向为297×210，纵向为210×297
+        """
+        if is_landscape:
+            return A4_HEIGHT_MM, A4_WIDTH_MM
+        return A4_WIDTH_MM, A4_HEIGHT_MM
+    
+    @staticmethod
+    def grid_metrics(available_width, available_height, columns, h_spacing, v_spacing, aspect_ratio):
+        """
+        按列数和间距计算格子尺寸和每页行数
+        
+        参数既可以是标量，也可以是形状可广播的numpy数组，布局优化器用同一公式一次评估
+        所有候选布局。
+        
+        Args:
+            available_width: 可用宽度（mm）
+            available_height: 可用高度（mm）
+            columns: 每行的幻灯片数
+            h_spacing: 水平间距（mm）
+            v_spacing: 垂直间距（mm）
+            aspect_ratio: 格子的宽高比
+            
+        Returns:
+            tuple: (格子宽度, 格子高度, 行数)，行数至少为1
+        """
+        # 根据列数计算每个PPT的最大宽度
+        item_width = (available_width - h_spacing * (columns - 1)) / columns
+        item_height = item_width / aspect_ratio
+        
+        # 计算能放几行，确保至少有一行
+        rows = np.maximum(1, np.floor((available_height + v_spacing) / (item_height + v_spacing)))
+        return item_width, item_height, rows
+    
+    @staticmethod
+    def required_pixel_size(layout_result, print_dpi=DEFAULT_PRINT_DPI):
+        """
+        计算幻灯片按布局打印时所需的像素尺寸
+        
+        Args:
+            layout_result (dict): 布局计算结果
+            print_dpi (int): 打印分辨率
+            
+        Returns:
+            tuple: (宽, 高) 像素，列数越多所需像素越少
+        """
+        width_px = layout_result["item_width"] / MM_PER_INCH * print_dpi
+        height_px = layout_result["item_height"] / MM_PER_INCH * print_dpi
+        return max(1, round(width_px)), max(1, round(height_px))
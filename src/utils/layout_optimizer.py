@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+
+from src.utils.layout_calculator import LayoutCalculator
+from src.utils.placement import slide_aspect_ratios, dominant_aspect_ratio, SLIDE_LABEL_BAND_MM
+
+# 优化目标：在幻灯片打印宽度不小于下限的前提下用最少的纸张；或在纸张数不超过预算的前提下
+# 让幻灯片尽可能大
+OBJECTIVE_MIN_SHEETS = "min_sheets"
+OBJECTIVE_MAX_AREA = "max_area"
+
+# 默认搜索范围：列数 1..MAX_COLUMNS，间距 0..MAX_SPACING mm，步长与界面的间距输入框一致
+DEFAULT_MAX_COLUMNS = 10
+DEFAULT_MAX_SPACING = 10
+DEFAULT_SPACING_STEP = 0.5
+
+# 间距下限（mm），幻灯片之间至少留出细缝，不会互相接触；显示定位标记时垂直间距还要容纳标记
+DEFAULT_MIN_SPACING = 1.0
+
+# 默认返回的候选布局数
+DEFAULT_TOP_CANDIDATES = 5
+
+
+def _candidate_grid(max_columns, h_values, v_values):
+    """所有候选参数组合，每个数组的形状为 (列数, 方向, 水平间距, 垂直间距)"""
+    return np.meshgrid(np.arange(1, max_columns + 1), np.array([True, False]),
+                       h_values, v_values, indexing="ij")
+
+
+def spacing_values(lower, upper, step):
+    """从不小于 lower 的步长整数倍开始到 upper 的间距取值，lower 超过 upper 时只取一个值"""
+    start = math.ceil(lower / step - 1e-9) * step
+    return np.arange(start, max(upper, start) + step / 2, step)
+
+
+def search_layouts(slide_count, aspect_ratio, config, objective=OBJECTIVE_MIN_SHEETS,
+                   min_slide_width=0, sheet_budget=None, max_columns=DEFAULT_MAX_COLUMNS,
+                   min_spacing=DEFAULT_MIN_SPACING, max_spacing=DEFAULT_MAX_SPACING,
+                   spacing_step=DEFAULT_SPACING_STEP, top=DEFAULT_TOP_CANDIDATES):
+    """
+    搜索列数、页面方向和间距的组合，返回最优的几个候选布局
+
+    所有组合用与 LayoutCalculator.calculate_layout 相同的公式一次向量化求值，几千个组合
+    只需几毫秒。页边距沿用当前配置。每种（列数, 方向）只保留得分最高的间距组合，
+    相同得分时优先选择与当前间距最接近的组合。当前配置显示定位标记时，垂直间距不小于
+    标记占用的高度，标记不会压到下一行的幻灯片上。
+
+    Args:
+        slide_count (int): 幻灯片数量
+        aspect_ratio (float): 格子的宽高比
+        config (dict): 当前布局配置
+        objective (str): OBJECTIVE_MIN_SHEETS 或 OBJECTIVE_MAX_AREA
+        min_slide_width (float): 幻灯片的最小打印宽度（mm）
+        sheet_budget (int, optional): 纸张数上限，不指定时不限制
+        max_columns (int): 最大列数
+        min_spacing (float): 最小间距（mm）
+        max_spacing (float): 最大间距（mm）
+        spacing_step (float): 间距步长（mm）
+        top (int): 返回的候选数
+
+    Returns:
+        list: 候选布局字典，按优劣排列，包含 config（可直接合并到布局配置的列数、方向和
+              间距）、rows、items_per_page、pages_needed、item_width、item_height；
+              没有满足条件的组合时为空列表
+    """
+    if slide_count <= 0:
+        return []
+    if objective not in (OBJECTIVE_MIN_SHEETS, OBJECTIVE_MAX_AREA):
+        print(f"未知的布局优化目标: {objective}")
+        return []
+
+    min_v_spacing = min_spacing
+    if config.get("show_ppt_numbers", True):
+        min_v_spacing = max(min_v_spacing, SLIDE_LABEL_BAND_MM)
+    h_values = spacing_values(min_spacing, max_spacing, spacing_step)
+    v_values = spacing_values(min_v_spacing, max_spacing, spacing_step)
+    columns, is_landscape, h_spacing, v_spacing = (
+        a.ravel() for a in _candidate_grid(max_columns, h_values, v_values))
+
+    landscape_size = LayoutCalculator.page_dimensions(True)
+    portrait_size = LayoutCalculator.page_dimensions(False)
+    page_width = np.where(is_landscape, landscape_size[0], portrait_size[0])
+    page_height = np.where(is_landscape, landscape_size[1], portrait_size[1])
+    available_width = page_width - config["margin_left"] - config["margin_right"]
+    available_height = page_height - config["margin_top"] - config["margin_bottom"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        item_width, item_height, rows = LayoutCalculator.grid_metrics(
+            available_width, available_height, columns, h_spacing, v_spacing, aspect_ratio)
+    rows = rows.astype(np.int64)
+    items_per_page = rows * columns
+    pages_needed = -(-slide_count // items_per_page)
+
+    # 格子必须有宽度且能完整放进页面；calculate_layout 总会至少放一行，这里排除超出页面的组合
+    feasible = (item_width > 0) & (item_height <= available_height) & (item_width >= min_slide_width)
+    if sheet_budget:
+        feasible &= pages_needed <= sheet_budget
+    candidates = np.flatnonzero(feasible)
+    if len(candidates) == 0:
+        return []
+
+    area = (item_width * item_height)[candidates]
+    pages = pages_needed[candidates]
+    distance = (np.abs(h_spacing - config["h_spacing"]) + np.abs(v_spacing - config["v_spacing"]))[candidates]
+    # np.lexsort 以最后一个键为主键
+    if objective == OBJECTIVE_MIN_SHEETS:
+        order = np.lexsort((distance, -area, pages))
+    else:
+        order = np.lexsort((distance, pages, -area))
+    ranked = candidates[order]
+
+    # 每种（列数, 方向）只保留排在最前的组合，候选之间才有实际差别
+    group = columns[ranked] * 2 + is_landscape[ranked]
+    _, first = np.unique(group, return_index=True)
+    best = ranked[np.sort(first)[:top]]
+
+    return [{
+        "config": {
+            "columns": int(columns[i]),
+            "is_landscape": bool(is_landscape[i]),
+            "h_spacing": float(h_spacing[i]),
+            "v_spacing": float(v_spacing[i]),
+        },
+        "rows": int(rows[i]),
+        "items_per_page": int(items_per_page[i]),
+        "pages_needed": int(pages_needed[i]),
+        "item_width": float(item_width[i]),
+        "item_height": float(item_height[i]),
+    } for i in best]
+
+
+def optimize_layout(slide_images, config, **options):
+    """
+    按幻灯片的数量和主要宽高比搜索候选布局，不解码图像
+
+    Args:
+        slide_images: 图像列表、幻灯片流、集合、存储或子集
+        config (dict): 当前布局配置
+        **options: 传给 search_layouts 的搜索选项
+
+    Returns:
+        list: 候选布局，见 search_layouts
+    """
+    if not slide_images:
+        return []
+    aspect_ratio = dominant_aspect_ratio(slide_aspect_ratios(slide_images))
+    return search_layouts(len(slide_images), aspect_ratio, config, **options)
+
+
+def describe_candidate(candidate):
+    """
+    候选布局的简短说明
+
+    Returns:
+        str: 例如「横向 3列×4行，间距 2.0/1.5mm，宽 88.3mm，共 9 张纸」
+    """
+    layout = candidate["config"]
+    orientation = "横向" if layout["is_landscape"] else "纵向"
+    return (f"{orientation} {layout['columns']}列×{candidate['rows']}行，"
+            f"间距 {layout['h_spacing']:.1f}/{layout['v_spacing']:.1f}mm，"
+            f"宽 {candidate['item_width']:.1f}mm，共 {candidate['pages_needed']} 张纸")
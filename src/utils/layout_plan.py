@@ -0,0 +1,95 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# 影响布局几何的配置项，只有这些项变化时布局方案才需要重新计算
+LAYOUT_CONFIG_KEYS = ("columns", "is_landscape", "margin_left", "margin_top", "margin_right", "margin_bottom",
+                      "h_spacing", "v_spacing")
+
+# 每个布局计算器缓存的布局方案数，来回切换设置时不必重新计算
+PLAN_CACHE_SIZE = 8
+
+
+def layout_config_key(config):
+    """布局配置中影响几何的部分，可作为字典键"""
+    return tuple((key, config.get(key)) for key in LAYOUT_CONFIG_KEYS)
+
+
+def slide_labels(placements, columns, slide_numbers=None):
+    """
+    每张幻灯片的定位标记
+
+    Args:
+        placements (numpy.ndarray): 布局表
+        columns (int): 每行的幻灯片数
+        slide_numbers (list, optional): 各幻灯片在原演示文稿中的编号，给出时附在标记后
+
+    Returns:
+        tuple: 按幻灯片顺序排列的标记，格式为"纸张序号-位置号"，如"3-5"或"3-5  P12"
+    """
+    positions = placements["row"] * columns + placements["column"] + 1
+    labels = [f"{sheet}-{pos}" for sheet, pos in zip((placements["sheet"] + 1).tolist(), positions.tolist())]
+    if slide_numbers:
+        labels = [f"{label}  P{number}" for label, number in zip(labels, slide_numbers)]
+    return tuple(labels)
+
+
+class LayoutPlan(Mapping):
+    """
+    不可变的布局方案
+
+    包含布局计算结果（行列数、格子尺寸、纸张尺寸和页数）、所有幻灯片的位置表、定位标记和
+    计算时使用的布局配置。按布局配置和幻灯片元数据（数量、宽高比、原编号）缓存，预览、导出、
+    AI提示词和命令行共用同一个方案，各处的布局不会不一致。
+
+    可以像布局计算结果字典一样按键读取，但不能修改；位置表为只读数组。
+    """
+
+    __slots__ = ("_fields", "config", "labels", "key")
+
+    def __init__(self, fields, config, labels, key=None):
+        """
+        Args:
+            fields (dict): 布局计算结果
+            config (dict): 计算时使用的布局配置，只保留影响几何的项
+            labels (tuple): 每张幻灯片的定位标记
+            key (tuple, optional): 缓存键
+        """
+        fields = dict(fields)
+        if fields.get("placements") is not None:
+            fields["placements"].setflags(write=False)
+        object.__setattr__(self, "_fields", MappingProxyType(fields))
+        object.__setattr__(self, "config", MappingProxyType({name: config.get(name) for name in LAYOUT_CONFIG_KEYS}))
+        object.__setattr__(self, "labels", tuple(labels))
+        object.__setattr__(self, "key", key)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LayoutPlan 不可修改")
+
+    def __delattr__(self, name):
+        raise AttributeError("LayoutPlan 不可修改")
+
+    def __reduce__(self):
+        # 分段导出时需要传给工作进程
+        return LayoutPlan, (dict(self._fields), dict(self.config), self.labels, self.key)
+
+    def __getitem__(self, name):
+        return self._fields[name]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return (f"LayoutPlan(rows={self['rows']}, columns={self['columns']}, "
+                f"pages_needed={self['pages_needed']}, slides={len(self.labels)})")
+
+    @property
+    def placements(self):
+        """布局表，见 placement.compute_placements"""
+        return self._fields["placements"]
+
+    @property
+    def slide_count(self):
+        return len(self.labels)
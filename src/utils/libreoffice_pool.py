@@ -0,0 +1,584 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import socket
+import atexit
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 由可以导入 uno 的Python解释器运行的桥接脚本
+UNO_BRIDGE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uno_bridge.py")
+
+
+def find_soffice_path():
+    """
+    查找LibreOffice/OpenOffice的可执行文件
+
+    Returns:
+        str: soffice路径，未找到时返回None
+    """
+    if sys.platform == "win32":
+        candidates = [
+            "C:\\Program Files\\LibreOffice\\program\\soffice.exe",
+            "C:\\Program Files (x86)\\LibreOffice\\program\\soffice.exe",
+            "C:\\Program Files\\OpenOffice\\program\\soffice.exe",
+            "C:\\Program Files (x86)\\OpenOffice\\program\\soffice.exe",
+        ]
+    elif sys.platform == "darwin":
+        candidates = ["/Applications/LibreOffice.app/Contents/MacOS/soffice"]
+    else:
+        candidates = []
+
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+
+    # 在Linux/Mac上尝试直接使用命令
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+def _find_free_port():
+    """获取一个本地空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _has_output(path):
+    """输出文件存在且非空"""
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def _uno_available():
+    """检查当前Python环境是否可以导入LibreOffice的UNO桥"""
+    try:
+        import uno  # type: ignore # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def _can_import_uno(python_path):
+    """检查指定的Python解释器能否导入 uno"""
+    try:
+        result = subprocess.run([python_path, "-c", "import uno"], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, timeout=30)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+
+def find_uno_python(soffice_path):
+    """
+    查找可以导入 uno 的Python解释器：LibreOffice自带的Python，或安装了 python3-uno 的系统Python
+
+    Args:
+        soffice_path (str): soffice可执行文件路径
+
+    Returns:
+        str: 解释器路径，未找到时返回None
+    """
+    program_dir = os.path.dirname(os.path.realpath(soffice_path))
+    candidates = [
+        os.path.join(program_dir, "python.exe"),                     # Windows
+        os.path.join(program_dir, "python"),                         # Linux官方安装包
+        os.path.join(os.path.dirname(program_dir), "Resources", "python"),  # macOS
+        shutil.which("python3"),                                     # Linux发行版的 python3-uno
+    ]
+    for path in candidates:
+        if path and os.path.isfile(path) and _can_import_uno(path):
+            return path
+    return None
+
+
+class LibreOfficeInstance:
+    """
+    单个无界面LibreOffice实例，拥有独立的用户配置目录
+
+    实例有三种运行方式：
+    - 当前Python可以导入 uno：常驻进程，在本进程中通过UNO发送转换任务；
+    - 指定了 bridge_python：常驻进程，由该解释器运行 uno_bridge.py 转发转换任务；
+    - 两者都没有：不是常驻进程，每个任务都冷启动一次 soffice --convert-to，
+      只复用已初始化的配置目录，省去首次创建用户配置的开销。
+    """
+
+    def __init__(self, soffice_path, profile_dir, use_uno=True, startup_timeout=60, bridge_python=None):
+        """
+        Args:
+            soffice_path (str): soffice可执行文件路径
+            profile_dir (str): 该实例独占的用户配置目录
+            use_uno (bool): 是否在本进程中使用UNO
+            startup_timeout (int): 等待实例启动的最长秒数
+            bridge_python (str, optional): 运行桥接脚本的Python解释器，use_uno为False时使用
+        """
+        self.soffice_path = soffice_path
+        self.profile_dir = profile_dir
+        self.use_uno = use_uno
+        self.startup_timeout = startup_timeout
+        self.bridge_python = None if use_uno else bridge_python
+
+        self.process = None
+        self.port = None
+        self.jobs_done = 0
+        self._desktop = None
+        self._bridge = None
+
+    @property
+    def resident(self):
+        """实例是否以常驻进程方式运行"""
+        return self.use_uno or self.bridge_python is not None
+
+    @property
+    def profile_url(self):
+        """-env:UserInstallation 需要的配置目录URL"""
+        return Path(self.profile_dir).resolve().as_uri()
+
+    def start(self):
+        """启动实例（常驻模式下启动监听进程并建立连接）"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.jobs_done = 0
+
+        if not self.resident:
+            return
+
+        self.port = _find_free_port()
+        cmd = [
+            self.soffice_path,
+            f"-env:UserInstallation={self.profile_url}",
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--nodefault",
+            "--norestore",
+            "--nolockcheck",
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext",
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        if self.bridge_python is not None:
+            self._start_bridge()
+            return
+
+        # 等待实例开始监听并连接UNO桥
+        deadline = time.time() + self.startup_timeout
+        last_error = None
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"LibreOffice实例启动后立即退出，返回码: {self.process.returncode}")
+            try:
+                self._desktop = self._connect()
+                return
+            except Exception as e:
+                last_error = e
+                time.sleep(0.25)
+
+        self.stop()
+        raise RuntimeError(f"等待LibreOffice实例启动超时: {last_error}")
+
+    def _start_bridge(self):
+        """启动桥接进程，由它等待实例开始监听并建立连接"""
+        self._bridge = subprocess.Popen(
+            [self.bridge_python, UNO_BRIDGE_SCRIPT, str(self.port), str(self.startup_timeout)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8"
+        )
+        reply = self._bridge_reply()
+        if not reply.get("ok"):
+            self.stop()
+            raise RuntimeError(f"LibreOffice实例启动失败: {reply.get('error')}")
+
+    def _bridge_reply(self):
+        """读取桥接进程的一行结果，进程已退出时返回失败"""
+        line = self._bridge.stdout.readline()
+        if not line:
+            return {"ok": False, "error": "桥接进程已退出"}
+        return json.loads(line)
+
+    def _bridge_call(self, command):
+        """向桥接进程发送一条命令并等待结果"""
+        if self._bridge is None or self._bridge.poll() is not None:
+            return {"ok": False, "error": "桥接进程未运行"}
+        try:
+            self._bridge.stdin.write(json.dumps(command) + "\n")
+            self._bridge.stdin.flush()
+        except OSError as e:
+            return {"ok": False, "error": str(e)}
+        return self._bridge_reply()
+
+    def _connect(self):
+        """通过UNO连接到常驻实例，返回Desktop对象"""
+        import uno  # type: ignore
+
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        ctx = resolver.resolve(
+            f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        )
+        return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def is_healthy(self):
+        """
+        健康检查
+
+        Returns:
+            bool: 实例是否可以继续接收任务
+        """
+        if not self.resident:
+            return os.path.isdir(self.profile_dir)
+
+        if self.process is None or self.process.poll() is not None:
+            return False
+        if self.bridge_python is not None:
+            return bool(self._bridge_call({"cmd": "ping"}).get("ok"))
+        if self._desktop is None:
+            return False
+        try:
+            # 一次轻量的UNO调用，确认进程仍在响应
+            self._desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def stop(self):
+        """停止实例"""
+        if self._bridge is not None:
+            self._bridge_call({"cmd": "terminate"})
+            try:
+                self._bridge.stdin.close()
+                self._bridge.wait(timeout=5)
+            except Exception:
+                self._bridge.kill()
+            self._bridge = None
+
+        if self._desktop is not None:
+            try:
+                self._desktop.terminate()
+            except Exception:
+                pass
+            self._desktop = None
+
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except Exception:
+                self.kill()
+            self.process = None
+
+    def kill(self):
+        """强制结束实例进程（用于超时或卡死的任务）"""
+        for process in (self.process, self._bridge):
+            if process is not None and process.poll() is None:
+                try:
+                    process.kill()
+                except Exception:
+                    pass
+
+    def restart(self, reset_profile=False):
+        """
+        重启实例
+
+        Args:
+            reset_profile (bool): 是否同时清空配置目录（崩溃后配置可能已损坏）
+        """
+        self.stop()
+        if reset_profile:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+        self.start()
+
+    def convert(self, input_path, output_path, timeout=120):
+        """
+        将文档转换为PDF
+
+        Args:
+            input_path (str): 输入文件路径
+            output_path (str): 输出PDF路径
+            timeout (int): 单个任务的超时秒数
+
+        Returns:
+            bool: 是否成功
+        """
+        if self.bridge_python is not None:
+            ok = self._convert_via_bridge(input_path, output_path, timeout)
+        elif self.use_uno:
+            ok = self._convert_via_uno(input_path, output_path, timeout)
+        else:
+            ok = self._convert_via_cli(input_path, output_path, timeout)
+        self.jobs_done += 1
+        return ok
+
+    def _convert_via_uno(self, input_path, output_path, timeout):
+        import uno  # type: ignore
+        from com.sun.star.beans import PropertyValue  # type: ignore
+
+        def props(**kwargs):
+            values = []
+            for name, value in kwargs.items():
+                prop = PropertyValue()
+                prop.Name = name
+                prop.Value = value
+                values.append(prop)
+            return tuple(values)
+
+        # 超时后直接结束进程，阻塞中的UNO调用会随之抛出异常
+        watchdog = threading.Timer(timeout, self.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            doc = self._desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+                props(Hidden=True, ReadOnly=True)
+            )
+            if doc is None:
+                return False
+            try:
+                doc.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                    props(FilterName="impress_pdf_Export")
+                )
+            finally:
+                doc.close(True)
+        finally:
+            watchdog.cancel()
+
+        # 输出文件由调用方预先创建，只检查存在与否无法判断是否导出成功
+        return _has_output(output_path)
+
+    def _convert_via_bridge(self, input_path, output_path, timeout):
+        # 超时后结束实例和桥接进程，阻塞中的读取随之返回
+        watchdog = threading.Timer(timeout, self.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            reply = self._bridge_call({"cmd": "convert", "input": os.path.abspath(input_path),
+                                       "output": os.path.abspath(output_path)})
+        finally:
+            watchdog.cancel()
+
+        if not reply.get("ok"):
+            print(f"LibreOffice转换失败: {reply.get('error', '未能打开文档')}")
+            return False
+        return _has_output(output_path)
+
+    def _convert_via_cli(self, input_path, output_path, timeout):
+        # 每个任务使用独立的输出目录，避免并发任务的同名输出互相覆盖
+        out_dir = tempfile.mkdtemp(prefix="job_", dir=os.path.dirname(self.profile_dir))
+        try:
+            cmd = [
+                self.soffice_path,
+                f"-env:UserInstallation={self.profile_url}",
+                "--headless",
+                "--norestore",
+                "--convert-to", "pdf",
+                "--outdir", out_dir,
+                input_path
+            ]
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+            if result.returncode != 0:
+                print(f"LibreOffice转换失败: {result.stderr.decode(errors='ignore')}")
+                return False
+
+            expected_output = os.path.join(
+                out_dir, os.path.splitext(os.path.basename(input_path))[0] + ".pdf"
+            )
+            if not _has_output(expected_output):
+                return False
+            shutil.move(expected_output, output_path)
+            return _has_output(output_path)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+
+class LibreOfficePool:
+    """
+    LibreOffice转换进程池
+
+    每个实例拥有独立的 -env:UserInstallation 配置目录，可以并发转换多个文档。
+    当前Python可以导入 uno，或者找到了LibreOffice自带的（可以导入 uno 的）Python时，
+    实例在首次使用时启动并常驻，任务前进行健康检查，崩溃或累计处理
+    max_jobs_per_instance 个任务后自动重启。两者都没有时，每个任务都冷启动一次soffice，
+    并发仍然有效，但没有常驻进程带来的启动加速。
+    """
+
+    def __init__(self, size=None, max_jobs_per_instance=50, job_timeout=120, soffice_path=None):
+        """
+        Args:
+            size (int, optional): 实例数量，默认按CPU核数推算
+            max_jobs_per_instance (int): 单个实例处理多少任务后重启
+            job_timeout (int): 单个任务的超时秒数
+            soffice_path (str, optional): soffice路径，默认自动查找
+        """
+        self.size = size or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.max_jobs_per_instance = max_jobs_per_instance
+        self.job_timeout = job_timeout
+        self.soffice_path = soffice_path or find_soffice_path()
+        self.use_uno = _uno_available()
+        self.bridge_python = None
+
+        self._base_dir = None
+        self._executor = None
+        self._idle = queue.Queue()
+        self._instances = []
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """是否找到了LibreOffice"""
+        return bool(self.soffice_path)
+
+    def _ensure_started(self):
+        """按需创建实例与线程池"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            if not self.use_uno:
+                self.bridge_python = find_uno_python(self.soffice_path)
+                if self.bridge_python is None:
+                    print("未找到可以导入uno的Python，LibreOffice将为每个任务单独启动，不保持常驻")
+            self._base_dir = tempfile.mkdtemp(prefix="ppt_tool_lo_")
+            for i in range(self.size):
+                instance = LibreOfficeInstance(
+                    self.soffice_path,
+                    os.path.join(self._base_dir, f"profile_{i}"),
+                    use_uno=self.use_uno,
+                    bridge_python=self.bridge_python
+                )
+                self._instances.append(instance)
+                self._idle.put(instance)
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="lo_pool")
+
+    def warm_up(self):
+        """
+        在后台预先启动所有实例
+
+        Returns:
+            list: 每个实例的启动Future
+        """
+        if not self.available:
+            return []
+        self._ensure_started()
+        return [self._executor.submit(self._run_job, None, None) for _ in range(self.size)]
+
+    def submit(self, input_path, output_path):
+        """
+        提交一个转换任务
+
+        Args:
+            input_path (str): 输入文件路径
+            output_path (str): 输出PDF路径
+
+        Returns:
+            concurrent.futures.Future: 结果为bool，表示是否成功
+        """
+        if not self.available:
+            raise RuntimeError("未找到LibreOffice/OpenOffice")
+        self._ensure_started()
+        return self._executor.submit(self._run_job, input_path, output_path)
+
+    def wait(self, futures, timeout=None):
+        """
+        等待一组任务完成
+
+        Args:
+            futures (list): submit 返回的Future列表
+            timeout (float, optional): 每个任务的最长等待秒数
+
+        Returns:
+            list: 与futures一一对应的结果，失败的任务为False
+        """
+        results = []
+        for future in futures:
+            try:
+                results.append(bool(future.result(timeout=timeout)))
+            except Exception as e:
+                print(f"LibreOffice转换出错: {e}")
+                results.append(False)
+        return results
+
+    def convert(self, input_path, output_path):
+        """
+        同步转换单个文件
+
+        Returns:
+            bool: 是否成功
+        """
+        if not self.available:
+            print("未找到LibreOffice/OpenOffice")
+            return False
+        return self.wait([self.submit(input_path, output_path)])[0]
+
+    def _run_job(self, input_path, output_path):
+        """在线程池中执行：取出空闲实例、检查健康状态并执行转换"""
+        instance = self._idle.get()
+        try:
+            if not instance.is_healthy():
+                instance.restart(reset_profile=instance.jobs_done > 0)
+
+            # 仅用于预热
+            if input_path is None:
+                return True
+
+            try:
+                ok = instance.convert(input_path, output_path, timeout=self.job_timeout)
+            except Exception as e:
+                print(f"LibreOffice实例处理任务失败，准备重启: {e}")
+                self._restart_instance(instance, reset_profile=True)
+                return False
+
+            # 重启失败不影响已完成任务的结果，下一个任务取出该实例时会检查健康状态
+            if instance.jobs_done >= self.max_jobs_per_instance:
+                self._restart_instance(instance)
+            return ok
+        finally:
+            self._idle.put(instance)
+
+    @staticmethod
+    def _restart_instance(instance, reset_profile=False):
+        """重启实例，失败时只记录错误"""
+        try:
+            instance.restart(reset_profile=reset_profile)
+        except Exception as e:
+            print(f"重启LibreOffice实例失败: {e}")
+
+    def shutdown(self):
+        """停止所有实例并清理配置目录"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for instance in self._instances:
+                instance.stop()
+            self._instances = []
+            self._idle = queue.Queue()
+            if self._base_dir:
+                shutil.rmtree(self._base_dir, ignore_errors=True)
+                self._base_dir = None
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool(soffice_path=None):
+    """
+    获取进程级共享的LibreOffice进程池
+
+    Args:
+        soffice_path (str, optional): 已探测到的soffice路径，仅在首次创建时使用
+
+    Returns:
+        LibreOfficePool: 共享实例，程序退出时自动关闭
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = LibreOfficePool(soffice_path=soffice_path)
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
@@ -0,0 +1,124 @@
+import os
+import copy
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils.pdf_images import EncodedImageCache, DEFAULT_JPEG_QUALITY
+
+# 每个任务处理的幻灯片数：太小时进程间往返开销占比高，太大时首批结果出来得慢
+ENCODE_BATCH_SIZE = 4
+
+# 幻灯片少于该数量时直接在当前线程编码，启动进程池反而更慢
+PARALLEL_ENCODE_MIN_SLIDES = 16
+
+# 工作进程内的编码缓存，同一进程先后处理的批次共享，重复的幻灯片只编码一次
+_process_caches = {}
+
+
+def _process_cache(compression, jpeg_quality):
+    key = (compression, jpeg_quality)
+    if key not in _process_caches:
+        _process_caches.clear()
+        _process_caches[key] = EncodedImageCache(compression, jpeg_quality)
+    return _process_caches[key]
+
+
+def iter_encoded_range(source, first, last, dpi=None, compression="auto", jpeg_quality=DEFAULT_JPEG_QUALITY,
+                       cache=None):
+    """
+    逐张取出 [first, last) 范围内的幻灯片并编码
+
+    在工作进程中执行：幻灯片源只通过路径等轻量信息传入，像素在进程内栅格化或读取。
+
+    Args:
+        source: 可序列化的幻灯片源（PDFSlideStream、SlideCollection 或 SlideStore）
+        first (int): 起始索引
+        last (int): 结束索引（不包含）
+        dpi (int, optional): 目标分辨率
+        compression (str): 图像压缩方式
+        jpeg_quality (int): JPEG质量
+        cache (EncodedImageCache, optional): 编码缓存，默认使用本进程共享的缓存
+
+    Yields:
+        EncodedImage: 编码结果，单张编码失败时为None
+    """
+    if hasattr(source, "workers"):
+        # 已经按进程并行，进程内不再启动多个poppler
+        source = copy.copy(source)
+        source.workers = 1
+
+    if cache is None:
+        cache = _process_cache(compression, jpeg_quality)
+
+    for offset, image in enumerate(source.iter_images(first, last, dpi=dpi)):
+        try:
+            yield cache.encode(image)
+        except Exception as e:
+            print(f"编码幻灯片 {first + offset + 1} 时出错: {e}")
+            yield None
+
+
+def encode_batch(source, first, last, dpi=None, compression="auto", jpeg_quality=DEFAULT_JPEG_QUALITY,
+                 cache=None):
+    """
+    取出 [first, last) 范围内的幻灯片并逐张编码，参数同 iter_encoded_range
+
+    Returns:
+        list: 按顺序排列的 EncodedImage，单张编码失败时对应位置为None
+    """
+    return list(iter_encoded_range(source, first, last, dpi, compression, jpeg_quality, cache))
+
+
+def iter_encoded_images(source, dpi=None, compression="auto", jpeg_quality=DEFAULT_JPEG_QUALITY,
+                        workers=None, batch_size=ENCODE_BATCH_SIZE, start=0, stop=None):
+    """
+    在进程池中并行栅格化和编码幻灯片，按幻灯片顺序产出编码结果
+
+    同时在途的任务数有上限，已编码的数据按顺序交给调用方后即可释放，内存占用不随幻灯片数增长。
+    某个任务失败时在当前进程中重做该批次。
+
+    Args:
+        source: 可序列化的幻灯片源
+        dpi (int, optional): 目标分辨率
+        compression (str): 图像压缩方式
+        jpeg_quality (int): JPEG质量
+        workers (int, optional): 进程数，默认等于CPU核数
+        batch_size (int): 每个任务的幻灯片数
+        start (int): 起始索引
+        stop (int, optional): 结束索引（不包含）
+
+    Yields:
+        EncodedImage: 编码结果，单张失败时为None
+    """
+    stop = len(source) if stop is None else stop
+    workers = max(1, workers or os.cpu_count() or 1)
+    ranges = iter([(first, min(first + batch_size, stop)) for first in range(start, stop, batch_size)])
+
+    # 使用spawn：图形界面进程中有多个线程，fork可能导致子进程死锁
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    pending = deque()
+    # 个别批次在当前进程中重做时使用
+    local_cache = EncodedImageCache(compression, jpeg_quality)
+
+    def submit_next():
+        batch = next(ranges, None)
+        if batch is not None:
+            future = executor.submit(encode_batch, source, batch[0], batch[1], dpi, compression, jpeg_quality)
+            pending.append((batch, future))
+
+    try:
+        for _ in range(workers * 2):
+            submit_next()
+
+        while pending:
+            (first, last), future = pending.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"并行编码第 {first + 1}-{last} 张幻灯片失败，改为在当前进程中编码: {e}")
+                results = encode_batch(source, first, last, dpi, compression, jpeg_quality, local_cache)
+            submit_next()
+            yield from results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,554 @@
+import io
+import os
+import zlib
+import struct
+import hashlib
+import functools
+from collections import OrderedDict
+
+# 图像压缩方式：auto 按图像内容选择，lossless 全部无损，jpeg 全部有损
+COMPRESSION_MODES = ("auto", "lossless", "jpeg")
+DEFAULT_JPEG_QUALITY = 90
+
+# 图像编码相关配置项的默认值，与 DEFAULT_LAYOUT_CONFIG 合并后作为完整的导出配置
+DEFAULT_IMAGE_CONFIG = {"image_compression": "auto", "jpeg_quality": DEFAULT_JPEG_QUALITY}
+
+# 判断图像是否为照片类内容时的采样边长和颜色数阈值
+SAMPLE_SIZE = 64
+FLAT_MAX_COLORS = 512
+
+# 按像素内容缓存的编码结果总量上限（字节）
+ENCODE_CACHE_BYTES = 64 * 1024 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG颜色类型与PDF颜色空间的对应关系（灰度和RGB只处理8位，调色板支持1/2/4/8位；均不含透明）
+_PNG_COLOR_TYPES = {0: ("DeviceGray", 1), 2: ("DeviceRGB", 3)}
+_PNG_PALETTE_TYPE = 3
+_MODE_COLOR_SPACES = {"L": "DeviceGray", "RGB": "DeviceRGB"}
+
+# 颜色数不超过该值的图像按调色板（Indexed）存储，每像素只占1字节或更少
+PALETTE_MAX_COLORS = 256
+
+# 图像info中带有该键时表示来自本程序写出的中间栅格（栅格缓存、溢出文件），这些文件为求写入快
+# 只做了低级别压缩，不复用其文件数据
+INTERMEDIATE_RASTER_KEY = "ppt_tool_intermediate"
+
+
+class EncodedImage:
+    """
+    已编码、可直接写入PDF的图像流
+
+    保存图像流的数据和字典参数，写入PDF时不再做任何压缩。
+    """
+
+    __slots__ = ("width", "height", "color_space", "bits_per_component",
+                 "filters", "decode_parms", "data", "_key")
+
+    def __init__(self, width, height, color_space, filters, data,
+                 decode_parms=None, bits_per_component=8):
+        """
+        Args:
+            width (int): 像素宽度
+            height (int): 像素高度
+            color_space (str | tuple): PDF颜色空间，如 DeviceRGB；调色板图像为
+                ("Indexed", 基础颜色空间, 最大索引, 调色板字节)
+            filters (tuple): 解码过滤器，如 ("DCTDecode",)
+            data (bytes): 编码后的流数据
+            decode_parms (dict, optional): 过滤器参数（如PNG预测器）
+            bits_per_component (int): 每个颜色分量的位数
+        """
+        self.width = width
+        self.height = height
+        self.color_space = color_space
+        self.bits_per_component = bits_per_component
+        self.filters = tuple(filters)
+        self.decode_parms = decode_parms
+        self.data = data
+        self._key = None
+
+    @property
+    def key(self):
+        """按编码结果计算的摘要，内容相同的图像摘要相同"""
+        if self._key is None:
+            hasher = hashlib.md5(self.data)
+            hasher.update(f"{self.width}x{self.height}/{self.color_space}/{self.filters}".encode("ascii"))
+            self._key = hasher.hexdigest()
+        return self._key
+
+    @property
+    def filter_name(self):
+        """主过滤器的简称，用于日志和统计"""
+        return self.filters[0].replace("Decode", "") if self.filters else "None"
+
+
+def _read_png_chunks(data):
+    """
+    解析PNG数据块
+
+    Returns:
+        tuple: (IHDR字段, 合并后的IDAT数据, 出现过的数据块类型集合, 调色板数据)，不是PNG时返回None
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    pos = len(PNG_SIGNATURE)
+    header = None
+    idat = []
+    types = set()
+    palette = None
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        types.add(chunk_type)
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        elif chunk_type == b"PLTE":
+            palette = body
+        elif chunk_type == b"IEND":
+            break
+        pos += 12 + length
+    if header is None or not idat:
+        return None
+    return header, b"".join(idat), types, palette
+
+
+def png_to_encoded(data):
+    """
+    直接复用PNG的压缩数据（IDAT）作为带PNG预测器的Flate流，不解压也不重新压缩
+
+    Args:
+        data (bytes): PNG文件内容
+
+    Returns:
+        EncodedImage: 编码结果，PNG带透明、隔行，或灰度/RGB不是8位时返回None
+    """
+    parsed = _read_png_chunks(data)
+    if parsed is None:
+        return None
+    (width, height, bit_depth, color_type, _, _, interlace), idat, types, palette = parsed
+    if interlace != 0 or b"tRNS" in types:
+        return None
+
+    if color_type == _PNG_PALETTE_TYPE and palette:
+        color_space = ("Indexed", "DeviceRGB", len(palette) // 3 - 1, palette)
+        colors = 1
+    elif color_type in _PNG_COLOR_TYPES and bit_depth == 8:
+        color_space, colors = _PNG_COLOR_TYPES[color_type]
+    else:
+        return None
+
+    decode_parms = {"Predictor": 15, "Colors": colors, "BitsPerComponent": bit_depth, "Columns": width}
+    return EncodedImage(width, height, color_space, ("FlateDecode",), idat,
+                        decode_parms=decode_parms, bits_per_component=bit_depth)
+
+
+def jpeg_to_encoded(data, mode, size):
+    """
+    直接把JPEG数据作为DCTDecode流使用
+
+    Args:
+        data (bytes): JPEG文件内容
+        mode (str): 图像的颜色模式
+        size (tuple): 像素尺寸
+
+    Returns:
+        EncodedImage: 编码结果，颜色模式不是灰度或RGB时返回None
+    """
+    if mode not in _MODE_COLOR_SPACES:
+        return None
+    width, height = size
+    return EncodedImage(width, height, _MODE_COLOR_SPACES[mode], ("DCTDecode",), data)
+
+
+def mark_intermediate(image):
+    """
+    标记图像来自本程序写出的中间栅格，编码时重新压缩而不是复用文件数据
+
+    Returns:
+        PIL.Image.Image: 同一图像
+    """
+    image.info[INTERMEDIATE_RASTER_KEY] = True
+    return image
+
+
+def _source_file_passthrough(image):
+    """
+    图像直接由用户提供的JPEG/PNG文件打开且未经修改时，复用文件中的压缩数据
+
+    Returns:
+        EncodedImage: 编码结果，不能复用时返回None
+    """
+    path = getattr(image, "filename", None)
+    if image.info.get(INTERMEDIATE_RASTER_KEY):
+        return None
+    if image.format not in ("JPEG", "PNG") or not path or not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    if image.format == "JPEG":
+        return jpeg_to_encoded(data, image.mode, image.size)
+    encoded = png_to_encoded(data)
+    if encoded is not None and (encoded.width, encoded.height) != image.size:
+        return None
+    return encoded
+
+
+def _passthrough_allowed(encoded, image, compression):
+    """
+    源文件数据的编码方式是否符合要求：无损模式不用JPEG，JPEG模式不用PNG；
+    自动模式下PNG数据只有在内容分析也会选择真彩色或调色板Flate时才复用，
+    照片类内容改用JPEG，颜色少的真彩色图像改用调色板或灰度
+    """
+    if encoded is None:
+        return False
+    if compression == "lossless":
+        return encoded.filters != ("DCTDecode",)
+    if compression == "jpeg":
+        return encoded.filters == ("DCTDecode",)
+    if encoded.filters == ("DCTDecode",) or image.mode == "P":
+        return True
+    return not is_photographic(image) and reduce_colors(image) is image
+
+
+def is_photographic(image):
+    """
+    粗略判断图像是否为照片类内容：缩小采样后颜色数很多的视为照片
+
+    纯色块、文字和线条为主的幻灯片颜色很少，适合无损压缩；照片和渐变适合JPEG。
+    """
+    sample = image.convert("RGB").resize((SAMPLE_SIZE, SAMPLE_SIZE), resample=0)
+    return sample.getcolors(maxcolors=FLAT_MAX_COLORS) is None
+
+
+def encode_image(image, compression="auto", jpeg_quality=DEFAULT_JPEG_QUALITY, compress_level=6):
+    """
+    将图像编码为可直接写入PDF的图像流，每张图像只编码一次
+
+    能复用源文件压缩数据时直接复用；否则按压缩方式和图像内容选择DCT或Flate。
+
+    Args:
+        image (PIL.Image.Image): 图像
+        compression (str): 压缩方式，见 COMPRESSION_MODES
+        jpeg_quality (int): JPEG质量
+        compress_level (int): Flate压缩级别
+
+    Returns:
+        EncodedImage: 编码结果
+    """
+    encoded = _source_file_passthrough(image)
+    if _passthrough_allowed(encoded, image, compression):
+        return encoded
+    return _encode_pixels(image, compression, jpeg_quality, compress_level)
+
+
+def strip_alpha(image):
+    """
+    去掉透明通道：完全不透明时直接丢弃，否则合成到白色背景上
+
+    幻灯片最终印在白纸上，保留透明通道只会让PDF多出一个SMask。
+
+    Returns:
+        PIL.Image.Image: 灰度或RGB图像
+    """
+    from PIL import Image
+
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA"):
+        alpha = image.getchannel("A")
+        base_mode = image.mode[:-1]
+        if alpha.getextrema()[0] == 255:
+            return image.convert(base_mode)
+        background = Image.new(base_mode, image.size, 255 if base_mode == "L" else (255, 255, 255))
+        background.paste(image.convert(base_mode), mask=alpha)
+        return background
+    if image.mode not in _MODE_COLOR_SPACES:
+        return image.convert("RGB")
+    return image
+
+
+def reduce_colors(image):
+    """
+    无损地减少颜色数据：只有灰度时改为单通道，颜色不超过256种时改为调色板图像
+
+    调色板由图像中实际出现的颜色构成，不损失任何颜色；颜色少时PNG编码器还会自动使用
+    1/2/4位索引。不满足条件时原样返回真彩色图像。超过256种颜色的RGB图像不可能是纯灰度，
+    因此灰度检测只需要检查颜色表。
+
+    Args:
+        image (PIL.Image.Image): 灰度或RGB图像
+
+    Returns:
+        PIL.Image.Image: 调色板、灰度或原图像
+    """
+    from PIL import Image, ImageChops
+
+    colors = image.getcolors(maxcolors=PALETTE_MAX_COLORS)
+    if colors is None:
+        return image
+    if image.mode == "RGB" and all(r == g == b for _, (r, g, b) in colors):
+        image = image.getchannel("R")
+        colors = [(count, (value, value, value)) for count, (value, _, _) in colors]
+    elif image.mode == "L":
+        colors = [(count, (value, value, value)) for count, value in colors]
+
+    # 灰度图像本来就是每像素1字节，只有颜色很少、能用4位以下索引时才值得改为调色板
+    if image.mode == "L" and len(colors) > 16:
+        return image
+
+    rgb = image.convert("RGB")
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette([channel for _, color in colors for channel in color])
+    indexed = rgb.quantize(palette=palette_image, dither=Image.Dither.NONE)
+    # 按颜色表顺序建立的调色板，各索引的像素数应与颜色表一致；Pillow的颜色查找带缓存近似，
+    # 个别相近的颜色可能映射错，此时改用中位切分（盒子数等于颜色数时每个盒子恰好一种颜色）
+    if indexed.histogram()[:len(colors)] == [count for count, _ in colors]:
+        return indexed
+    indexed = rgb.quantize(len(colors), method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    if ImageChops.difference(indexed.convert("RGB"), rgb).getbbox() is not None:
+        return image
+    return indexed
+
+
+def _encode_pixels(image, compression, jpeg_quality, compress_level=6):
+    """按压缩方式和图像内容选择DCT或Flate编码像素"""
+    image = strip_alpha(image)
+
+    use_jpeg = compression == "jpeg" or (compression == "auto" and is_photographic(image))
+    buffer = io.BytesIO()
+    if use_jpeg:
+        image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=False)
+        return jpeg_to_encoded(buffer.getvalue(), image.mode, image.size)
+
+    # 无损压缩前先减少颜色数据；PNG编码器按行选择预测过滤器，压缩数据原样作为Flate流
+    image = reduce_colors(image)
+    image.save(buffer, format="PNG", compress_level=compress_level)
+    encoded = png_to_encoded(buffer.getvalue())
+    if encoded is None:
+        if image.mode not in _MODE_COLOR_SPACES:
+            image = image.convert("RGB")
+        encoded = EncodedImage(image.width, image.height, _MODE_COLOR_SPACES[image.mode],
+                               ("FlateDecode",), zlib.compress(image.tobytes(), compress_level))
+    return encoded
+
+
+def pixel_digest(image):
+    """
+    按像素内容计算摘要，颜色模式、尺寸和像素都相同的图像摘要相同
+
+    Returns:
+        str: 十六进制摘要
+    """
+    hasher = hashlib.md5(f"{image.mode}/{image.width}x{image.height}".encode("ascii"))
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+
+class EncodedImageCache:
+    """
+    按像素内容缓存编码结果，重复出现的幻灯片（章节页、相同的动画步骤等）只编码一次
+
+    返回的是同一个 EncodedImage 对象，写入PDF时也只生成一个图像对象。
+    能直接复用源文件数据的图像不需要解码，不经过缓存。
+    """
+
+    def __init__(self, compression="auto", jpeg_quality=DEFAULT_JPEG_QUALITY, max_bytes=ENCODE_CACHE_BYTES):
+        """
+        Args:
+            compression (str): 压缩方式，见 COMPRESSION_MODES
+            jpeg_quality (int): JPEG质量
+            max_bytes (int): 缓存的编码数据总量上限
+        """
+        self.compression = compression
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self.hits = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def encode(self, image):
+        """
+        编码图像，内容相同的图像返回已有的编码结果
+
+        Returns:
+            EncodedImage: 编码结果
+        """
+        encoded = _source_file_passthrough(image)
+        if _passthrough_allowed(encoded, image, self.compression):
+            return encoded
+
+        digest = pixel_digest(image)
+        encoded = self._entries.get(digest)
+        if encoded is not None:
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return encoded
+
+        encoded = _encode_pixels(image, self.compression, self.jpeg_quality)
+        self._entries[digest] = encoded
+        self._bytes += len(encoded.data)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.data)
+        return encoded
+
+
+def draw_encoded_image(c, encoded, x, y, width, height):
+    """
+    将已编码的图像绘制到reportlab画布上
+
+    reportlab没有公开直接写入已编码图像流的接口，这里通过 _ReportlabImageAdapter 使用画布
+    内部的注册流程，直接写入已编码的数据，不再由reportlab取原始像素、计算摘要和压缩；
+    画布缺少这些内部接口（reportlab版本不同）或注册失败时，改为解码后调用公开的 drawImage。
+    两种方式下内容相同的图像都只写入一次。
+
+    Args:
+        c: reportlab画布
+        encoded (EncodedImage): 已编码的图像
+        x, y, width, height (float): 绘制区域（PDF单位）
+    """
+    adapter = _ReportlabImageAdapter(c)
+    if adapter.supported:
+        try:
+            adapter.draw(encoded, x, y, width, height)
+            return
+        except (AttributeError, TypeError, KeyError) as e:
+            print(f"直接写入已编码图像失败，改用drawImage: {e}")
+    draw_image_fallback(c, encoded, x, y, width, height)
+
+
+def draw_image_fallback(c, encoded, x, y, width, height):
+    """通过公开的 canvas.drawImage 绘制已编码的图像；JPEG数据由reportlab原样写入"""
+    from reportlab.lib.utils import ImageReader
+
+    if encoded.filters == ("DCTDecode",):
+        source = ImageReader(io.BytesIO(encoded.data))
+    else:
+        source = ImageReader(decode_encoded_image(encoded))
+    c.drawImage(source, x, y, width, height)
+
+
+def decode_encoded_image(encoded):
+    """
+    把已编码的图像还原为PIL图像
+
+    Returns:
+        PIL.Image.Image: 灰度、RGB或调色板图像
+    """
+    from PIL import Image
+
+    if encoded.filters == ("DCTDecode",):
+        return Image.open(io.BytesIO(encoded.data))
+    if encoded.decode_parms:
+        # 带PNG预测器的Flate流就是PNG文件的IDAT数据，补上文件头即可按PNG解码
+        return Image.open(io.BytesIO(_png_from_encoded(encoded)))
+    mode = "L" if encoded.color_space == "DeviceGray" else "RGB"
+    return Image.frombytes(mode, (encoded.width, encoded.height), zlib.decompress(encoded.data))
+
+
+def _png_from_encoded(encoded):
+    """用带PNG预测器的Flate流重新组装PNG文件"""
+    def chunk(chunk_type, body):
+        return (struct.pack(">I", len(body)) + chunk_type + body
+                + struct.pack(">I", zlib.crc32(chunk_type + body) & 0xFFFFFFFF))
+
+    if isinstance(encoded.color_space, tuple):
+        color_type, palette = _PNG_PALETTE_TYPE, encoded.color_space[3]
+    else:
+        color_type, palette = (0 if encoded.color_space == "DeviceGray" else 2), None
+    header = struct.pack(">IIBBBBB", encoded.width, encoded.height, encoded.bits_per_component,
+                         color_type, 0, 0, 0)
+    data = PNG_SIGNATURE + chunk(b"IHDR", header)
+    if palette:
+        data += chunk(b"PLTE", palette)
+    return data + chunk(b"IDAT", encoded.data) + chunk(b"IEND", b"")
+
+
+class _ReportlabImageAdapter:
+    """
+    封装 draw_encoded_image 用到的reportlab画布内部接口
+
+    这些接口不属于reportlab的公开API，已在 requirements.txt 固定的版本上验证；
+    supported 为False时调用方应改用 draw_image_fallback。
+    """
+
+    _DOC_METHODS = ("getXObjectName", "Reference", "addForm")
+    _CANVAS_METHODS = ("_setXObjects", "saveState", "translate", "scale", "restoreState")
+
+    def __init__(self, c):
+        self.c = c
+        doc = getattr(c, "_doc", None)
+        self.supported = (doc is not None
+                          and all(callable(getattr(doc, name, None)) for name in self._DOC_METHODS)
+                          and isinstance(getattr(doc, "idToObject", None), dict)
+                          and all(callable(getattr(c, name, None)) for name in self._CANVAS_METHODS)
+                          and isinstance(getattr(c, "_code", None), list)
+                          and isinstance(getattr(c, "_formsinuse", None), list))
+
+    def draw(self, encoded, x, y, width, height):
+        """与 canvas.drawImage 的注册流程相同，但直接使用已编码的数据"""
+        c = self.c
+        name = "img" + encoded.key
+        reg_name = c._doc.getXObjectName(name)
+        if c._doc.idToObject.get(reg_name) is None:
+            xobject = _encoded_xobject_class()(name, encoded)
+            c._setXObjects(xobject)
+            c._doc.Reference(xobject, reg_name)
+            c._doc.addForm(name, xobject)
+
+        c._currentPageHasImages = 1
+        c.saveState()
+        c.translate(x, y)
+        c.scale(width, height)
+        c._code.append("/%s Do" % reg_name)
+        c.restoreState()
+        c._formsinuse.append(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _encoded_xobject_class():
+    """延迟定义reportlab图像对象的子类，避免导入本模块时加载reportlab"""
+    from reportlab.pdfbase import pdfdoc
+
+    class EncodedImageXObject(pdfdoc.PDFImageXObject):
+        """直接使用已编码数据的图像XObject"""
+
+        def __init__(self, name, encoded):
+            super().__init__(name)
+            self.width = encoded.width
+            self.height = encoded.height
+            self.colorSpace = encoded.color_space
+            self.bitsPerComponent = encoded.bits_per_component
+            self._filters = encoded.filters
+            self.streamContent = encoded.data
+            self.decode_parms = encoded.decode_parms
+            self.mask = None
+
+        def format(self, document):
+            stream = pdfdoc.PDFStream(content=self.streamContent)
+            stream.dictionary["Type"] = pdfdoc.PDFName("XObject")
+            stream.dictionary["Subtype"] = pdfdoc.PDFName("Image")
+            stream.dictionary["Width"] = self.width
+            stream.dictionary["Height"] = self.height
+            stream.dictionary["BitsPerComponent"] = self.bitsPerComponent
+            stream.dictionary["ColorSpace"] = _color_space_object(self.colorSpace)
+            stream.dictionary["Filter"] = pdfdoc.PDFArray([pdfdoc.PDFName(f) for f in self._filters])
+            if self.decode_parms:
+                stream.dictionary["DecodeParms"] = pdfdoc.PDFDictionary(dict(self.decode_parms))
+            stream.dictionary["Length"] = len(self.streamContent)
+            # 字典中已有Filter，reportlab不会再对数据做一次压缩
+            return stream.format(document)
+
+    def _color_space_object(color_space):
+        if isinstance(color_space, tuple):
+            name, base, hival, palette = color_space
+            # 调色板以十六进制字符串写入；bytes 会被reportlab原样输出，PDFString则会按文本重新编码
+            hex_palette = b"<" + palette.hex().encode("ascii") + b">"
+            return pdfdoc.PDFArray([pdfdoc.PDFName(name), pdfdoc.PDFName(base), hival, hex_palette])
+        return pdfdoc.PDFName(color_space)
+
+    return EncodedImageXObject
+
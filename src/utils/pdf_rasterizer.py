@@ -0,0 +1,462 @@
+import os
+import re
+import sys
+import math
+import shutil
+import functools
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.pdf_images import mark_intermediate
+
+# 每个像素按RGB三通道估算内存占用
+BYTES_PER_PIXEL = 3
+
+# 栅格缓存文件名，如 slide_00012@150.png
+CACHE_FILE_PATTERN = re.compile(r"^slide_(\d+)@(\d+)\.png$")
+
+# 按索引读取单页时保留的已解码页数（如预览反复读取同几页）
+RECENT_PAGES = 4
+
+
+class PDFSlideStream:
+    """
+    惰性栅格化PDF的幻灯片序列
+
+    不会一次性把整份PDF解码到内存中，而是按页分块调用poppler，逐张产出幻灯片图像。
+    每块的页数由内存预算决定，因此无论幻灯片多少，驻留内存都有上限。
+    每块内的页码范围再切分给多个poppler进程并行栅格化，结果按幻灯片顺序产出。
+    指定cache_dir时会保存每页已栅格化的最高分辨率结果，之后只有在请求的分辨率
+    高于缓存时才重新栅格化，否则直接缩小缓存图像。
+    对外表现得像一个只读列表：支持len()、迭代和按索引读取单页。按索引读取时优先使用
+    最近读取过的几页和栅格缓存，只有都没有时才单独调用一次poppler。
+    """
+
+    def __init__(self, pdf_path, dpi=200, memory_budget_mb=512, workers=None, cache_dir=None):
+        """
+        Args:
+            pdf_path (str): PDF文件路径
+            dpi (int): 栅格化分辨率
+            memory_budget_mb (int): 栅格化时允许驻留的图像内存上限（MB）
+            workers (int, optional): 并行的poppler进程数，默认等于CPU核数
+            cache_dir (str, optional): 栅格缓存目录
+        """
+        from pdf2image import pdfinfo_from_path
+
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.memory_budget_mb = memory_budget_mb
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+        info = pdfinfo_from_path(pdf_path)
+        self.page_count = int(info.get("Pages", 0))
+        self.page_size_pts = self._parse_page_size(info.get("Page size", ""))
+
+        # 每页已缓存的栅格：{索引: (dpi, 路径)}
+        self.cache_dir = cache_dir
+        self._cached = {}
+        # 最近按索引读取的已解码页面：{索引: 图像}
+        self._recent = OrderedDict()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_cache()
+
+    @staticmethod
+    def _parse_page_size(text):
+        """解析pdfinfo输出的页面尺寸，如 "720 x 405 pts" """
+        match = re.match(r"\s*([\d.]+)\s*x\s*([\d.]+)", text or "")
+        if not match:
+            # 无法解析时按16:9的默认幻灯片尺寸处理
+            return 720.0, 405.0
+        return float(match.group(1)), float(match.group(2))
+
+    def __len__(self):
+        return self.page_count
+
+    def __bool__(self):
+        return self.page_count > 0
+
+    def __iter__(self):
+        return self.iter_images()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.page_count
+        if not 0 <= index < self.page_count:
+            raise IndexError("幻灯片索引超出范围")
+
+        image = self._recent.get(index)
+        if image is not None:
+            self._recent.move_to_end(index)
+            return image
+
+        if self.cached_dpi(index) >= self.dpi:
+            image = self._load_cached(index, self.dpi)
+        if image is None:
+            image = self._render_range(index, index + 1, self.dpi)[0]
+            self._store_cached(index, self.dpi, image)
+
+        self._recent[index] = image
+        if len(self._recent) > RECENT_PAGES:
+            self._recent.popitem(last=False)
+        return image
+
+    @property
+    def size(self):
+        """按当前dpi栅格化后的单页像素尺寸 (宽, 高)"""
+        return self.size_at(self.dpi)
+
+    def size_at(self, dpi):
+        """按指定dpi栅格化后的单页像素尺寸 (宽, 高)"""
+        width_pts, height_pts = self.page_size_pts
+        return (max(1, round(width_pts * dpi / 72)),
+                max(1, round(height_pts * dpi / 72)))
+
+    def dpi_for_pixel_width(self, pixel_width):
+        """
+        计算让幻灯片达到指定像素宽度所需的栅格化分辨率
+
+        Args:
+            pixel_width (float): 目标像素宽度
+
+        Returns:
+            int: 栅格化dpi
+        """
+        width_pts, _ = self.page_size_pts
+        return max(1, math.ceil(pixel_width * 72 / width_pts))
+
+    @property
+    def aspect_ratio(self):
+        """幻灯片宽高比"""
+        width_pts, height_pts = self.page_size_pts
+        return width_pts / height_pts
+
+    def chunk_size(self, dpi=None):
+        """
+        根据内存预算计算每次栅格化的页数
+
+        Args:
+            dpi (int, optional): 栅格化分辨率，默认使用当前dpi
+
+        Returns:
+            int: 每块页数，至少为1
+        """
+        dpi = dpi or self.dpi
+        width_pts, height_pts = self.page_size_pts
+        page_bytes = (width_pts * dpi / 72) * (height_pts * dpi / 72) * BYTES_PER_PIXEL
+        budget_bytes = self.memory_budget_mb * 1024 * 1024
+        return max(1, int(budget_bytes // max(1, page_bytes)))
+
+    def iter_images(self, start=0, stop=None, dpi=None, progress_callback=None):
+        """
+        按块并行栅格化并逐张产出幻灯片图像
+
+        缓存中分辨率足够的页面直接读取缓存，只有缺失或分辨率不足的页面才交给poppler。
+
+        Args:
+            start (int): 起始幻灯片索引（从0开始）
+            stop (int, optional): 结束索引（不包含），默认到最后一页
+            dpi (int, optional): 栅格化分辨率，默认使用当前dpi
+            progress_callback (callable, optional): 进度回调函数，报告已产出的总页数
+
+        Yields:
+            PIL.Image.Image: 幻灯片图像，调用方用完后即可释放
+        """
+        dpi = dpi or self.dpi
+        stop = self.page_count if stop is None else min(stop, self.page_count)
+        total = max(0, stop - start)
+        chunk = self.chunk_size(dpi)
+        if total == 0:
+            return
+
+        # 线程只负责等待各自的pdftoppm子进程，真正的栅格化在多个进程中并行进行
+        executor = ThreadPoolExecutor(max_workers=min(self.workers, total),
+                                      thread_name_prefix="rasterizer")
+        try:
+            done = 0
+            for first in range(start, stop, chunk):
+                last = min(first + chunk, stop)
+
+                # 只为缓存不能满足的页面分配栅格化任务
+                missing = [i for i in range(first, last) if self.cached_dpi(i) < dpi]
+                pending = []
+                for run_first, run_last in _contiguous_runs(missing):
+                    for shard_first, shard_last in split_page_range(run_first, run_last, self.workers):
+                        future = executor.submit(self._render_range, shard_first, shard_last, dpi)
+                        pending.append((shard_first, future))
+
+                rendered = {}
+                for index in range(first, last):
+                    # 分片按页序提交，需要时才等待下一个分片完成
+                    if pending and pending[0][0] <= index:
+                        shard_first, future = pending.pop(0)
+                        for offset, image in enumerate(future.result()):
+                            self._store_cached(shard_first + offset, dpi, image)
+                            rendered[shard_first + offset] = image
+
+                    image = rendered.pop(index, None)
+                    if image is None:
+                        image = self._load_cached(index, dpi)
+                    if image is None:
+                        # 缓存文件损坏时单独重新栅格化该页
+                        image = self._render_range(index, index + 1, dpi)[0]
+                        self._store_cached(index, dpi, image)
+
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total, f"已栅格化 {done}/{total} 张幻灯片...")
+                    yield image
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def cached_dpi(self, index):
+        """
+        Returns:
+            int: 该页缓存栅格的分辨率，没有缓存时为0
+        """
+        return self._cached.get(index, (0, None))[0]
+
+    def refresh_cache(self):
+        """重新读取缓存目录，纳入其他进程（如并行编码的工作进程）写入的栅格"""
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            self._scan_cache()
+
+    def _scan_cache(self):
+        """读取缓存目录中已有的栅格，每页只保留分辨率最高的一份"""
+        for name in os.listdir(self.cache_dir):
+            match = CACHE_FILE_PATTERN.match(name)
+            if not match:
+                continue
+            index, dpi = int(match.group(1)), int(match.group(2))
+            if index < self.page_count and dpi > self.cached_dpi(index):
+                self._cached[index] = (dpi, os.path.join(self.cache_dir, name))
+
+    def _store_cached(self, index, dpi, image):
+        """保存新栅格化的页面，仅当其分辨率高于已有缓存时替换"""
+        if not self.cache_dir or dpi <= self.cached_dpi(index):
+            return
+        path = os.path.join(self.cache_dir, f"slide_{index:05d}@{dpi}.png")
+        try:
+            # 低压缩级别：缓存写入要快，体积其次
+            image.save(path, format="PNG", compress_level=1)
+        except Exception as e:
+            print(f"写入栅格缓存失败: {e}")
+            return
+
+        old_path = self._cached.get(index, (0, None))[1]
+        self._cached[index] = (dpi, path)
+        if old_path and old_path != path and os.path.exists(old_path):
+            os.unlink(old_path)
+
+    def _load_cached(self, index, dpi):
+        """
+        读取缓存栅格，分辨率高于请求时缩小到目标尺寸
+
+        Returns:
+            PIL.Image.Image: 图像，缓存文件不可读时删除该缓存并返回None
+        """
+        from PIL import Image
+
+        cached_dpi, path = self._cached[index]
+        try:
+            image = mark_intermediate(Image.open(path))
+            image.load()
+        except Exception as e:
+            print(f"栅格缓存已损坏，将重新栅格化: {e}")
+            del self._cached[index]
+            if os.path.exists(path):
+                os.unlink(path)
+            return None
+        if cached_dpi > dpi:
+            image = image.resize(self.size_at(dpi), Image.Resampling.LANCZOS)
+        return image
+
+    def _render_range(self, first, last, dpi):
+        """
+        用一个poppler进程栅格化 [first, last) 范围内的页面
+
+        pdftoppm把各页PPM依次写到标准输出，直接从管道解码，不经过临时文件，
+        也省去了pdf2image每次调用前额外启动的pdfinfo和版本检查进程。
+
+        Returns:
+            list: 按页序排列的图像
+        """
+        pdftoppm = find_pdftoppm()
+        if not pdftoppm:
+            from pdf2image import convert_from_path
+
+            # pdf2image的页码从1开始且包含结束页
+            return convert_from_path(self.pdf_path, dpi=dpi, first_page=first + 1, last_page=last)
+
+        args = [pdftoppm, "-r", str(dpi), "-f", str(first + 1), "-l", str(last), self.pdf_path]
+        # 损坏的PDF可能产生大量警告，不读取stderr以免管道写满阻塞
+        proc = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        )
+        try:
+            images = list(read_ppm_frames(proc.stdout))
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+
+        if returncode != 0 or len(images) != last - first:
+            raise RuntimeError(f"pdftoppm栅格化第 {first + 1}-{last} 页失败（退出码 {returncode}）")
+        return images
+
+    def close(self):
+        """释放最近按索引读取的页面"""
+        self._recent.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def find_pdftoppm():
+    """
+    查找poppler的pdftoppm可执行文件，结果在进程内缓存
+
+    Returns:
+        str: 路径，未找到时返回None
+    """
+    return shutil.which("pdftoppm")
+
+
+def read_ppm_frames(stream):
+    """
+    从字节流中逐帧解析连续的二进制PPM/PGM图像
+
+    Args:
+        stream: 二进制可读流，如子进程的stdout
+
+    Yields:
+        PIL.Image.Image: 图像，像素数据直接引用读取的缓冲区
+    """
+    from PIL import Image
+
+    while True:
+        magic = stream.read(2)
+        if not magic:
+            return
+        if magic not in (b"P6", b"P5"):
+            raise ValueError(f"无法识别的PPM数据: {magic!r}")
+
+        # 头部依次为宽、高、最大值，以空白分隔，可能夹有 # 注释
+        fields = []
+        while len(fields) < 3:
+            token = b""
+            while True:
+                char = stream.read(1)
+                if not char:
+                    raise ValueError("PPM头部不完整")
+                if char == b"#" and not token:
+                    while char not in (b"\n", b""):
+                        char = stream.read(1)
+                    continue
+                if char.isspace():
+                    if token:
+                        break
+                    continue
+                token += char
+            fields.append(int(token))
+
+        width, height, maxval = fields
+        if maxval > 255:
+            raise ValueError("不支持16位PPM数据")
+        mode = "RGB" if magic == b"P6" else "L"
+        size = width * height * len(mode)
+        data = stream.read(size)
+        if len(data) != size:
+            raise ValueError("PPM像素数据不完整")
+        yield Image.frombuffer(mode, (width, height), data, "raw", mode, 0, 1)
+
+
+def copy_cached_rasters(src_dir, dst_dir, index_map):
+    """
+    将栅格缓存从一个目录复制到另一个目录，并按新的页序重新编号
+
+    Args:
+        src_dir (str): 原栅格缓存目录
+        dst_dir (str): 目标栅格缓存目录
+        index_map (dict): {新索引: 原索引}
+
+    Returns:
+        int: 复制的栅格数量
+    """
+    if not src_dir or not os.path.isdir(src_dir):
+        return 0
+    os.makedirs(dst_dir, exist_ok=True)
+
+    # 每个原索引只取分辨率最高的一份
+    best = {}
+    for name in os.listdir(src_dir):
+        match = CACHE_FILE_PATTERN.match(name)
+        if match:
+            index, dpi = int(match.group(1)), int(match.group(2))
+            if dpi > best.get(index, (0, None))[0]:
+                best[index] = (dpi, name)
+
+    copied = 0
+    for new_index, old_index in index_map.items():
+        if old_index not in best:
+            continue
+        dpi, name = best[old_index]
+        shutil.copyfile(os.path.join(src_dir, name),
+                        os.path.join(dst_dir, f"slide_{new_index:05d}@{dpi}.png"))
+        copied += 1
+    return copied
+
+
+def _contiguous_runs(indices):
+    """将有序索引列表合并为连续区间 [(起始, 结束)]"""
+    runs = []
+    for index in indices:
+        if runs and runs[-1][1] == index:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+    return [tuple(run) for run in runs]
+
+
+def split_page_range(first, last, parts):
+    """
+    将页码范围 [first, last) 切分为不超过parts段的连续区间
+
+    Returns:
+        list: [(起始, 结束)] 列表，各段页数尽量均匀
+    """
+    count = last - first
+    parts = max(1, min(parts, count))
+    base, extra = divmod(count, parts)
+
+    ranges = []
+    cursor = first
+    for i in range(parts):
+        size = base + (1 if i < extra else 0)
+        ranges.append((cursor, cursor + size))
+        cursor += size
+    return ranges
+
+
+def iter_slide_images(slide_images, start=0, stop=None, dpi=None, progress_callback=None):
+    """
+    统一遍历幻灯片列表或惰性幻灯片流的一段
+
+    Args:
+        slide_images: 图像列表或 PDFSlideStream
+        start (int): 起始索引
+        stop (int, optional): 结束索引（不包含）
+        dpi (int, optional): 幻灯片流的栅格化分辨率，对图像列表无效
+        progress_callback (callable, optional): 进度回调函数，报告这一段中已取出的张数
+
+    Yields:
+        PIL.Image.Image: 幻灯片图像
+    """
+    if hasattr(slide_images, "iter_images"):
+        yield from slide_images.iter_images(start, stop, dpi=dpi, progress_callback=progress_callback)
+        return
+
+    images = slide_images[start:stop]
+    for done, image in enumerate(images, 1):
+        if progress_callback:
+            progress_callback(done, len(images), f"已加载 {done}/{len(images)} 张幻灯片...")
+        yield image
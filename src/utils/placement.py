@@ -0,0 +1,124 @@
+import numpy as np
+
+# 布局表的字段：纸张序号、行、列，幻灯片区域（按宽高比在格子内居中）和所在格子的左上角，
+# 长度单位均为mm，原点在纸张左上角，y向下
+PLACEMENT_DTYPE = np.dtype([
+    ("sheet", np.int32), ("row", np.int32), ("column", np.int32),
+    ("x", np.float64), ("y", np.float64), ("w", np.float64), ("h", np.float64),
+    ("cell_x", np.float64), ("cell_y", np.float64),
+])
+
+# 统计主要宽高比时保留的小数位，像素取整造成的微小差异视为同一比例
+ASPECT_DECIMALS = 3
+
+# 定位标记画在格子下方：基线在格子底边以下 SLIDE_LABEL_OFFSET_PT 处，字号为 SLIDE_LABEL_SIZE_PT
+SLIDE_LABEL_OFFSET_PT = 10
+SLIDE_LABEL_SIZE_PT = 8
+# 标记占用的高度（mm），含字形的下伸部分；显示标记时行间距小于该值会让标记压到下一行的幻灯片上
+SLIDE_LABEL_BAND_MM = (SLIDE_LABEL_OFFSET_PT + 0.25 * SLIDE_LABEL_SIZE_PT) * 25.4 / 72
+
+
+def slide_aspect_ratios(slide_images):
+    """
+    获取每张幻灯片的宽高比，不解码图像
+
+    Args:
+        slide_images: 图像列表、幻灯片流、集合、存储或子集
+
+    Returns:
+        numpy.ndarray: 每张幻灯片的宽高比
+    """
+    if hasattr(slide_images, "aspect_ratios"):
+        return np.asarray(slide_images.aspect_ratios(), dtype=np.float64)
+    if hasattr(slide_images, "aspect_ratio"):
+        # 幻灯片流的所有页面尺寸相同
+        return np.full(len(slide_images), slide_images.aspect_ratio, dtype=np.float64)
+    return np.array([width / height for width, height in (image.size for image in slide_images)],
+                    dtype=np.float64)
+
+
+def dominant_aspect_ratio(aspect_ratios):
+    """
+    出现最多的宽高比，作为格子的宽高比
+
+    Returns:
+        float: 属于该比例的第一张幻灯片的精确宽高比；出现次数相同时取先出现的比例，
+               所有幻灯片比例相同时即为第一张的宽高比
+    """
+    rounded = np.round(aspect_ratios, ASPECT_DECIMALS)
+    _, first_index, counts = np.unique(rounded, return_index=True, return_counts=True)
+    best = np.lexsort((first_index, -counts))[0]
+    return float(aspect_ratios[first_index[best]])
+
+
+def cell_origins(layout_result, config):
+    """
+    一张纸上所有格子的行、列和左上角位置
+
+    Args:
+        layout_result (dict): 布局计算结果
+        config (dict): 布局配置
+
+    Returns:
+        tuple: (rows, columns, cell_x, cell_y)，均为按格子顺序排列的数组，位置单位为mm
+    """
+    columns = layout_result["columns"]
+    positions = np.arange(layout_result["rows"] * columns)
+    rows, cols = np.divmod(positions, columns)
+    cell_x = config["margin_left"] + cols * (layout_result["item_width"] + config["h_spacing"])
+    cell_y = config["margin_top"] + rows * (layout_result["item_height"] + config["v_spacing"])
+    return rows, cols, cell_x, cell_y
+
+
+def compute_placements(aspect_ratios, layout_result, config):
+    """
+    一次计算所有幻灯片的位置
+
+    宽高比与格子不同的幻灯片按原比例缩放到格子内并居中（上下或左右留白）。
+
+    Args:
+        aspect_ratios (numpy.ndarray): 每张幻灯片的宽高比
+        layout_result (dict): 布局计算结果（格子尺寸、行列数）
+        config (dict): 布局配置（页边距、间距）
+
+    Returns:
+        numpy.ndarray: PLACEMENT_DTYPE 结构化数组，每张幻灯片一行，按幻灯片顺序排列
+    """
+    aspect_ratios = np.asarray(aspect_ratios, dtype=np.float64)
+    count = len(aspect_ratios)
+    table = np.zeros(count, dtype=PLACEMENT_DTYPE)
+    items_per_page = layout_result["rows"] * layout_result["columns"]
+    if count == 0 or items_per_page == 0:
+        return table
+
+    rows, cols, cell_x, cell_y = cell_origins(layout_result, config)
+    sheets, positions = np.divmod(np.arange(count), items_per_page)
+    cell_width = layout_result["item_width"]
+    cell_height = layout_result["item_height"]
+
+    # 比格子宽的幻灯片占满宽度，比格子窄的占满高度
+    wider = aspect_ratios >= cell_width / cell_height
+    width = np.where(wider, cell_width, cell_height * aspect_ratios)
+    height = np.where(wider, cell_width / aspect_ratios, cell_height)
+
+    table["sheet"] = sheets
+    table["row"] = rows[positions]
+    table["column"] = cols[positions]
+    table["cell_x"] = cell_x[positions]
+    table["cell_y"] = cell_y[positions]
+    table["x"] = table["cell_x"] + (cell_width - width) / 2
+    table["y"] = table["cell_y"] + (cell_height - height) / 2
+    table["w"] = width
+    table["h"] = height
+    return table
+
+
+def sheet_placements(placements, sheet):
+    """
+    某一张纸上的幻灯片
+
+    Returns:
+        tuple: (该纸第一张幻灯片的索引, 布局表中对应的切片)
+    """
+    first, last = np.searchsorted(placements["sheet"], [sheet, sheet + 1])
+    return int(first), placements[first:last]
@@ -1,17 +1,27 @@
+import io
 import os
-import sys
 import tempfile
-import subprocess
-import comtypes.client  # type: ignore
 import shutil
 import atexit
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.units import mm
-from PyPDF2 import PdfWriter, PdfReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+
+from src.utils.libreoffice_pool import get_shared_pool
+from src.utils.pdf_rasterizer import PDFSlideStream, copy_cached_rasters, iter_slide_images
+from src.utils.slide_collection import SlideCollection
+from src.utils.slide_store import SlideStore, write_slide_store
+from src.utils.pdf_images import EncodedImageCache, draw_encoded_image, DEFAULT_JPEG_QUALITY
+from src.utils.parallel_encoder import iter_encoded_images, PARALLEL_ENCODE_MIN_SLIDES
+from src.utils.sharded_export import plan_shards, render_shard, merge_shards, SHARD_MIN_SHEETS
+from src.utils.streaming_pdf import STREAMING_EXPORT_MIN_SLIDES
+from src.utils.build_collapse import (SlideSubset, ContainmentChecker, compute_slide_signatures,
+                                      collapse_builds, DEFAULT_BUILD_THRESHOLD)
+from src.utils.conversion_cache import ConversionCache
+from src.utils.converter_backends import get_default_registry
+from src.utils.slide_fingerprint import (fingerprint_slides, match_unchanged_slides,
+                                         numbered_slide_indices, save_partial_deck, splice_pdf)
+from src.utils.sheet_drawing import (slide_rects, draw_slide_label, draw_page_number, export_dpi,
+                                     write_sheets_streaming)
+from src.utils.size_budget import SizeEstimator
+from src.utils.font_registry import get_font_registry
 
 class PPTProcessor:
     """
@@ -28,6 +38,34 @@ class PPTProcessor:
         # 保存所有创建的临时文件路径
         self.temp_files = []
         
+        # 最近一次转换得到的中间PDF（矢量直通模式使用）
+        self.source_pdf_path = None
+        
+        # 栅格化参数：分辨率、驻留图像的内存上限（MB）和并行进程数（None表示按CPU核数）
+        self.raster_dpi = 200
+        self.raster_memory_budget_mb = 512
+        self.raster_workers = None
+        
+        # 导出PDF时并行编码图像的进程数（None表示按CPU核数，1表示在当前进程中编码）
+        self.encode_workers = None
+        
+        # 最近一次按目标大小导出的结果：目标、预测和实际大小以及选用的设置
+        self.last_size_report = None
+        
+        # 最近一次计算签名的幻灯片序列及其签名，调整合并阈值时不必重新计算
+        self._slide_signatures = (None, None, None)
+        
+        # 跨会话保留的转换缓存，不随临时文件一起清理
+        self.conversion_cache = ConversionCache()
+        # 当前转换结果引用的缓存条目，在结果被替换或清理前不会被其他任务淘汰
+        self._held_cache_keys = []
+        
+        # 可用的转换方式，按优先级依次尝试
+        self.backends = get_default_registry()
+        # 最近一次成功转换使用的方式，以及结果是否来自转换缓存
+        self.last_backend = None
+        self.last_conversion_cached = False
+        
         # 注册退出时的清理函数
         atexit.register(self.cleanup_temp_files)
     
@@ -52,6 +90,10 @@ class PPTProcessor:
         # 清空列表
         self.temp_files = []
         
+        # 转换结果不再使用，释放引用的缓存条目
+        self._release_cache_entries(getattr(self, "_held_cache_keys", []))
+        self._held_cache_keys = []
+        
         # 清理临时目录
         try:
             if hasattr(self, 'temp_dir') and self.temp_dir and os.path.exists(self.temp_dir):
@@ -61,6 +103,16 @@ class PPTProcessor:
         except Exception as e:
             print(f"清理临时目录失败: {e}")
     
+    def _hold_cache_entry(self, key):
+        """标记转换结果引用的缓存条目正在使用"""
+        self.conversion_cache.acquire(key)
+        self._held_cache_keys.append(key)
+    
+    def _release_cache_entries(self, keys):
+        """释放 _hold_cache_entry 标记的缓存条目"""
+        for key in keys:
+            self.conversion_cache.release(key)
+    
     def create_temp_file(self, suffix=".png"):
         """
         创建临时文件并跟踪
@@ -99,18 +151,38 @@ class PPTProcessor:
             print(f"不支持的文件格式: {ppt_path}")
             return []
         
-        # 使用PPTX库处理.pptx文件
-        if is_pptx:
+        self.source_pdf_path = None
+        self.last_backend = None
+        self.last_conversion_cached = False
+        self._slide_signatures = (None, None, None)
+        
+        # 依次尝试可用的转换方式，失败时交给下一个
+        candidates = self.backends.candidates(ppt_path)
+        if not candidates:
+            print("没有可用的转换方式，请安装LibreOffice或Microsoft PowerPoint")
+            return []
+        
+        # 转换成功后才释放上一次结果引用的缓存条目，失败时调用方仍在使用上一次的结果
+        previous_keys, self._held_cache_keys = self._held_cache_keys, []
+        for backend, info in candidates:
             try:
-                return self._convert_pptx_to_images(ppt_path, progress_callback)
+                slide_images = backend.convert(self, ppt_path, info, progress_callback)
             except Exception as e:
-                print(f"PPTX转换失败: {e}，尝试使用COM方式")
-                return self._convert_ppt_via_com(ppt_path, progress_callback)
-        
-        # 使用COM处理.ppt文件
-        if is_ppt:
-            return self._convert_ppt_via_com(ppt_path, progress_callback)
+                print(f"使用 {backend.name} 转换失败: {e}")
+                slide_images = []
+            
+            if slide_images:
+                self.last_backend = backend.name
+                self._release_cache_entries(previous_keys)
+                return slide_images
+            
+            self.source_pdf_path = None
+            self.last_conversion_cached = False
+            self._release_cache_entries(self._held_cache_keys)
+            self._held_cache_keys = []
+            print(f"使用 {backend.name} 转换失败，尝试下一种方式")
         
+        self._held_cache_keys = previous_keys
         return []
         
     def _convert_pptx_to_images(self, pptx_path, progress_callback=None):
@@ -126,7 +198,24 @@ class PPTProcessor:
         """
         from pptx import Presentation
         
+        previous_key = None
         try:
+            # 同一份文件（内容相同）再次打开时直接使用缓存的中间PDF和栅格
+            cache_key = None
+            if self.conversion_cache:
+                cache_key = self.conversion_cache.make_key(pptx_path, {"converter": "libreoffice"})
+                cached_pdf = self.conversion_cache.get_pdf(cache_key)
+                if cached_pdf:
+                    self._hold_cache_entry(cache_key)
+                    if progress_callback:
+                        progress_callback(50, 100, "已命中转换缓存...")
+                    self.source_pdf_path = cached_pdf
+                    self.last_conversion_cached = True
+                    return self._convert_pdf_to_images(
+                        cached_pdf, progress_callback,
+                        raster_dir=self.conversion_cache.raster_dir(cache_key)
+                    )
+            
             presentation = Presentation(pptx_path)
             
             # 获取幻灯片数量
@@ -139,24 +228,140 @@ class PPTProcessor:
             
             # 使用LibreOffice或OpenOffice转换PPTX为PDF
             pdf_path = self.create_temp_file(suffix='.pdf')
-            self.temp_files.append(pdf_path)
             
-            result = self._convert_to_pdf_with_libreoffice(pptx_path, pdf_path)
-            if not result:
-                # 如果LibreOffice转换失败，尝试使用COM接口
-                return self._convert_ppt_via_com(pptx_path, progress_callback)
+            # 同一路径的文件被编辑过时，只重新转换内容变化的幻灯片
+            fingerprints = None
+            reused = None
+            if cache_key:
+                try:
+                    fingerprints = fingerprint_slides(presentation)
+                except Exception as e:
+                    print(f"计算幻灯片指纹失败: {e}")
+                if fingerprints:
+                    previous_key, previous_manifest = self.conversion_cache.find_latest(pptx_path)
+                    if previous_key:
+                        # 复用期间上一次的条目不能被其他任务淘汰
+                        self.conversion_cache.acquire(previous_key)
+                        reused = self._convert_changed_slides(
+                            presentation, fingerprints, previous_key, previous_manifest,
+                            pdf_path, progress_callback
+                        )
+            
+            if reused is None:
+                # 提交到常驻LibreOffice进程池并等待结果
+                pool = get_shared_pool()
+                result = False
+                if pool.available:
+                    future = pool.submit(pptx_path, pdf_path)
+                    result = pool.wait([future])[0]
+                else:
+                    print("未找到LibreOffice/OpenOffice")
+                
+                if not result:
+                    return []
+            
+            # 写入转换缓存，之后的栅格也保存在缓存条目中
+            raster_dir = None
+            if cache_key:
+                extra = {"source_path": os.path.abspath(pptx_path)}
+                if fingerprints:
+                    extra["fingerprints"] = fingerprints
+                cached_pdf = self.conversion_cache.store_pdf(
+                    cache_key, pdf_path, extra=extra,
+                    protect=(previous_key,) if reused else ()
+                )
+                if cached_pdf:
+                    self._hold_cache_entry(cache_key)
+                    pdf_path = cached_pdf
+                    raster_dir = self.conversion_cache.raster_dir(cache_key)
+                    if reused:
+                        # 未变化的幻灯片连同栅格一起复用，按新页序重新编号
+                        copy_cached_rasters(self.conversion_cache.raster_dir(previous_key),
+                                            raster_dir, reused)
+            
+            # 保留中间PDF，供矢量直通模式直接排版
+            self.source_pdf_path = pdf_path
             
             # 将PDF转换为图片
-            return self._convert_pdf_to_images(pdf_path, progress_callback)
+            return self._convert_pdf_to_images(pdf_path, progress_callback, raster_dir=raster_dir)
         
         except Exception as e:
             print(f"转换PPTX时出错: {e}")
-            # 如果python-pptx处理失败，尝试使用COM接口
-            return self._convert_ppt_via_com(pptx_path, progress_callback)
+            return []
+        finally:
+            if previous_key:
+                self.conversion_cache.release(previous_key)
+    
+    def _convert_changed_slides(self, presentation, fingerprints, previous_key, previous_manifest,
+                                pdf_path, progress_callback=None):
+        """
+        只转换与上一次转换相比内容变化的幻灯片，并与上一次的PDF页面拼接成完整PDF
+        
+        Args:
+            presentation: 当前文件的Presentation对象（会被修改，之后不能再使用）
+            fingerprints (list): 当前每张幻灯片的指纹
+            previous_key (str): 上一次转换的缓存键
+            previous_manifest (dict): 上一次转换的缓存清单
+            pdf_path (str): 输出的完整PDF路径
+            progress_callback (callable, optional): 进度回调函数
+        
+        Returns:
+            dict: {当前索引: 上次索引} 复用的幻灯片，无法增量转换时返回None
+        """
+        from PyPDF2 import PdfReader
+        
+        previous_fingerprints = previous_manifest.get("fingerprints") or []
+        reused, changed = match_unchanged_slides(fingerprints, previous_fingerprints)
+        if not reused:
+            return None
+        
+        # 只含修改过的幻灯片的副本会重新编号，其中有幻灯片编号字段时退回完整转换
+        if numbered_slide_indices(presentation, changed):
+            return None
+        
+        previous_pdf = self.conversion_cache.get_pdf(previous_key)
+        if not previous_pdf:
+            return None
+        
+        try:
+            # 隐藏幻灯片等情况下PDF页数与幻灯片数不一致，无法按索引对应，退回完整转换
+            if len(PdfReader(previous_pdf).pages) != len(previous_fingerprints):
+                return None
+            
+            changed_position = {index: k for k, index in enumerate(changed)}
+            partial_pdf = None
+            if changed:
+                if progress_callback:
+                    progress_callback(10, 100, f"正在重新转换 {len(changed)} 张修改过的幻灯片...")
+                
+                partial_pptx = self.create_temp_file(suffix='.pptx')
+                partial_pdf = self.create_temp_file(suffix='.pdf')
+                save_partial_deck(presentation, changed, partial_pptx)
+                
+                pool = get_shared_pool()
+                if not pool.available or not pool.wait([pool.submit(partial_pptx, partial_pdf)])[0]:
+                    return None
+                if len(PdfReader(partial_pdf).pages) != len(changed):
+                    return None
+            elif progress_callback:
+                progress_callback(10, 100, "幻灯片内容未变化，复用上一次的转换结果...")
+            
+            sources = []
+            for index in range(len(fingerprints)):
+                if index in changed_position:
+                    sources.append((partial_pdf, changed_position[index]))
+                else:
+                    sources.append((previous_pdf, reused[index]))
+            splice_pdf(pdf_path, sources)
+            return reused
+        
+        except Exception as e:
+            print(f"增量转换失败，将完整转换: {e}")
+            return None
     
     def _convert_to_pdf_with_libreoffice(self, input_path, output_path):
         """
-        使用LibreOffice转换文档为PDF
+        使用常驻LibreOffice进程池转换文档为PDF
         
         Args:
             input_path (str): 输入文件路径
@@ -166,54 +371,12 @@ class PPTProcessor:
             bool: 是否成功
         """
         try:
-            # 检查是否安装了LibreOffice/OpenOffice
-            if sys.platform == "win32":
-                libreoffice_paths = [
-                    "C:\\Program Files\\LibreOffice\\program\\soffice.exe",
-                    "C:\\Program Files (x86)\\LibreOffice\\program\\soffice.exe",
-                    "C:\\Program Files\\OpenOffice\\program\\soffice.exe",
-                    "C:\\Program Files (x86)\\OpenOffice\\program\\soffice.exe",
-                ]
-                soffice_path = None
-                for path in libreoffice_paths:
-                    if os.path.exists(path):
-                        soffice_path = path
-                        break
-            else:
-                soffice_path = "soffice"  # 在Linux/Mac上尝试直接使用命令
-            
-            if not soffice_path:
+            pool = get_shared_pool()
+            if not pool.available:
                 print("未找到LibreOffice/OpenOffice")
                 return False
             
-            # 构建命令
-            cmd = [
-                soffice_path,
-                "--headless",
-                "--convert-to", "pdf",
-                "--outdir", os.path.dirname(output_path),
-                input_path
-            ]
-            
-            # 执行命令
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
-            
-            # 检查是否成功
-            if result.returncode != 0:
-                print(f"LibreOffice转换失败: {result.stderr.decode()}")
-                return False
-            
-            # 检查输出文件是否存在
-            expected_output = os.path.join(
-                os.path.dirname(output_path),
-                os.path.splitext(os.path.basename(input_path))[0] + ".pdf"
-            )
-            
-            if os.path.exists(expected_output) and expected_output != output_path:
-                # 如果输出文件名与预期不同，重命名
-                shutil.move(expected_output, output_path)
-            
-            return os.path.exists(output_path)
+            return pool.convert(input_path, output_path)
         except Exception as e:
             print(f"LibreOffice转换出错: {e}")
             return False
@@ -227,7 +390,7 @@ class PPTProcessor:
             progress_callback (callable, optional): 进度回调函数
             
         Returns:
-            list: 图像列表
+            SlideCollection: 按需解码的幻灯片集合，失败时返回空列表
         """
         slide_images = []
         
@@ -236,7 +399,8 @@ class PPTProcessor:
             if progress_callback:
                 progress_callback(0, 100, "正在初始化PPT转换...")
                 
-            # 初始化COM对象
+            # 初始化COM对象（comtypes仅在Windows上可用，按需导入）
+            import comtypes.client  # type: ignore
             powerpoint = comtypes.client.CreateObject("Powerpoint.Application")
             powerpoint.Visible = True
             
@@ -261,6 +425,10 @@ class PPTProcessor:
             # 创建临时目录存放图像
             temp_dir = tempfile.mkdtemp(dir=self.temp_dir)
             
+            # 导出的图片留在磁盘上，集合中只保存句柄，使用时才解码
+            page_setup = presentation.PageSetup
+            slide_images = self.create_slide_collection((page_setup.SlideWidth, page_setup.SlideHeight))
+            
             # 导出PPT为图片
             for i in range(1, slide_count + 1):
                 # 创建临时文件路径
@@ -271,9 +439,8 @@ class PPTProcessor:
                     slide = presentation.Slides.Item(i)
                     slide.Export(slide_path, "PNG")
                     
-                    # 读取导出的图像
-                    image = Image.open(slide_path)
-                    slide_images.append(image)
+                    # 只读取导出图像的尺寸
+                    slide_images.add_file(slide_path)
                     
                     # 报告进度
                     if progress_callback:
@@ -297,67 +464,95 @@ class PPTProcessor:
             print(f"使用COM转换PPT时出错: {e}")
             return []
     
-    def _convert_pdf_to_images(self, pdf_path, progress_callback=None):
+    def create_slide_collection(self, page_size_pts=None):
         """
-        将PDF转换为图像列表
+        创建按需解码的幻灯片集合，溢出文件放在本处理器的临时目录中
         
         Args:
-            pdf_path (str): PDF文件路径
-            progress_callback (callable, optional): 进度回调函数
+            page_size_pts (tuple, optional): 幻灯片页面尺寸（磅）
             
         Returns:
-            list: 图像列表
+            SlideCollection: 空集合
+        """
+        return SlideCollection(tempfile.mkdtemp(prefix="slides_", dir=self.temp_dir),
+                               memory_budget_mb=self.raster_memory_budget_mb,
+                               page_size_pts=page_size_pts)
+    
+    def build_slide_store(self, slide_images, dpi=None, progress_callback=None):
         """
-        from pdf2image import convert_from_path
+        将幻灯片一次性写入内存映射存储，供多个读取方（包括工作进程）零拷贝共享
         
-        slide_images = []
+        Args:
+            slide_images: 图像列表、幻灯片流或集合
+            dpi (int, optional): 目标分辨率
+            progress_callback (callable, optional): 进度回调函数
+            
+        Returns:
+            SlideStore: 只读存储，文件位于本处理器的临时目录中
+        """
+        store_path = self.create_temp_file(suffix=".slides")
+        return write_slide_store(store_path, slide_images, dpi=dpi, progress_callback=progress_callback)
+    
+    def _convert_pdf_to_images(self, pdf_path, progress_callback=None, raster_dir=None):
+        """
+        将PDF包装为按需栅格化的幻灯片流
         
+        Args:
+            pdf_path (str): PDF文件路径
+            progress_callback (callable, optional): 进度回调函数
+            raster_dir (str, optional): 栅格缓存目录，默认在临时目录中新建
+            
+        Returns:
+            PDFSlideStream: 惰性幻灯片序列，失败时返回空列表
+        """
         try:
             # 报告进度：开始准备
             if progress_callback:
-                progress_callback(0, 100, "正在从PDF提取图像...")
+                progress_callback(0, 100, "正在读取PDF信息...")
             
-            # 转换PDF为图像
-            images = convert_from_path(pdf_path)
-            
-            # 报告进度：PDF加载完成
-            if progress_callback:
-                progress_callback(20, 100, f"已加载PDF，共 {len(images)} 页")
-            
-            # 处理每个页面
-            for i, image in enumerate(images):
-                # 更频繁地报告进度
-                if progress_callback:
-                    progress_callback(20 + (i + 1) * 70 // len(images), 100, 
-                                    f"正在处理图像 {i+1}/{len(images)}...")
-                
-                slide_images.append(image)
+            # 只读取页数和页面尺寸，图像在使用时才分块栅格化；
+            # 没有持久的缓存目录时直接在内存中使用栅格，不写入临时文件
+            slide_stream = PDFSlideStream(pdf_path, dpi=self.raster_dpi,
+                                          memory_budget_mb=self.raster_memory_budget_mb,
+                                          workers=self.raster_workers,
+                                          cache_dir=raster_dir)
             
             # 报告进度：完成
             if progress_callback:
-                progress_callback(100, 100, "图像提取完成")
+                progress_callback(100, 100, f"已加载PDF，共 {len(slide_stream)} 页")
             
-            return slide_images
+            return slide_stream
         
         except Exception as e:
             print(f"转换PDF为图像时出错: {e}")
             return []
     
-    def generate_pdf(self, slide_images, output_path, layout_result, config, progress_callback=None):
+    def generate_pdf(self, slide_images, output_path, layout_result, config, progress_callback=None,
+                     sheet_range=None):
         """
         根据布局将PPT图像生成为PDF
         
         Args:
-            slide_images: PPT幻灯片的图像列表
+            slide_images: PPT幻灯片的图像列表，或按需栅格化的幻灯片流
             output_path: 输出PDF文件路径
-            layout_result: 布局计算结果
+            layout_result: 布局方案（LayoutPlan）
             config: 布局配置
             progress_callback (callable, optional): 进度回调函数
+            sheet_range (tuple, optional): 只生成 [起始纸张, 结束纸张) 范围内的纸张，页码和定位标记
+                仍按整份文档编号（分段生成时使用）
             
         Returns:
             布尔值，表示是否成功
         """
-        temp_image_files = []  # 用于跟踪本次操作创建的临时文件
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
+        
+        if config.get("sharded_export") and sheet_range is None:
+            return self.generate_pdf_sharded(slide_images, output_path, layout_result, config, progress_callback)
+        if slide_images and len(slide_images) >= STREAMING_EXPORT_MIN_SLIDES:
+            # 幻灯片很多时逐页写出，不在画布中积累整份文档
+            return self.generate_pdf_streaming(slide_images, output_path, layout_result, config,
+                                               progress_callback, sheet_range)
         
         try:
             # 确保有幻灯片可处理
@@ -386,32 +581,7 @@ class PPTProcessor:
                 progress_callback(10, 100, "正在准备字体...")
             
             # 注册中文字体用于页码显示
-            chinese_font_name = "Helvetica"  # 默认字体
-            try:
-                # 首先尝试使用项目自带的Source Han Sans字体
-                source_han_sans_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                                  'resources', 'SourceHanSans.ttf')
-                
-                if os.path.exists(source_han_sans_path):
-                    chinese_font_name = "SourceHanSans"
-                    pdfmetrics.registerFont(TTFont(chinese_font_name, source_han_sans_path))
-                    print(f"已注册内置中文字体用于页码显示: {chinese_font_name}")
-                else:
-                    # 尝试使用系统中文字体
-                    font_paths = [
-                        "C:/Windows/Fonts/simhei.ttf",
-                        "C:/Windows/Fonts/msyh.ttc",
-                        "/System/Library/Fonts/PingFang.ttc"
-                    ]
-                    for path in font_paths:
-                        if os.path.exists(path):
-                            font_name = "SimHei" if "simhei" in path.lower() else "ChineseFont"
-                            pdfmetrics.registerFont(TTFont(font_name, path))
-                            chinese_font_name = font_name
-                            print(f"已注册系统字体用于页码显示: {chinese_font_name}")
-                            break
-            except Exception as e:
-                print(f"注册中文字体失败: {e}")
+            chinese_font_name = self._register_label_font()
             
             # 创建PDF画布
             c = canvas.Canvas(output_path, pagesize=page_size)
@@ -419,125 +589,594 @@ class PPTProcessor:
             # 获取布局参数
             rows = layout_result["rows"]
             columns = layout_result["columns"]
-            item_width_mm = layout_result["item_width"]
-            item_height_mm = layout_result["item_height"]
-            h_spacing_mm = config["h_spacing"]
-            v_spacing_mm = config["v_spacing"]
-            margin_left_mm = config["margin_left"]
-            margin_top_mm = config["margin_top"]
-            margin_bottom_mm = config.get("margin_bottom", margin_top_mm)
-            margin_right_mm = config.get("margin_right", margin_left_mm)
             
             # 获取页码显示设置
             show_ppt_numbers = config.get("show_ppt_numbers", True)
             show_page_numbers = config.get("show_page_numbers", True)
             
+            # 图像压缩方式
+            compression = config.get("image_compression", "auto")
+            jpeg_quality = config.get("jpeg_quality", DEFAULT_JPEG_QUALITY)
+            
             # 计算每页可以放置的幻灯片数量
             items_per_page = rows * columns
             
             # 处理每一页
-            page_count = 0
             slide_count = len(slide_images)
             total_pages = (slide_count + items_per_page - 1) // items_per_page
+            first_sheet, last_sheet = sheet_range or (0, total_pages)
+            first_slide = first_sheet * items_per_page
+            last_slide = min(last_sheet * items_per_page, slide_count)
+            sheet_count = last_sheet - first_sheet
             
             # 报告进度：开始生成页面
             if progress_callback:
-                progress_callback(20, 100, f"开始生成 {total_pages} 页PDF...")
+                progress_callback(20, 100, f"开始生成 {sheet_count} 页PDF...")
 
-            for page_idx in range(total_pages):
-                if page_idx > 0:
-                    # 创建新页面
+            # 幻灯片流和集合按打印尺寸所需的分辨率取图，而不是固定分辨率
+            target_dpi = export_dpi(slide_images, layout_result, config)
+
+            # 栅格化和编码占导出的大部分时间，按幻灯片报告进度
+            def slide_progress(current, total, message):
+                if progress_callback:
+                    page = (first_slide + current - 1) // items_per_page - first_sheet + 1
+                    progress_callback(20 + (current * 70) // max(1, total), 100,
+                                      f"正在生成第 {page}/{sheet_count} 页，{message}")
+
+            # 按顺序消费已编码的幻灯片，这里只负责写页面内容和对象
+            encoded_iter = self._iter_encoded_slides(slide_images, target_dpi, compression, jpeg_quality,
+                                                     first_slide, last_slide, slide_progress)
+            for slide_idx, encoded in enumerate(encoded_iter, first_slide):
+                page_idx, pos = divmod(slide_idx, items_per_page)
+                
+                if pos == 0 and page_idx > first_sheet:
+                    # 结束上一页并创建新页面
+                    if show_page_numbers:
+                        draw_page_number(c, chinese_font_name, page_idx - 1, layout_result, config)
                     c.showPage()
                 
-                page_count += 1
+                # 从布局表中取出位置（PDF单位）
+                (x, y, width, height), (cell_x, cell_y, _, _) = slide_rects(slide_idx, layout_result)
                 
-                # 报告当前页面进度
+                try:
+                    if encoded is None:
+                        raise ValueError("图像编码失败")
+                    draw_encoded_image(c, encoded, x, y, width, height)
+                    
+                    # 添加PPT定位页码标记（在格子左下角，不随幻灯片留白移动）
+                    if show_ppt_numbers:
+                        draw_slide_label(c, chinese_font_name, layout_result.labels[slide_idx], cell_x, cell_y)
+                except Exception as e:
+                    print(f"处理幻灯片 {slide_idx+1} 时出错: {e}")
+                    # 如果单个幻灯片处理失败，继续处理下一个
+                    continue
+            
+            # 添加最后一页的纸张页码（在页面右下角）
+            if show_page_numbers and sheet_count > 0:
+                draw_page_number(c, chinese_font_name, last_sheet - 1, layout_result, config)
+            
+            # 报告进度：正在保存
+            if progress_callback:
+                progress_callback(95, 100, "正在保存PDF文件...")
+            
+            # 保存PDF
+            c.save()
+            
+            # 报告进度：完成
+            if progress_callback:
+                progress_callback(100, 100, "PDF生成完成")
+            
+            return True
+        
+        except Exception as e:
+            print(f"生成PDF时发生错误: {e}")
+            if progress_callback:
+                progress_callback(100, 100, f"错误: {e}")
+            return False
+    
+    def generate_pdf_streaming(self, slide_images, output_path, layout_result, config, progress_callback=None,
+                               sheet_range=None):
+        """
+        逐页写出PDF，内存占用与页数无关
+        
+        每张纸绘制完成后立即把页面内容和新出现的图像写入文件，交叉引用表在最后写出；
+        进度按已栅格化的幻灯片数报告，并附上实际写入的字节数和按已写部分外推的总大小。
+        排版、标记和页码与 generate_pdf 一致。
+        
+        Args:
+            slide_images: 幻灯片序列
+            output_path (str): 输出PDF文件路径
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+            progress_callback (callable, optional): 进度回调函数
+            sheet_range (tuple, optional): 只生成 [起始纸张, 结束纸张) 范围内的纸张
+            
+        Returns:
+            bool: 是否成功
+        """
+        if not slide_images or len(slide_images) == 0:
+            print("没有幻灯片可处理")
+            return False
+        
+        try:
+            if progress_callback:
+                progress_callback(0, 100, "准备生成PDF...")
+            
+            chinese_font_name = self._register_label_font()
+            compression = config.get("image_compression", "auto")
+            jpeg_quality = config.get("jpeg_quality", DEFAULT_JPEG_QUALITY)
+            
+            items_per_page = layout_result["rows"] * layout_result["columns"]
+            slide_count = len(slide_images)
+            total_pages = (slide_count + items_per_page - 1) // items_per_page
+            first_sheet, last_sheet = sheet_range or (0, total_pages)
+            first_slide = first_sheet * items_per_page
+            last_slide = min(last_sheet * items_per_page, slide_count)
+            written_message = ""
+            
+            def written_progress(written, expected):
+                nonlocal written_message
+                written_message = f"，已写入 {written / 1048576:.1f} MB / 预计 {expected / 1048576:.1f} MB"
+            
+            def slide_progress(current, total, message):
                 if progress_callback:
-                    progress_callback(20 + (page_idx * 70) // total_pages, 100,
-                                    f"正在生成第 {page_idx + 1}/{total_pages} 页...")
+                    progress_callback(current * 99 // max(1, total), 100, message.rstrip(".") + written_message)
+            
+            encoded_iter = self._iter_encoded_slides(slide_images, export_dpi(slide_images, layout_result, config),
+                                                     compression, jpeg_quality, first_slide, last_slide,
+                                                     slide_progress)
+            write_sheets_streaming(encoded_iter, slide_count, output_path, layout_result, config, chinese_font_name,
+                                   (first_sheet, last_sheet), written_progress)
+            
+            if progress_callback:
+                progress_callback(100, 100, f"PDF生成完成，共 {os.path.getsize(output_path) / 1048576:.1f} MB")
+            return True
+        
+        except Exception as e:
+            print(f"生成PDF时发生错误: {e}")
+            if progress_callback:
+                progress_callback(100, 100, f"错误: {e}")
+            return False
+    
+    def generate_pdf_sharded(self, slide_images, output_path, layout_result, config, progress_callback=None):
+        """
+        分段并行生成PDF
+        
+        将纸张范围切分为若干段，每段在单独的进程中生成为独立的PDF，最后按顺序拼接，
+        并合并各段中重复的图像和字体。每个进程只持有自己那一段的页面，合并时逐段把对象
+        复制到输出文件，内存中只保留一段，导出时间随核数缩短。纸张较少或只有一个进程时直接生成。
+        
+        Args:
+            slide_images: 幻灯片序列
+            output_path (str): 输出PDF文件路径
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+            progress_callback (callable, optional): 进度回调函数
+            
+        Returns:
+            bool: 是否成功
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        
+        if not slide_images or len(slide_images) == 0:
+            print("没有幻灯片可处理")
+            return False
+        
+        workers = self.encode_workers or os.cpu_count() or 1
+        items_per_page = layout_result["rows"] * layout_result["columns"]
+        total_pages = (len(slide_images) + items_per_page - 1) // items_per_page
+        if workers <= 1 or total_pages < SHARD_MIN_SHEETS:
+            return self.generate_pdf(slide_images, output_path, layout_result, config, progress_callback,
+                                     sheet_range=(0, total_pages))
+        
+        if progress_callback:
+            progress_callback(0, 100, "正在准备分段生成...")
+        
+        source = slide_images
+        if not self._is_shareable(slide_images):
+            source = self.build_slide_store(slide_images)
+        
+        shards = plan_shards(total_pages, workers)
+        shard_paths = [self.create_temp_file(suffix=".pdf") for _ in shards]
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            futures = {executor.submit(render_shard, source, path, layout_result, config, sheet_range): index
+                       for index, (path, sheet_range) in enumerate(zip(shard_paths, shards))}
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    success = future.result()
+                except Exception as e:
+                    print(f"分段 {index + 1} 生成失败: {e}")
+                    success = False
+                if not success:
+                    # 在当前进程中重做该段
+                    print(f"在当前进程中重新生成第 {shards[index][0] + 1}-{shards[index][1]} 页")
+                    if not self.generate_pdf(slide_images, shard_paths[index], layout_result, config,
+                                             sheet_range=shards[index]):
+                        return False
+                if progress_callback:
+                    progress_callback(done * 85 // len(shards), 100, f"已生成 {done}/{len(shards)} 段")
+            
+            if progress_callback:
+                progress_callback(90, 100, "正在拼接PDF...")
+            merged = merge_shards(shard_paths, output_path)
+            print(f"分段生成完成：{len(shards)} 段，合并重复资源 {merged} 个")
+            
+            if progress_callback:
+                progress_callback(100, 100, "PDF生成完成")
+            return True
+        
+        except Exception as e:
+            print(f"分段生成PDF时发生错误: {e}")
+            if progress_callback:
+                progress_callback(100, 100, f"错误: {e}")
+            return False
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if source is not slide_images:
+                source.close()
+            elif isinstance(source, PDFSlideStream):
+                source.refresh_cache()
+            for path in shard_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def generate_pdf_within_budget(self, slide_images, output_path, layout_result, config, target_mb,
+                                   progress_callback=None):
+        """
+        在目标文件大小内生成PDF
 
-                # 处理当前页的每个位置
+        先抽样编码部分幻灯片，外推各候选设置（压缩方式、JPEG质量、打印分辨率）下的文件大小，
+        选出不超过目标的最高画质设置后只完整导出一次。结果记录在 last_size_report 中。
+
+        Args:
+            slide_images: 幻灯片序列
+            output_path (str): 输出PDF文件路径
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+            target_mb (float): 目标文件大小（MB）
+            progress_callback (callable, optional): 进度回调函数
+
+        Returns:
+            bool: 是否成功
+        """
+        target_bytes = int(target_mb * 1024 * 1024)
+        self.last_size_report = None
+        
+        if progress_callback:
+            progress_callback(0, 100, "正在抽样估算文件大小...")
+        
+        def estimate_progress(current, total, message):
+            if progress_callback:
+                progress_callback(current * 10 // max(1, total), 100, message)
+        
+        estimator = SizeEstimator(slide_images, layout_result, config)
+        try:
+            setting, predicted = estimator.plan(target_bytes, estimate_progress)
+        except Exception as e:
+            print(f"估算文件大小失败，按当前设置导出: {e}")
+            setting, predicted = {}, None
+        finally:
+            estimator.close()
+        
+        budget_config = dict(config)
+        budget_config.update(setting)
+        
+        def export_progress(current, total, message):
+            if progress_callback:
+                progress_callback(10 + current * 90 // max(1, total), 100, message)
+        
+        success = self.generate_pdf(slide_images, output_path, layout_result, budget_config, export_progress)
+        if not success:
+            return False
+        
+        achieved = os.path.getsize(output_path)
+        self.last_size_report = {
+            "target_bytes": target_bytes,
+            "predicted_bytes": predicted,
+            "achieved_bytes": achieved,
+            "within_target": achieved <= target_bytes,
+            "settings": setting,
+        }
+        predicted_text = f"{predicted / 1048576:.1f} MB" if predicted is not None else "未知"
+        print(f"目标大小 {target_mb:.1f} MB，预测 {predicted_text}，实际 {achieved / 1048576:.1f} MB，"
+              f"设置: {setting}")
+        return True
+
+    def _iter_encoded_slides(self, slide_images, dpi, compression, jpeg_quality, start=0, stop=None,
+                             progress_callback=None):
+        """
+        按顺序产出编码后的幻灯片图像
+
+        幻灯片较多时在进程池中并行栅格化和编码，工作进程只接收幻灯片源的路径信息；
+        普通图像列表先写入内存映射存储再交给工作进程。幻灯片较少或只用一个进程时在当前进程中编码。
+
+        Args:
+            slide_images: 图像列表、幻灯片流、集合或存储
+            dpi (int, optional): 目标分辨率
+            compression (str): 图像压缩方式
+            jpeg_quality (int): JPEG质量
+            start (int): 起始索引
+            stop (int, optional): 结束索引（不包含）
+            progress_callback (callable, optional): 进度回调函数，报告这一段中已栅格化的张数
+
+        Yields:
+            EncodedImage: 编码结果，单张失败时为None
+        """
+        stop = len(slide_images) if stop is None else stop
+        workers = self.encode_workers or os.cpu_count() or 1
+        if workers <= 1 or stop - start < PARALLEL_ENCODE_MIN_SLIDES:
+            # 内容相同的幻灯片只编码一次，写入PDF时共用同一个图像对象
+            cache = EncodedImageCache(compression, jpeg_quality)
+            slide_iter = iter_slide_images(slide_images, start, stop, dpi=dpi, progress_callback=progress_callback)
+            for slide_idx, slide_img in enumerate(slide_iter, start):
+                try:
+                    # 能复用源文件的JPEG/PNG数据时不重新编码
+                    yield cache.encode(slide_img)
+                except Exception as e:
+                    print(f"编码幻灯片 {slide_idx+1} 时出错: {e}")
+                    yield None
+            return
+
+        source = slide_images
+        if not self._is_shareable(slide_images):
+            source = self.build_slide_store(slide_images)
+        try:
+            total = stop - start
+            encoded_iter = iter_encoded_images(source, dpi, compression, jpeg_quality, workers=workers,
+                                               start=start, stop=stop)
+            for done, encoded in enumerate(encoded_iter, 1):
+                if progress_callback:
+                    progress_callback(done, total, f"已栅格化 {done}/{total} 张幻灯片...")
+                yield encoded
+        finally:
+            if source is not slide_images:
+                source.close()
+            elif isinstance(source, PDFSlideStream):
+                # 工作进程写入的栅格缓存，下次预览或导出可以直接使用
+                source.refresh_cache()
+
+    @staticmethod
+    def _is_shareable(slide_images):
+        """幻灯片序列能否只凭路径等轻量信息传给工作进程"""
+        if isinstance(slide_images, SlideSubset):
+            return PPTProcessor._is_shareable(slide_images.source)
+        return isinstance(slide_images, (PDFSlideStream, SlideCollection, SlideStore))
+
+    def collapse_builds(self, slide_images, threshold=DEFAULT_BUILD_THRESHOLD, progress_callback=None):
+        """
+        合并连续的动画分步幻灯片，每组只保留最后一步
+
+        以低分辨率计算每张幻灯片的感知哈希和缩略图初筛，相邻两张足够相似时再以较高分辨率
+        逐像素确认后一张完整保留了前一张的内容并且增加了内容，才视为同一组动画步骤。
+        同一序列的签名和确认结果只计算一次，调整阈值时直接重新分组。
+
+        Args:
+            slide_images: convert_ppt_to_images 返回的幻灯片序列
+            threshold (float): 视为同一组的最大差异比例
+            progress_callback (callable, optional): 进度回调函数
+
+        Returns:
+            SlideSubset: 合并后的幻灯片视图，slide_numbers 为保留的幻灯片在原演示文稿中的编号
+        """
+        source, signatures, checker = self._slide_signatures
+        if source is not slide_images:
+            if progress_callback:
+                progress_callback(0, 100, "正在比较幻灯片...")
+
+            def hash_progress(current, total, message):
+                if progress_callback:
+                    progress_callback(current * 90 // max(1, total), 100, f"正在比较幻灯片，{message}")
+
+            signatures = compute_slide_signatures(slide_images, progress_callback=hash_progress)
+            checker = ContainmentChecker(slide_images)
+            self._slide_signatures = (slide_images, signatures, checker)
+
+        if progress_callback:
+            progress_callback(95, 100, "正在逐像素确认动画步骤...")
+        collapsed = collapse_builds(slide_images, signatures, threshold, checker)
+        print(f"合并动画步骤: {len(slide_images)} 张幻灯片保留 {len(collapsed)} 张")
+        if progress_callback:
+            progress_callback(100, 100, f"保留 {len(collapsed)}/{len(slide_images)} 张幻灯片")
+        return collapsed
+
+    def _register_label_font(self):
+        """
+        获取用于页码和定位标记的中文字体，字体在进程内只解析和注册一次
+        
+        Returns:
+            str: 可用于绘制的字体名称，没有可用的中文字体时返回Helvetica
+        """
+        return get_font_registry().cjk_font()
+    
+    def generate_vector_pdf(self, source_pdf_path, output_path, layout_result, config, progress_callback=None,
+                            page_indices=None):
+        """
+        矢量直通模式：不栅格化幻灯片，直接将中间PDF的页面作为Form XObject排版到A4页面
+        
+        Args:
+            source_pdf_path (str): LibreOffice转换得到的幻灯片PDF
+            output_path (str): 输出PDF文件路径
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+            progress_callback (callable, optional): 进度回调函数
+            page_indices (list, optional): 只排版这些页面（如合并动画步骤后保留的幻灯片），默认全部
+            
+        Returns:
+            bool: 是否成功
+        """
+        from reportlab.lib.units import mm
+        from PyPDF2 import PdfWriter, PdfReader, PageObject
+        from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+        
+        try:
+            if not source_pdf_path or not os.path.exists(source_pdf_path):
+                print("没有可用于矢量排版的中间PDF")
+                return False
+            
+            if progress_callback:
+                progress_callback(0, 100, "准备矢量排版...")
+            
+            reader = PdfReader(source_pdf_path)
+            if page_indices is None:
+                page_indices = range(len(reader.pages))
+            slide_count = len(page_indices)
+            if slide_count == 0:
+                print("没有幻灯片可处理")
+                return False
+            
+            output_dir = os.path.dirname(output_path)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            
+            page_width = layout_result["page_width"] * mm
+            page_height = layout_result["page_height"] * mm
+            items_per_page = layout_result["rows"] * layout_result["columns"]
+            total_pages = (slide_count + items_per_page - 1) // items_per_page
+            
+            # 标记和页码仍由reportlab绘制，之后叠加到每一页上
+            if progress_callback:
+                progress_callback(10, 100, "正在生成页码标记...")
+            overlay_reader = PdfReader(self._build_label_overlay(slide_count, layout_result, config))
+            
+            writer = PdfWriter()
+            for page_idx in range(total_pages):
+                if progress_callback:
+                    progress_callback(20 + (page_idx * 70) // total_pages, 100,
+                                    f"正在排版第 {page_idx + 1}/{total_pages} 页...")
+                
+                xobjects = DictionaryObject()
+                operations = []
                 for pos in range(items_per_page):
                     slide_idx = page_idx * items_per_page + pos
-                    
                     if slide_idx >= slide_count:
                         break
                     
-                    # 计算行和列
-                    row = pos // columns
-                    col = pos % columns
-                    
-                    # 计算位置（毫米）
-                    x_mm = margin_left_mm + col * (item_width_mm + h_spacing_mm)
-                    y_mm = page_height_mm - margin_top_mm - item_height_mm - row * (item_height_mm + v_spacing_mm)
-                    
-                    # 转换为点（PDF单位）
-                    x = x_mm * mm
-                    y = y_mm * mm
-                    width = item_width_mm * mm
-                    height = item_height_mm * mm
-                    
                     try:
-                        # 获取当前幻灯片图像
-                        slide_img = slide_images[slide_idx]
-                        
-                        # 创建临时文件保存调整大小后的图像
-                        tmp_path = self.create_temp_file(suffix=".png")
-                        temp_image_files.append(tmp_path)
+                        _, (x, y, width, height) = slide_rects(slide_idx, layout_result)
+                        form, box = self._page_to_form_xobject(reader.pages[page_indices[slide_idx]])
                         
-                        # 调整图像大小
-                        slide_img.save(tmp_path, format="PNG")
+                        # 等比缩放并在格子内居中
+                        box_width = box[2] - box[0]
+                        box_height = box[3] - box[1]
+                        scale = min(width / box_width, height / box_height)
+                        tx = x + (width - box_width * scale) / 2 - box[0] * scale
+                        ty = y + (height - box_height * scale) / 2 - box[1] * scale
                         
-                        # 将图像添加到PDF
-                        c.drawImage(tmp_path, x, y, width, height)
-                        
-                        # 添加PPT定位页码标记
-                        if show_ppt_numbers:
-                            c.setFont(chinese_font_name, 8)
-                            label = f"{page_idx+1}-{pos+1}"
-                            # 放在PPT的左下角
-                            c.drawString(x, y - 10, label)
+                        name = f"/Slide{pos}"
+                        xobjects[NameObject(name)] = form
+                        operations.append(f"q {scale:.6f} 0 0 {scale:.6f} {tx:.4f} {ty:.4f} cm {name} Do Q")
                     except Exception as e:
                         print(f"处理幻灯片 {slide_idx+1} 时出错: {e}")
-                        # 如果单个幻灯片处理失败，继续处理下一个
                         continue
                 
-                # 添加纸张页码（在页面右下角）
-                if show_page_numbers:
-                    c.setFont(chinese_font_name, 10)
-                    # 使用中文页码格式
-                    page_number_text = f"第 {page_idx+1} 页"
-                    # 计算页码位置在右下角
-                    page_number_x = page_width_mm * mm - margin_right_mm * mm - 25  # 增加空间以容纳中文
-                    page_number_y = margin_bottom_mm * mm 
-                    c.drawString(page_number_x, page_number_y, page_number_text)
+                sheet = PageObject.create_blank_page(None, page_width, page_height)
+                contents = DecodedStreamObject()
+                contents.set_data("\n".join(operations).encode("latin-1"))
+                sheet[NameObject("/Resources")] = DictionaryObject({
+                    NameObject("/XObject"): xobjects
+                })
+                sheet[NameObject("/Contents")] = contents
+                
+                # 叠加定位标记和纸张页码
+                if page_idx < len(overlay_reader.pages):
+                    sheet.merge_page(overlay_reader.pages[page_idx])
+                sheet.compress_content_streams()
+                
+                writer.add_page(sheet)
             
-            # 报告进度：正在保存
             if progress_callback:
                 progress_callback(95, 100, "正在保存PDF文件...")
             
-            # 保存PDF
-            c.save()
+            with open(output_path, "wb") as f:
+                writer.write(f)
             
-            # 报告进度：完成
             if progress_callback:
                 progress_callback(100, 100, "PDF生成完成")
             
             return True
         
         except Exception as e:
-            print(f"生成PDF时发生错误: {e}")
+            print(f"矢量排版生成PDF时发生错误: {e}")
             if progress_callback:
                 progress_callback(100, 100, f"错误: {e}")
             return False
-        finally:
-            # 清理本次操作的临时文件
-            for temp_file in temp_image_files:
-                try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except Exception as e:
-                    print(f"清理临时文件失败: {temp_file} - {e}")
+    
+    def _page_to_form_xobject(self, page):
+        """
+        将PDF页面包装为Form XObject
+        
+        Args:
+            page: PyPDF2的页面对象
+            
+        Returns:
+            tuple: (Form XObject, 页面可见区域[llx, lly, urx, ury])
+        """
+        from PyPDF2.generic import ArrayObject, DecodedStreamObject, FloatObject, NameObject
+        
+        box = [float(v) for v in page.cropbox]
+        
+        form = DecodedStreamObject()
+        contents = page.get_contents()
+        form.set_data(contents.get_data() if contents is not None else b"")
+        form.update({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Form"),
+            NameObject("/BBox"): ArrayObject([FloatObject(v) for v in box]),
+        })
+        if "/Resources" in page:
+            form[NameObject("/Resources")] = page["/Resources"]
+        
+        # flate_encode 返回的新对象只带 /Filter，需要把表单的字典项复制过去
+        encoded = form.flate_encode()
+        for key, value in form.items():
+            if key not in ("/Filter", "/Length"):
+                encoded[key] = value
+        return encoded, box
+    
+    def _build_label_overlay(self, slide_count, layout_result, config):
+        """
+        生成只包含定位标记和纸张页码的透明叠加层PDF
+        
+        Args:
+            slide_count (int): 排版的幻灯片数量
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+        
+        Returns:
+            io.BytesIO: 叠加层PDF数据
+        """
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
+        
+        buffer = io.BytesIO()
+        page_size = (layout_result["page_width"] * mm, layout_result["page_height"] * mm)
+        c = canvas.Canvas(buffer, pagesize=page_size)
+        
+        chinese_font_name = self._register_label_font()
+        show_ppt_numbers = config.get("show_ppt_numbers", True)
+        show_page_numbers = config.get("show_page_numbers", True)
+        
+        items_per_page = layout_result["rows"] * layout_result["columns"]
+        total_pages = (slide_count + items_per_page - 1) // items_per_page
+        
+        for page_idx in range(total_pages):
+            if show_ppt_numbers:
+                for pos in range(items_per_page):
+                    slide_idx = page_idx * items_per_page + pos
+                    if slide_idx >= slide_count:
+                        break
+                    _, (x, y, _, _) = slide_rects(slide_idx, layout_result)
+                    draw_slide_label(c, chinese_font_name, layout_result.labels[slide_idx], x, y)
+            if show_page_numbers:
+                draw_page_number(c, chinese_font_name, page_idx, layout_result, config)
+            c.showPage()
+        
+        c.save()
+        buffer.seek(0)
+        return buffer
     
     def generate_pdf_with_index(self, markdown_text, content_pdf_path, final_output_path, progress_callback=None):
         """
@@ -552,6 +1191,9 @@ class PPTProcessor:
         Returns:
             bool: 是否成功
         """
+        from reportlab.lib.pagesizes import A4
+        from PyPDF2 import PdfWriter, PdfReader
+        
         # 创建一个临时的PDF文件用于存放索引
         index_fd, index_pdf_path = tempfile.mkstemp(suffix=".pdf")
         os.close(index_fd)
@@ -631,6 +1273,9 @@ class PPTProcessor:
         Returns:
             dict: 包含pagesize等信息的配置字典
         """
+        from reportlab.lib.pagesizes import A4, landscape
+        from PyPDF2 import PdfReader
+        
         try:
             with open(pdf_path, "rb") as f:
                 pdf = PdfReader(f)
@@ -674,49 +1319,10 @@ class PPTProcessor:
             output_path (str): 输出PDF路径
             content_pdf_config (dict, optional): 内容PDF的配置，包括pagesize等信息
         """
-        # 注册中文字体
-        try:
-            # 首先尝试使用项目自带的Source Han Sans字体
-            source_han_sans_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
-                                               'resources', 'SourceHanSans.ttf')
-            
-            if os.path.exists(source_han_sans_path):
-                chinese_font_name = "SourceHanSans"
-                pdfmetrics.registerFont(TTFont(chinese_font_name, source_han_sans_path))
-                print(f"已注册内置中文字体: {chinese_font_name}")
-            else:
-                # 如果内置字体不可用，尝试使用系统字体
-                font_paths = [
-                    # Windows 中文字体路径
-                    "C:/Windows/Fonts/simhei.ttf",           # 黑体
-                    "C:/Windows/Fonts/simsun.ttc",           # 宋体
-                    "C:/Windows/Fonts/simkai.ttf",           # 楷体
-                    "C:/Windows/Fonts/msyh.ttc",             # 微软雅黑
-                    # Mac OS 中文字体路径
-                    "/System/Library/Fonts/PingFang.ttc",    # 苹方
-                    # Linux 中文字体路径
-                    "/usr/share/fonts/truetype/arphic/uming.ttc",
-                    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc"
-                ]
-                
-                # 搜索系统中的字体文件
-                font_file = None
-                for path in font_paths:
-                    if os.path.exists(path):
-                        font_file = path
-                        break
-                
-                # 如果找到字体文件，则注册字体
-                if font_file:
-                    chinese_font_name = "SimHei" if "simhei" in font_file.lower() else "ChineseFont"
-                    pdfmetrics.registerFont(TTFont(chinese_font_name, font_file))
-                    print(f"已注册系统中文字体: {chinese_font_name} 从 {font_file}")
-                else:
-                    print("警告: 未找到合适的中文字体文件")
-                    chinese_font_name = "Helvetica"  # 回退到默认字体
-        except Exception as e:
-            print(f"注册中文字体时出错: {e}")
-            chinese_font_name = "Helvetica"
+        from reportlab.lib.pagesizes import A4
+        
+        # 中文字体在进程内只解析和注册一次
+        chinese_font_name = get_font_registry().cjk_font()
 
         # 使用内容PDF的页面尺寸
         pagesize = None
@@ -0,0 +1,213 @@
+import hashlib
+import math
+
+# 纸张数少于该值时不分段，启动进程和合并的开销超过并行的收益
+SHARD_MIN_SHEETS = 8
+
+# 每段的最大纸张数：段越小，单个进程同时持有的页面和图像越少
+SHARD_MAX_SHEETS = 48
+
+def plan_shards(total_sheets, workers, max_sheets=SHARD_MAX_SHEETS):
+    """
+    将纸张范围均匀切分为若干段
+
+    Args:
+        total_sheets (int): 纸张总数
+        workers (int): 进程数
+        max_sheets (int): 每段的最大纸张数
+
+    Returns:
+        list: 按顺序排列的 (起始纸张, 结束纸张) 元组，结束纸张不包含
+    """
+    if total_sheets <= 0:
+        return []
+    shard_count = max(workers, math.ceil(total_sheets / max_sheets))
+    shard_count = min(shard_count, total_sheets)
+    size = math.ceil(total_sheets / shard_count)
+    return [(first, min(first + size, total_sheets)) for first in range(0, total_sheets, size)]
+
+
+def render_shard(source, output_path, layout_result, config, sheet_range):
+    """
+    在工作进程中把一段纸张生成为单独的PDF
+
+    只调用编码和绘制函数，不创建处理器（临时目录、转换缓存等都用不到）。
+
+    Args:
+        source: 可序列化的幻灯片源
+        output_path (str): 该段的输出路径
+        layout_result (LayoutPlan): 布局方案
+        config (dict): 布局配置
+        sheet_range (tuple): (起始纸张, 结束纸张)
+
+    Returns:
+        bool: 是否成功
+    """
+    from src.utils.font_registry import get_font_registry
+    from src.utils.parallel_encoder import iter_encoded_range
+    from src.utils.pdf_images import DEFAULT_JPEG_QUALITY
+    from src.utils.sheet_drawing import export_dpi, write_sheets_streaming
+
+    try:
+        items_per_page = layout_result["rows"] * layout_result["columns"]
+        slide_count = len(source)
+        first_slide = sheet_range[0] * items_per_page
+        last_slide = min(sheet_range[1] * items_per_page, slide_count)
+        encoded_slides = iter_encoded_range(source, first_slide, last_slide, export_dpi(source, layout_result, config),
+                                            config.get("image_compression", "auto"),
+                                            config.get("jpeg_quality", DEFAULT_JPEG_QUALITY))
+        write_sheets_streaming(encoded_slides, slide_count, output_path, layout_result, config,
+                               get_font_registry().cjk_font(), sheet_range)
+        return True
+    except Exception as e:
+        print(f"生成第 {sheet_range[0] + 1}-{sheet_range[1]} 页时出错: {e}")
+        return False
+
+
+def _object_key(obj, memo, depth=0):
+    """
+    计算PDF对象的内容键，内容相同的对象（包括其引用的对象）键相同
+
+    流对象按原始（未解码）数据计算摘要，不解压图像。
+    """
+    from PyPDF2.generic import IndirectObject, DictionaryObject, ArrayObject, StreamObject
+
+    if depth > 16:
+        return None
+    if isinstance(obj, IndirectObject):
+        memo_key = (id(obj.pdf), obj.idnum)
+        if memo_key not in memo:
+            memo[memo_key] = _object_key(obj.get_object(), memo, depth + 1)
+        return memo[memo_key]
+    if isinstance(obj, DictionaryObject):
+        entries = tuple(sorted((str(name), _object_key(value, memo, depth + 1))
+                               for name, value in obj.items() if name != "/Length"))
+        if isinstance(obj, StreamObject):
+            return ("stream", entries, hashlib.sha256(obj._data).hexdigest())
+        return ("dict", entries)
+    if isinstance(obj, ArrayObject):
+        return ("array", tuple(_object_key(value, memo, depth + 1) for value in obj))
+    return (type(obj).__name__, repr(obj))
+
+
+class _ShardCopier:
+    """
+    把一段PDF中页面用到的对象逐个复制到输出文件
+
+    对象写出后不再保留，内存中只有段内对象编号到输出对象编号的映射；页面资源中内容相同的
+    图像、表单和字体指向第一次写出的对象。
+    """
+
+    def __init__(self, reader, writer, canonical):
+        """
+        Args:
+            reader (PdfReader): 这一段的PDF
+            writer (StreamingPDFWriter): 输出文件
+            canonical (dict): 各段共用的 {资源内容键: 输出对象编号}
+        """
+        self.reader = reader
+        self.writer = writer
+        self.canonical = canonical
+        self.merged = 0
+        self._ids = {}
+        self._memo = {}
+
+    def copy_page(self, page):
+        """复制一页及其引用的对象，并加入输出文件的页面树"""
+        from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject
+
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+        for category in ("/XObject", "/Font"):
+            entries = resources.get(category)
+            if entries is None:
+                continue
+            for ref in entries.get_object().values():
+                if not isinstance(ref, IndirectObject) or ref.idnum in self._ids:
+                    continue
+                key = _object_key(ref, self._memo)
+                if key is None:
+                    continue
+                if key in self.canonical:
+                    self._ids[ref.idnum] = self.canonical[key]
+                    self.merged += 1
+                else:
+                    self.canonical[key] = self._reference(ref)
+
+        copied = DictionaryObject((NameObject(name), self._copy(value))
+                                  for name, value in page.items() if name != "/Parent")
+        copied[NameObject("/Parent")] = IndirectObject(self.writer.page_tree_id, 0, None)
+        page_id = self.writer.reserve_object()
+        self.writer.write_object(page_id, _serialize(copied))
+        self.writer.append_page(page_id)
+
+    def _reference(self, ref):
+        """段内对象对应的输出对象编号，首次遇到时复制并写出"""
+        object_id = self._ids.get(ref.idnum)
+        if object_id is None:
+            # 先登记编号再复制内容，循环引用时直接使用登记的编号
+            object_id = self._ids[ref.idnum] = self.writer.reserve_object()
+            self.writer.write_object(object_id, _serialize(self._copy(ref.get_object())))
+        return object_id
+
+    def _copy(self, obj):
+        """复制对象，把其中的间接引用换成输出文件中的编号"""
+        from PyPDF2.generic import IndirectObject, DictionaryObject, ArrayObject, StreamObject, NameObject
+
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._reference(obj), 0, None)
+        if isinstance(obj, StreamObject):
+            # 流数据按原样（不解码）复制，Length 在写出时重新计算
+            copied = StreamObject()
+            copied._data = obj._data
+            copied.update((NameObject(name), self._copy(value)) for name, value in obj.items() if name != "/Length")
+            return copied
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject((NameObject(name), self._copy(value)) for name, value in obj.items())
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value) for value in obj)
+        return obj
+
+
+def _serialize(obj):
+    import io
+
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer, None)
+    return buffer.getvalue()
+
+
+def merge_shards(shard_paths, output_path):
+    """
+    按顺序拼接各段PDF，合并各段中内容相同的资源
+
+    每段都会写入自己的字体子集和重复的幻灯片图像；拼接时按内容把页面资源中的
+    图像、表单和字体指向第一次出现的对象，最终文件中每份资源只保存一次。
+    各段依次读取，对象逐个写入输出文件，同一时间只有一段的对象在内存中。
+
+    Args:
+        shard_paths (list): 各段PDF路径，按页面顺序排列
+        output_path (str): 输出路径
+
+    Returns:
+        int: 合并掉的重复资源对象数
+    """
+    from PyPDF2 import PdfReader
+
+    from src.utils.streaming_pdf import StreamingPDFWriter
+
+    writer = StreamingPDFWriter(output_path)
+    try:
+        canonical = {}
+        merged = 0
+        for path in shard_paths:
+            with open(path, "rb") as f:
+                copier = _ShardCopier(PdfReader(f), writer, canonical)
+                for page in copier.reader.pages:
+                    copier.copy_page(page)
+            merged += copier.merged
+        writer.close()
+        return merged
+    except BaseException:
+        writer.abort()
+        raise
@@ -0,0 +1,154 @@
+import os
+
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_PRINT_DPI
+from src.utils.placement import SLIDE_LABEL_OFFSET_PT, SLIDE_LABEL_SIZE_PT
+from src.utils.streaming_pdf import StreamingPDFWriter, StreamingPage
+
+
+def slide_rects(slide_idx, layout_result):
+    """
+    从布局表中取出第slide_idx张幻灯片的位置
+
+    Args:
+        slide_idx (int): 幻灯片索引
+        layout_result (LayoutPlan): 布局方案，包含布局表
+
+    Returns:
+        tuple: (幻灯片区域, 所在格子)，均为 (x, y, width, height)，单位为PDF点，原点在左下角；
+               幻灯片区域按原宽高比在格子内居中
+    """
+    from reportlab.lib.units import mm
+
+    placement = layout_result["placements"][slide_idx]
+    page_height = layout_result["page_height"]
+    cell_width = layout_result["item_width"]
+    cell_height = layout_result["item_height"]
+
+    # 布局表的原点在纸张左上角，PDF的原点在左下角
+    slide_rect = (float(placement["x"]) * mm,
+                  (page_height - float(placement["y"]) - float(placement["h"])) * mm,
+                  float(placement["w"]) * mm, float(placement["h"]) * mm)
+    cell_rect = (float(placement["cell_x"]) * mm,
+                 (page_height - float(placement["cell_y"]) - cell_height) * mm,
+                 cell_width * mm, cell_height * mm)
+    return slide_rect, cell_rect
+
+
+def draw_label_text(c, font_name, x, y, text, size):
+    """绘制标记文本；c 可以是画布或流式写入器的页面，两者都只嵌入用到的字符子集"""
+    if isinstance(c, StreamingPage):
+        c.draw_text(x, y, text, size, font_name)
+    else:
+        c.setFont(font_name, size)
+        c.drawString(x, y, text)
+
+
+def draw_slide_label(c, font_name, label, x, y):
+    """在格子左下角绘制布局方案中的定位标记"""
+    draw_label_text(c, font_name, x, y - SLIDE_LABEL_OFFSET_PT, label, SLIDE_LABEL_SIZE_PT)
+
+
+def draw_page_number(c, font_name, page_idx, layout_result, config):
+    """在页面右下角绘制纸张页码"""
+    from reportlab.lib.units import mm
+
+    margin_left_mm = config["margin_left"]
+    margin_right_mm = config.get("margin_right", margin_left_mm)
+    margin_bottom_mm = config.get("margin_bottom", config["margin_top"])
+
+    # 使用中文页码格式
+    page_number_text = f"第 {page_idx+1} 页"
+    # 计算页码位置在右下角
+    page_number_x = layout_result["page_width"] * mm - margin_right_mm * mm - 25  # 增加空间以容纳中文
+    page_number_y = margin_bottom_mm * mm
+    draw_label_text(c, font_name, page_number_x, page_number_y, page_number_text, 10)
+
+
+def export_dpi(slide_images, layout_result, config):
+    """
+    幻灯片流和集合按打印尺寸所需的分辨率取图，而不是固定分辨率
+
+    Returns:
+        int: 栅格化dpi，普通图像列表返回None
+    """
+    if not hasattr(slide_images, "dpi_for_pixel_width"):
+        return None
+    target_width, _ = LayoutCalculator.required_pixel_size(layout_result,
+                                                           config.get("print_dpi", DEFAULT_PRINT_DPI))
+    return slide_images.dpi_for_pixel_width(target_width)
+
+
+def write_sheets_streaming(encoded_slides, slide_count, output_path, layout_result, config, font_name,
+                           sheet_range=None, progress_callback=None):
+    """
+    用流式写入器把一段纸张写成PDF，每张纸绘制完成后立即写出
+
+    只依赖已编码的幻灯片和布局方案，不持有处理器状态，可以直接在工作进程中调用。
+
+    Args:
+        encoded_slides: 按顺序产出这一段幻灯片的 EncodedImage 的迭代器，单张失败时为None
+        slide_count (int): 整份文档的幻灯片数
+        output_path (str): 输出PDF文件路径
+        layout_result (LayoutPlan): 布局方案
+        config (dict): 布局配置
+        font_name (str): 定位标记和页码使用的字体名称
+        sheet_range (tuple, optional): 只生成 [起始纸张, 结束纸张) 范围内的纸张，页码和定位标记
+            仍按整份文档编号
+        progress_callback (callable, optional): 每写完一张纸调用一次，参数为已写入和预计的总字节数
+
+    Returns:
+        int: 写出的纸张数
+    """
+    from reportlab.lib.units import mm
+
+    show_ppt_numbers = config.get("show_ppt_numbers", True)
+    show_page_numbers = config.get("show_page_numbers", True)
+    items_per_page = layout_result["rows"] * layout_result["columns"]
+    total_pages = (slide_count + items_per_page - 1) // items_per_page
+    first_sheet, last_sheet = sheet_range or (0, total_pages)
+    first_slide = first_sheet * items_per_page
+    last_slide = min(last_sheet * items_per_page, slide_count)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    writer = StreamingPDFWriter(output_path, (layout_result["page_width"] * mm, layout_result["page_height"] * mm))
+    try:
+        page = None
+
+        def finish_page(page_idx):
+            if show_page_numbers:
+                draw_page_number(page, font_name, page_idx, layout_result, config)
+            writer.end_page(page)
+            if progress_callback:
+                # 按已写入的字节数外推整份文件的大小
+                done = min(page_idx + 1, last_sheet) * items_per_page - first_slide
+                written = writer.bytes_written
+                progress_callback(written, max(written, written * (last_slide - first_slide) // max(1, done)))
+
+        for slide_idx, encoded in enumerate(encoded_slides, first_slide):
+            page_idx, pos = divmod(slide_idx, items_per_page)
+            if pos == 0:
+                if page is not None:
+                    finish_page(page_idx - 1)
+                page = writer.begin_page()
+
+            (x, y, width, height), (cell_x, cell_y, _, _) = slide_rects(slide_idx, layout_result)
+            try:
+                if encoded is None:
+                    raise ValueError("图像编码失败")
+                page.draw_image(encoded, x, y, width, height)
+                if show_ppt_numbers:
+                    draw_slide_label(page, font_name, layout_result.labels[slide_idx], cell_x, cell_y)
+            except Exception as e:
+                print(f"处理幻灯片 {slide_idx+1} 时出错: {e}")
+                continue
+
+        if page is not None:
+            finish_page(last_sheet - 1)
+        writer.close()
+        return writer.page_count
+    except BaseException:
+        writer.abort()
+        raise
@@ -0,0 +1,194 @@
+import math
+
+from src.utils.pdf_images import encode_image, pixel_digest
+from src.utils.pdf_rasterizer import iter_slide_images
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_PRINT_DPI
+
+# 用于估算的抽样幻灯片数
+BUDGET_SAMPLE_SLIDES = 8
+
+# 预测值需要低于目标大小的比例，留出估算误差
+BUDGET_SAFETY = 0.92
+
+# 图像以外的固定开销（文档结构、标记字形）和每页开销（页面对象和内容流）
+FIXED_OVERHEAD_BYTES = 48 * 1024
+PAGE_OVERHEAD_BYTES = 1536
+
+# 依次降低画质的候选设置：(打印分辨率比例, 压缩方式, JPEG质量)
+# 先降低照片的JPEG质量，再全部改用JPEG，最后降低分辨率
+BUDGET_LADDER = (
+    (1.0, "auto", None),
+    (1.0, "auto", 75),
+    (1.0, "jpeg", 80),
+    (1.0, "jpeg", 65),
+    (0.8, "jpeg", 65),
+    (0.65, "jpeg", 60),
+    (0.5, "jpeg", 55),
+    (0.4, "jpeg", 45),
+)
+
+# 降低分辨率时不低于该值
+MIN_BUDGET_DPI = 72
+
+
+def sample_indices(count, samples=BUDGET_SAMPLE_SLIDES):
+    """在幻灯片中均匀抽样，返回升序且不重复的索引"""
+    if count <= samples:
+        return list(range(count))
+    step = count / samples
+    return sorted({int(step * i + step / 2) for i in range(samples)})
+
+
+class SizeEstimator:
+    """
+    按抽样幻灯片的编码大小外推整份PDF的大小，为目标文件大小选择编码设置
+
+    抽样幻灯片只按最高分辨率取一次，较低分辨率由它缩小得到；同一设置的结果会缓存。
+    导出时内容相同的幻灯片只写入一次，抽样中重复出现的幻灯片也只计一次大小。
+    """
+
+    def __init__(self, slide_images, layout_result, config, samples=BUDGET_SAMPLE_SLIDES):
+        """
+        Args:
+            slide_images: 幻灯片序列
+            layout_result (LayoutPlan): 布局方案
+            config (dict): 布局配置
+            samples (int): 抽样幻灯片数
+        """
+        self.slide_images = slide_images
+        self.layout_result = layout_result
+        self.config = config
+        self.print_dpi = config.get("print_dpi", DEFAULT_PRINT_DPI)
+
+        self._indices = sample_indices(len(slide_images), samples)
+        self._samples = None
+        self._distinct = None
+        self._estimates = {}
+
+    @property
+    def can_resample(self):
+        """幻灯片序列能否按较低分辨率取图；图像列表导出时保持原尺寸，降低分辨率无效"""
+        return hasattr(self.slide_images, "dpi_for_pixel_width")
+
+    def candidates(self):
+        """
+        Returns:
+            list: 由高到低画质排列的候选设置，每项包含 print_dpi、image_compression、jpeg_quality
+        """
+        result = []
+        for scale, compression, quality in BUDGET_LADDER:
+            if scale < 1 and not self.can_resample:
+                continue
+            dpi = max(MIN_BUDGET_DPI, round(self.print_dpi * scale))
+            setting = {
+                "print_dpi": min(dpi, self.print_dpi),
+                "image_compression": compression,
+                "jpeg_quality": quality or self.config.get("jpeg_quality"),
+            }
+            if setting not in result:
+                result.append(setting)
+        return result
+
+    def _load_samples(self, progress_callback=None):
+        """
+        按当前打印分辨率取出抽样幻灯片
+
+        Args:
+            progress_callback (callable, optional): 进度回调函数，报告已栅格化的抽样张数
+
+        Returns:
+            list: 抽样幻灯片图像
+        """
+        if self._samples is None:
+            dpi = None
+            if self.can_resample:
+                target_width, _ = LayoutCalculator.required_pixel_size(self.layout_result, self.print_dpi)
+                dpi = self.slide_images.dpi_for_pixel_width(target_width)
+            total = len(self._indices)
+            self._samples = []
+            for done, index in enumerate(self._indices, 1):
+                self._samples.append(next(iter_slide_images(self.slide_images, index, index + 1, dpi=dpi)))
+                if progress_callback:
+                    progress_callback(done, total, f"已栅格化抽样幻灯片 {done}/{total}...")
+            # 每种内容只保留第一张，重复的幻灯片在导出时共用同一个图像对象
+            seen = set()
+            self._distinct = []
+            for image in self._samples:
+                digest = pixel_digest(image)
+                if digest not in seen:
+                    seen.add(digest)
+                    self._distinct.append(image)
+        return self._samples
+
+    def _scaled_sample(self, image, print_dpi):
+        """将抽样图像缩小到较低打印分辨率对应的尺寸"""
+        from PIL import Image
+
+        if print_dpi >= self.print_dpi or not self.can_resample:
+            return image
+        scale = print_dpi / self.print_dpi
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        return image.resize(size, Image.Resampling.LANCZOS)
+
+    def estimate(self, setting):
+        """
+        预测按该设置导出的PDF大小
+
+        Args:
+            setting (dict): candidates() 中的一项
+
+        Returns:
+            int: 预测的字节数
+        """
+        key = (setting["print_dpi"], setting["image_compression"], setting["jpeg_quality"])
+        if key not in self._estimates:
+            samples = self._load_samples()
+            sizes = []
+            for image in self._distinct:
+                scaled = self._scaled_sample(image, setting["print_dpi"])
+                encoded = encode_image(scaled, setting["image_compression"], setting["jpeg_quality"])
+                sizes.append(len(encoded.data))
+            slide_count = len(self.slide_images)
+            items_per_page = self.layout_result["rows"] * self.layout_result["columns"]
+            pages = math.ceil(slide_count / items_per_page)
+            # 按抽样中不重复的比例外推：重复的幻灯片不增加大小
+            average = sum(sizes) / max(1, len(samples))
+            self._estimates[key] = int(average * slide_count + FIXED_OVERHEAD_BYTES + pages * PAGE_OVERHEAD_BYTES)
+        return self._estimates[key]
+
+    def plan(self, target_bytes, progress_callback=None):
+        """
+        选择预测大小不超过目标的最高画质设置
+
+        Args:
+            target_bytes (int): 目标文件大小
+            progress_callback (callable, optional): 进度回调函数
+
+        Returns:
+            tuple: (设置, 预测字节数)，所有设置都超出目标时返回最小的一个
+        """
+        candidates = self.candidates()
+        # 抽样幻灯片的栅格化和各候选设置的编码合计为总进度
+        sample_count = len(self._indices)
+        steps = sample_count + len(candidates)
+
+        def sample_progress(current, total, message):
+            if progress_callback:
+                progress_callback(current, steps, message)
+
+        self._load_samples(sample_progress)
+        best = None
+        for done, setting in enumerate(candidates, 1):
+            predicted = self.estimate(setting)
+            if progress_callback:
+                progress_callback(sample_count + done, steps, f"正在估算文件大小 {done}/{len(candidates)}...")
+            if predicted <= target_bytes * BUDGET_SAFETY:
+                return setting, predicted
+            if best is None or predicted < best[1]:
+                best = (setting, predicted)
+        return best
+
+    def close(self):
+        """释放抽样图像"""
+        self._samples = None
+        self._distinct = None
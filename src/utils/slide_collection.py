@@ -0,0 +1,244 @@
+import os
+import math
+import threading
+from collections import OrderedDict
+
+from src.utils.pdf_images import mark_intermediate
+
+# 每个像素按RGB三通道估算内存占用
+BYTES_PER_PIXEL = 3
+
+
+class SlideHandle:
+    """
+    单张幻灯片的轻量句柄，只记录尺寸和像素来源，不持有解码后的图像
+    """
+
+    __slots__ = ("index", "size", "path")
+
+    def __init__(self, index, size, path=None):
+        """
+        Args:
+            index (int): 幻灯片索引
+            size (tuple): 像素尺寸 (宽, 高)
+            path (str, optional): 图像文件路径，尚未落盘的图像为None
+        """
+        self.index = index
+        self.size = size
+        self.path = path
+
+    @property
+    def aspect_ratio(self):
+        """宽高比"""
+        width, height = self.size
+        return width / height
+
+    @property
+    def nbytes(self):
+        """解码后的估算内存占用"""
+        width, height = self.size
+        return width * height * BYTES_PER_PIXEL
+
+
+class SlideCollection:
+    """
+    按需解码的幻灯片集合
+
+    每张幻灯片只保存一个句柄（尺寸和来源文件），像素在使用时才解码；已解码的图像
+    按最近使用顺序驻留，总量超过内存预算时淘汰最久未用的。没有来源文件的图像
+    （如直接从演示文稿中提取的图片）被淘汰时先以快速压缩的PNG写入溢出目录。
+    对外与 PDFSlideStream 一样表现为只读列表，并支持按分辨率遍历。
+    """
+
+    def __init__(self, spill_dir, memory_budget_mb=512, page_size_pts=None):
+        """
+        Args:
+            spill_dir (str): 溢出目录，用于保存被淘汰的内存图像
+            memory_budget_mb (int): 驻留图像的内存上限（MB）
+            page_size_pts (tuple, optional): 幻灯片页面尺寸（磅），用于换算分辨率
+        """
+        self.spill_dir = spill_dir
+        self.memory_budget_mb = memory_budget_mb
+        self.page_size_pts = page_size_pts
+        self.handles = []
+
+        self._resident = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+
+    def add_file(self, path):
+        """
+        添加一张来自图像文件的幻灯片，只读取文件头获取尺寸
+
+        Returns:
+            SlideHandle: 新句柄
+        """
+        from PIL import Image
+
+        with Image.open(path) as image:
+            size = image.size
+        handle = SlideHandle(len(self.handles), size, path)
+        self.handles.append(handle)
+        return handle
+
+    def add_image(self, image):
+        """
+        添加一张内存中的幻灯片图像，被淘汰时再写入溢出目录
+
+        Returns:
+            SlideHandle: 新句柄
+        """
+        handle = SlideHandle(len(self.handles), image.size)
+        self.handles.append(handle)
+        with self._lock:
+            self._make_resident(handle, image)
+        return handle
+
+    def __getstate__(self):
+        """
+        序列化时只传递句柄，工作进程从来源文件自行解码
+
+        尚未落盘的内存图像先写入溢出目录，之后再序列化不会重复写入。
+        """
+        with self._lock:
+            for index, image in self._resident.items():
+                handle = self.handles[index]
+                if handle.path is None:
+                    self._spill(handle, image)
+            return {"spill_dir": self.spill_dir, "memory_budget_mb": self.memory_budget_mb,
+                    "page_size_pts": self.page_size_pts, "handles": self.handles}
+
+    def __setstate__(self, state):
+        self.__init__(state["spill_dir"], state["memory_budget_mb"], state["page_size_pts"])
+        self.handles = state["handles"]
+
+    def __len__(self):
+        return len(self.handles)
+
+    def __bool__(self):
+        return bool(self.handles)
+
+    def __iter__(self):
+        return self.iter_images()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.handles)
+        if not 0 <= index < len(self.handles):
+            raise IndexError("幻灯片索引超出范围")
+        return self.get_image(index)
+
+    @property
+    def aspect_ratio(self):
+        """幻灯片宽高比，不需要解码任何图像"""
+        if self.page_size_pts:
+            width_pts, height_pts = self.page_size_pts
+            return width_pts / height_pts
+        return self.handles[0].aspect_ratio
+
+    def aspect_ratios(self):
+        """每张幻灯片图像的实际宽高比（提取的图片可能与页面比例不同）"""
+        return [handle.aspect_ratio for handle in self.handles]
+
+    def native_dpi(self, index):
+        """幻灯片图像相对于页面尺寸的分辨率，页面尺寸未知时返回None"""
+        if not self.page_size_pts:
+            return None
+        return self.handles[index].size[0] * 72 / self.page_size_pts[0]
+
+    def dpi_for_pixel_width(self, pixel_width):
+        """
+        计算让幻灯片达到指定像素宽度所需的分辨率
+
+        Args:
+            pixel_width (float): 目标像素宽度
+
+        Returns:
+            int: dpi，页面尺寸未知时返回None（按原始尺寸使用）
+        """
+        if not self.page_size_pts:
+            return None
+        return max(1, math.ceil(pixel_width * 72 / self.page_size_pts[0]))
+
+    def get_image(self, index):
+        """
+        获取解码后的幻灯片图像，未驻留时从来源文件解码
+
+        Returns:
+            PIL.Image.Image: 幻灯片图像，调用方不应关闭或修改它
+        """
+        from PIL import Image
+
+        with self._lock:
+            image = self._resident.get(index)
+            if image is not None:
+                self._resident.move_to_end(index)
+                return image
+
+            # 集合中的文件都是转换过程写出的中间栅格（导出图片或溢出文件）
+            handle = self.handles[index]
+            image = mark_intermediate(Image.open(handle.path))
+            image.load()
+            self._make_resident(handle, image)
+            return image
+
+    def iter_images(self, start=0, stop=None, dpi=None, progress_callback=None):
+        """
+        逐张产出幻灯片图像
+
+        Args:
+            start (int): 起始索引
+            stop (int, optional): 结束索引（不包含）
+            dpi (int, optional): 目标分辨率，低于图像原始分辨率时缩小
+            progress_callback (callable, optional): 进度回调函数，报告已产出的张数
+
+        Yields:
+            PIL.Image.Image: 幻灯片图像
+        """
+        from PIL import Image
+
+        stop = len(self.handles) if stop is None else min(stop, len(self.handles))
+        total = max(0, stop - start)
+        for done, index in enumerate(range(start, stop), 1):
+            image = self.get_image(index)
+            native = self.native_dpi(index)
+            if dpi and native and dpi < native:
+                width, height = self.handles[index].size
+                scale = dpi / native
+                image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                     Image.Resampling.LANCZOS)
+            if progress_callback:
+                progress_callback(done, total, f"已加载 {done}/{total} 张幻灯片...")
+            yield image
+
+    def _make_resident(self, handle, image):
+        """登记驻留图像，超出内存预算时淘汰最久未用的图像（至少保留刚登记的这张）"""
+        self._resident[handle.index] = image
+        self._resident_bytes += handle.nbytes
+
+        budget = self.memory_budget_mb * 1024 * 1024
+        while self._resident_bytes > budget and len(self._resident) > 1:
+            index, evicted = self._resident.popitem(last=False)
+            evicted_handle = self.handles[index]
+            self._resident_bytes -= evicted_handle.nbytes
+            if evicted_handle.path is None:
+                self._spill(evicted_handle, evicted)
+
+    def _spill(self, handle, image):
+        """将没有来源文件的图像写入溢出目录"""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"slide_{handle.index:05d}.png")
+        # 低压缩级别：溢出写入要快，体积其次
+        image.save(path, format="PNG", compress_level=1)
+        handle.path = path
+
+    def close(self):
+        """释放所有驻留图像，句柄和溢出文件保留"""
+        with self._lock:
+            for image in self._resident.values():
+                try:
+                    image.close()
+                except Exception:
+                    pass
+            self._resident.clear()
+            self._resident_bytes = 0
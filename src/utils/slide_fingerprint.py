@@ -0,0 +1,200 @@
+import hashlib
+
+# 不影响幻灯片渲染结果的关系类型（按关系类型URI的末段匹配）
+IGNORED_RELTYPES = {"notesSlide", "slide", "comments", "commentAuthors", "tags"}
+
+# 幻灯片编号字段（<a:fld type="slidenum">）的渲染结果取决于幻灯片在演示文稿中的位置
+SLIDE_NUMBER_FIELD = b'type="slidenum"'
+
+
+def _iter_rels(part):
+    """遍历部件的关系，兼容不同版本python-pptx的关系集合"""
+    rels = part.rels
+    return rels.values() if isinstance(rels, dict) else iter(rels)
+
+
+def _reltype_name(rel):
+    return rel.reltype.rsplit("/", 1)[-1]
+
+
+def has_slide_number_field(slide):
+    """幻灯片是否包含幻灯片编号字段"""
+    return SLIDE_NUMBER_FIELD in slide.part.blob
+
+
+class SlideFingerprinter:
+    """
+    计算PPTX中每张幻灯片的内容指纹
+
+    指纹覆盖幻灯片XML、它引用的媒体和图表等部件、所用的版式和母版（含主题与背景图），
+    任何一项变化都会改变指纹；备注、批注等不影响渲染的部件不参与计算。
+    同一份演示文稿中共享的版式、母版和媒体只计算一次。包含幻灯片编号字段的幻灯片
+    渲染结果随位置变化，其指纹还包含幻灯片的位置，移动后不会被复用。
+    """
+
+    def __init__(self, presentation):
+        """
+        Args:
+            presentation: python-pptx的Presentation对象
+        """
+        self.presentation = presentation
+        self._digests = {}
+
+        # 幻灯片尺寸变化会影响所有页面，作为每个指纹的前缀
+        self._deck_prefix = f"{presentation.slide_width}x{presentation.slide_height}".encode("ascii")
+
+    def fingerprints(self):
+        """
+        Returns:
+            list: 按幻灯片顺序排列的十六进制指纹
+        """
+        result = []
+        for index, slide in enumerate(self.presentation.slides):
+            hasher = hashlib.sha256(self._deck_prefix)
+            hasher.update(self._part_digest(slide.part, ()).encode("ascii"))
+            if has_slide_number_field(slide):
+                hasher.update(f"#{index}".encode("ascii"))
+            result.append(hasher.hexdigest())
+        return result
+
+    def _part_digest(self, part, stack):
+        """
+        计算部件及其依赖部件的摘要
+
+        Args:
+            part: OPC部件
+            stack (tuple): 当前递归路径上的部件名，用于打断母版与版式之间的循环引用
+        """
+        partname = str(part.partname)
+        if partname in self._digests:
+            return self._digests[partname]
+
+        hasher = hashlib.sha256(part.blob)
+        is_master = "/slideMasters/" in partname
+        for rel in sorted(_iter_rels(part), key=lambda r: r.rId):
+            name = _reltype_name(rel)
+            # 母版指向所有版式，版式又指回母版，只保留版式→母版这个方向
+            if name in IGNORED_RELTYPES or (is_master and name == "slideLayout"):
+                continue
+
+            hasher.update(rel.rId.encode("ascii"))
+            hasher.update(name.encode("ascii"))
+            if rel.is_external:
+                hasher.update(str(rel.target_ref).encode("utf-8"))
+                continue
+
+            target = rel.target_part
+            target_name = str(target.partname)
+            if target_name in stack:
+                hasher.update(target_name.encode("utf-8"))
+            else:
+                hasher.update(self._part_digest(target, stack + (partname,)).encode("ascii"))
+
+        digest = hasher.hexdigest()
+        self._digests[partname] = digest
+        return digest
+
+
+def fingerprint_slides(presentation):
+    """
+    计算演示文稿中每张幻灯片的指纹
+
+    Args:
+        presentation: python-pptx的Presentation对象
+
+    Returns:
+        list: 按幻灯片顺序排列的十六进制指纹
+    """
+    return SlideFingerprinter(presentation).fingerprints()
+
+
+def match_unchanged_slides(fingerprints, previous_fingerprints):
+    """
+    将当前幻灯片与上一次转换的幻灯片按指纹匹配
+
+    按指纹而不是位置匹配，因此插入、删除或调整顺序的幻灯片也能复用结果；包含幻灯片编号
+    字段的幻灯片只有位置不变时才能复用（见 SlideFingerprinter）。
+
+    Args:
+        fingerprints (list): 当前的指纹列表
+        previous_fingerprints (list): 上一次转换时的指纹列表
+
+    Returns:
+        tuple: ({当前索引: 上次索引}, [需要重新转换的当前索引])
+    """
+    previous_index = {}
+    for index, fingerprint in enumerate(previous_fingerprints):
+        previous_index.setdefault(fingerprint, index)
+
+    reused = {}
+    changed = []
+    for index, fingerprint in enumerate(fingerprints):
+        if fingerprint in previous_index:
+            reused[index] = previous_index[fingerprint]
+        else:
+            changed.append(index)
+    return reused, changed
+
+
+def numbered_slide_indices(presentation, indices):
+    """
+    指定幻灯片中包含幻灯片编号字段的索引
+
+    只含部分幻灯片的演示文稿会重新编号，这些幻灯片不能单独重新转换。
+
+    Args:
+        presentation: python-pptx的Presentation对象
+        indices (iterable): 幻灯片索引
+
+    Returns:
+        list: 包含幻灯片编号字段的索引
+    """
+    slides = presentation.slides
+    return [index for index in indices if has_slide_number_field(slides[index])]
+
+
+def save_partial_deck(presentation, keep_indices, output_path):
+    """
+    保存只包含指定幻灯片的演示文稿副本
+
+    python-pptx没有删除幻灯片的公开接口，这里直接从幻灯片ID列表（_sldIdLst）中移除条目并
+    删除对应关系，依赖 requirements.txt 中固定的python-pptx版本。被删除的幻灯片部件不再被
+    引用，保存时不会写入文件。
+
+    注意：会直接修改传入的presentation对象，调用方之后不应再使用它。
+
+    Args:
+        presentation: python-pptx的Presentation对象
+        keep_indices (iterable): 需要保留的幻灯片索引
+        output_path (str): 输出PPTX路径
+    """
+    keep = set(keep_indices)
+    slide_id_list = presentation.slides._sldIdLst
+    for index, slide_id in reversed(list(enumerate(slide_id_list))):
+        if index in keep:
+            continue
+        rId = slide_id.rId
+        slide_id_list.remove(slide_id)
+        presentation.part.drop_rel(rId)
+    presentation.save(output_path)
+
+
+def splice_pdf(output_path, sources):
+    """
+    按顺序拼接来自多个PDF的页面
+
+    Args:
+        output_path (str): 输出PDF路径
+        sources (list): [(PDF路径, 页索引)]，按输出顺序排列
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    readers = {}
+    writer = PdfWriter()
+    for pdf_path, page_index in sources:
+        if pdf_path not in readers:
+            readers[pdf_path] = PdfReader(pdf_path)
+        writer.add_page(readers[pdf_path].pages[page_index])
+
+    with open(output_path, "wb") as f:
+        writer.write(f)
@@ -0,0 +1,267 @@
+import os
+import mmap
+import math
+import struct
+
+# 文件头：魔数、版本、幻灯片数量、分辨率（0表示未知）、页面宽高（磅）
+HEADER = struct.Struct("<8sIIddd")
+MAGIC = b"PPTSLIDE"
+STORE_VERSION = 1
+
+# 每张幻灯片的索引项：像素数据偏移、宽、高、颜色模式编号
+ENTRY = struct.Struct("<QIIB3x")
+
+# 像素数据按64字节对齐
+ALIGNMENT = 64
+
+MODES = ("L", "RGB", "RGBA")
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SlideStoreWriter:
+    """
+    顺序写入幻灯片存储文件
+
+    文件布局为固定长度的文件头和索引表，之后依次是各幻灯片的原始像素平面。
+    先写入临时文件，close() 时回填索引表并整体改名，读取方不会看到写了一半的文件。
+    """
+
+    def __init__(self, path, count, dpi=None, page_size_pts=None):
+        """
+        Args:
+            path (str): 存储文件路径
+            count (int): 幻灯片数量
+            dpi (float, optional): 像素对应的分辨率
+            page_size_pts (tuple, optional): 幻灯片页面尺寸（磅）
+        """
+        self.path = path
+        self.count = count
+        self.dpi = dpi or 0.0
+        self.page_size_pts = page_size_pts or (0.0, 0.0)
+        self._entries = []
+
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(b"\0" * (HEADER.size + ENTRY.size * count))
+
+    def add(self, image):
+        """
+        追加一张幻灯片图像
+
+        Args:
+            image (PIL.Image.Image): 幻灯片图像，不支持的颜色模式转换为RGB
+        """
+        if len(self._entries) >= self.count:
+            raise ValueError("写入的幻灯片数量超过了声明的数量")
+        if image.mode not in MODES:
+            image = image.convert("RGB")
+
+        offset = _align(self._file.tell())
+        self._file.write(b"\0" * (offset - self._file.tell()))
+        self._file.write(image.tobytes())
+        self._entries.append((offset, image.width, image.height, MODES.index(image.mode)))
+
+    def close(self):
+        """回填文件头和索引表，完成写入"""
+        if self._file is None:
+            return
+        try:
+            if len(self._entries) != self.count:
+                raise ValueError(f"只写入了 {len(self._entries)}/{self.count} 张幻灯片")
+            self._file.seek(0)
+            self._file.write(HEADER.pack(MAGIC, STORE_VERSION, self.count, float(self.dpi),
+                                         float(self.page_size_pts[0]), float(self.page_size_pts[1])))
+            for entry in self._entries:
+                self._file.write(ENTRY.pack(*entry))
+            self._file.close()
+            os.replace(self._tmp_path, self.path)
+        except Exception:
+            self._file.close()
+            os.unlink(self._tmp_path)
+            raise
+        finally:
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+            os.unlink(self._tmp_path)
+
+
+class SlideStore:
+    """
+    只读内存映射的幻灯片存储
+
+    图像直接引用映射的像素数据，不复制到Python堆中；多个进程映射同一文件时共享
+    操作系统的页缓存。序列化时只传递文件路径，工作进程收到后自行重新映射。
+    对外与 PDFSlideStream、SlideCollection 一样表现为只读的幻灯片序列。
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): 存储文件路径
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap)
+
+        magic, version, count, dpi, width_pts, height_pts = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"不是有效的幻灯片存储文件: {path}")
+
+        self.dpi = dpi or None
+        self.page_size_pts = (width_pts, height_pts) if width_pts and height_pts else None
+        self._entries = [ENTRY.unpack_from(self._mmap, HEADER.size + i * ENTRY.size)
+                         for i in range(count)]
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __iter__(self):
+        return self.iter_images()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._entries)
+        if not 0 <= index < len(self._entries):
+            raise IndexError("幻灯片索引超出范围")
+        return self.get_image(index)
+
+    def size(self, index):
+        """幻灯片的像素尺寸 (宽, 高)"""
+        _, width, height, _ = self._entries[index]
+        return width, height
+
+    @property
+    def aspect_ratio(self):
+        """幻灯片宽高比"""
+        if self.page_size_pts:
+            width_pts, height_pts = self.page_size_pts
+            return width_pts / height_pts
+        width, height = self.size(0)
+        return width / height
+
+    def aspect_ratios(self):
+        """每张幻灯片的宽高比"""
+        return [width / height for _, width, height, _ in self._entries]
+
+    def dpi_for_pixel_width(self, pixel_width):
+        """
+        计算让幻灯片达到指定像素宽度所需的分辨率
+
+        Returns:
+            int: dpi，页面尺寸未知时返回None（按存储的尺寸使用）
+        """
+        if not self.page_size_pts:
+            return None
+        return max(1, math.ceil(pixel_width * 72 / self.page_size_pts[0]))
+
+    def get_buffer(self, index):
+        """
+        Returns:
+            tuple: (颜色模式, (宽, 高), 只读的像素内存视图)
+        """
+        offset, width, height, mode_code = self._entries[index]
+        mode = MODES[mode_code]
+        length = width * height * len(mode)
+        return mode, (width, height), self._view[offset:offset + length]
+
+    def get_image(self, index):
+        """
+        Returns:
+            PIL.Image.Image: 直接引用映射内存的只读图像
+        """
+        from PIL import Image
+
+        mode, size, buffer = self.get_buffer(index)
+        return Image.frombuffer(mode, size, buffer, "raw", mode, 0, 1)
+
+    def iter_images(self, start=0, stop=None, dpi=None, progress_callback=None):
+        """
+        逐张产出幻灯片图像
+
+        Args:
+            start (int): 起始索引
+            stop (int, optional): 结束索引（不包含）
+            dpi (int, optional): 目标分辨率，低于存储的分辨率时缩小
+            progress_callback (callable, optional): 进度回调函数，报告已产出的张数
+
+        Yields:
+            PIL.Image.Image: 幻灯片图像
+        """
+        from PIL import Image
+
+        stop = len(self._entries) if stop is None else min(stop, len(self._entries))
+        total = max(0, stop - start)
+        for done, index in enumerate(range(start, stop), 1):
+            image = self.get_image(index)
+            if dpi and self.dpi and dpi < self.dpi:
+                width, height = image.size
+                scale = dpi / self.dpi
+                image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                                     Image.Resampling.LANCZOS)
+            if progress_callback:
+                progress_callback(done, total, f"已加载 {done}/{total} 张幻灯片...")
+            yield image
+
+    def close(self):
+        """解除映射；仍有图像引用映射内存时由垃圾回收负责释放"""
+        try:
+            self._view.release()
+            self._mmap.close()
+        except (BufferError, ValueError):
+            pass
+        self._file.close()
+
+
+def write_slide_store(path, slide_images, dpi=None, progress_callback=None):
+    """
+    将幻灯片序列一次性写入存储文件
+
+    Args:
+        path (str): 存储文件路径
+        slide_images: 图像列表、PDFSlideStream 或 SlideCollection
+        dpi (int, optional): 目标分辨率，惰性序列按此分辨率栅格化或缩小
+        progress_callback (callable, optional): 进度回调函数
+
+    Returns:
+        SlideStore: 已映射的只读存储
+    """
+    if hasattr(slide_images, "iter_images"):
+        images = slide_images.iter_images(dpi=dpi, progress_callback=progress_callback)
+        dpi = dpi or getattr(slide_images, "dpi", None)
+    else:
+        # 普通图像列表按原样写入，分辨率未知
+        images = iter(slide_images)
+        dpi = None
+
+    page_size_pts = getattr(slide_images, "page_size_pts", None)
+    with SlideStoreWriter(path, len(slide_images), dpi=dpi, page_size_pts=page_size_pts) as writer:
+        for image in images:
+            writer.add(image)
+    return SlideStore(path)
@@ -0,0 +1,314 @@
+import os
+import zlib
+
+from src.utils.font_registry import FALLBACK_FONT_NAME
+
+# 幻灯片数不少于该值时改用逐页写出的PDF写入器，内存占用不随页数增长
+STREAMING_EXPORT_MIN_SLIDES = 400
+
+# 目录和页面树的对象编号预先保留，页面对象写出时即可引用父节点
+_CATALOG_ID = 1
+_PAGES_ID = 2
+
+
+def pdf_number(value):
+    """PDF中的数字，最多保留两位小数"""
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def _pdf_literal(text):
+    """PDF字面字符串，按Helvetica的WinAnsi编码，无法编码的字符写为问号"""
+    data = text.encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _image_dictionary(encoded):
+    """已编码图像的XObject字典（不含Length）"""
+    color_space = encoded.color_space
+    if isinstance(color_space, tuple):
+        name, base, hival, palette = color_space
+        color_space = f"[/{name} /{base} {hival} <{palette.hex()}>]"
+    else:
+        color_space = f"/{color_space}"
+    entries = [
+        "/Type /XObject", "/Subtype /Image",
+        f"/Width {encoded.width}", f"/Height {encoded.height}",
+        f"/BitsPerComponent {encoded.bits_per_component}",
+        f"/ColorSpace {color_space}",
+        "/Filter [" + " ".join(f"/{f}" for f in encoded.filters) + "]",
+    ]
+    if encoded.decode_parms:
+        parms = " ".join(f"/{key} {value}" for key, value in encoded.decode_parms.items())
+        entries.append(f"/DecodeParms << {parms} >>")
+    return " ".join(entries)
+
+
+class StreamingPage:
+    """
+    流式写入器中正在绘制的一页
+
+    只积累本页的内容流操作符和资源名称，页面结束时一次写出后即被丢弃。
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.operators = []
+        self.xobjects = set()
+        self.fonts = set()
+
+    def draw_image(self, encoded, x, y, width, height):
+        """在 (x, y, width, height) 区域绘制已编码的图像"""
+        name = self.writer.image_resource(encoded)
+        self.xobjects.add(name)
+        self.operators.append(f"q {pdf_number(width)} 0 0 {pdf_number(height)} "
+                              f"{pdf_number(x)} {pdf_number(y)} cm /{name} Do Q")
+
+    def draw_text(self, x, y, text, size, font_name=FALLBACK_FONT_NAME):
+        """
+        绘制标记文本
+
+        已向 reportlab 注册的TrueType字体按字符子集嵌入并带有ToUnicode映射，中文文本也能选中和搜索；
+        其他字体名称一律使用Helvetica。
+
+        Args:
+            x (float): 基线起点横坐标
+            y (float): 基线纵坐标
+            text (str): 文本
+            size (float): 字号
+            font_name (str, optional): 字体名称
+        """
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        font = pdfmetrics.getFont(font_name)
+        if isinstance(font, TTFont):
+            runs = [(name, b"<" + data.hex().encode("ascii") + b">")
+                    for name, data in self.writer.subset_runs(font, text)]
+        else:
+            runs = [(self.writer.FALLBACK_FONT_RESOURCE, _pdf_literal(text))]
+
+        operator = f"BT {pdf_number(x)} {pdf_number(y)} Td".encode("ascii")
+        for name, string in runs:
+            self.fonts.add(name)
+            operator += f" /{name} {pdf_number(size)} Tf ".encode("ascii") + string + b" Tj"
+        self.operators.append(operator + b" ET")
+
+
+class StreamingPDFWriter:
+    """
+    逐页写出的PDF写入器
+
+    每一页结束时立即把页面内容和本页新出现的图像写入文件，内存中只保留各对象的文件偏移、
+    已写图像的摘要到对象编号的映射和页面对象编号；交叉引用表在最后写出。内容相同的图像只写入一次。
+    标记文字使用的TrueType字体由 reportlab 记录用到的字符，关闭时按子集写出，与画布导出一致。
+    写入过程中使用临时文件，完成后才替换到输出路径，中途出错不会留下不完整的PDF。
+    """
+
+    # Helvetica的资源名称
+    FALLBACK_FONT_RESOURCE = "F1"
+
+    def __init__(self, path, page_size=None):
+        """
+        Args:
+            path (str): 输出路径
+            page_size (tuple, optional): begin_page 绘制的页面尺寸（宽, 高），单位为PDF点；
+                只用 append_page 写入已有页面时不需要
+        """
+        self.path = path
+        self.page_size = page_size
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._offsets = {}
+        self._next_id = _PAGES_ID + 1
+        self._page_ids = []
+        self._images = {}
+        self._xobject_ids = {}
+        self._font_ids = {}
+        self._subset_names = {}
+        self._ttf_fonts = {}
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def bytes_written(self):
+        """已写入文件的字节数"""
+        return self._file.tell()
+
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+
+    def _reserve_id(self):
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def _write_object(self, object_id, body):
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n".encode("ascii"))
+        self._file.write(body if isinstance(body, bytes) else body.encode("ascii"))
+        self._file.write(b"\nendobj\n")
+
+    def _write_stream(self, object_id, dictionary, data):
+        self._write_object(object_id, f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode("ascii")
+                           + data + b"\nendstream")
+
+    @property
+    def page_tree_id(self):
+        """页面树的对象编号，写入已有页面时作为 /Parent"""
+        return _PAGES_ID
+
+    def reserve_object(self):
+        """
+        预留一个对象编号，对象稍后用 write_object 写出（拼接已有PDF时使用）
+
+        Returns:
+            int: 对象编号
+        """
+        return self._reserve_id()
+
+    def write_object(self, object_id, body):
+        """写出预留编号的对象，body 为序列化后的对象内容"""
+        self._write_object(object_id, body)
+
+    def append_page(self, page_id):
+        """把已经写出的页面对象按顺序加入页面树"""
+        self._page_ids.append(page_id)
+
+    def image_resource(self, encoded):
+        """
+        获取图像的资源名称，内容相同的图像只写入一次
+
+        Returns:
+            str: 资源名称
+        """
+        name = self._images.get(encoded.key)
+        if name is None:
+            object_id = self._reserve_id()
+            name = f"Im{object_id}"
+            self._write_stream(object_id, _image_dictionary(encoded), encoded.data)
+            self._images[encoded.key] = name
+            self._xobject_ids[name] = object_id
+        return name
+
+    def subset_runs(self, font, text):
+        """
+        把文本拆成若干段，每段属于同一个字体子集；子集的字体对象编号首次出现时预留，关闭时写出
+
+        Args:
+            font (TTFont): 已注册的TrueType字体
+            text (str): 文本
+
+        Returns:
+            list: [(资源名称, 子集内的字符编码), ...]
+        """
+        self._ttf_fonts[font.fontName] = font
+        runs = []
+        for subset, data in font.splitString(text, self):
+            key = (font.fontName, subset)
+            name = self._subset_names.get(key)
+            if name is None:
+                object_id = self._reserve_id()
+                name = f"F{object_id}"
+                self._subset_names[key] = name
+                self._font_ids[name] = object_id
+            runs.append((name, data))
+        return runs
+
+    def _font_resource(self, name):
+        if name not in self._font_ids:
+            self._font_ids[name] = self._reserve_id()
+            self._write_object(self._font_ids[name], f"<< /Type /Font /Subtype /Type1 /BaseFont /{FALLBACK_FONT_NAME} "
+                                                     f"/Encoding /WinAnsiEncoding >>")
+        return self._font_ids[name]
+
+    def _write_font_subsets(self):
+        """写出各TrueType字体实际用到的字符子集：字体程序、字体描述、宽度和ToUnicode映射"""
+        from reportlab.pdfbase.ttfonts import makeToUnicodeCMap, SUBSETN, FF_NONSYMBOLIC, FF_SYMBOLIC
+
+        for font in self._ttf_fonts.values():
+            face = font.face
+            state = font.state.pop(self)
+            for subset_index, subset in enumerate(state.subsets):
+                base_font = (SUBSETN(subset_index) + b"+" + face.name + face.subfontNameX).decode("latin-1")
+
+                font_file_id = self._reserve_id()
+                font_program = face.makeSubset(subset)
+                self._write_stream(font_file_id, f"/Length1 {len(font_program)} /Filter /FlateDecode",
+                                   zlib.compress(font_program))
+
+                descriptor_id = self._reserve_id()
+                flags = (face.flags & ~FF_NONSYMBOLIC) | FF_SYMBOLIC
+                bbox = " ".join(pdf_number(value) for value in face.bbox)
+                self._write_object(descriptor_id, f"<< /Type /FontDescriptor /FontName /{base_font} /Flags {flags} "
+                                                  f"/FontBBox [{bbox}] /ItalicAngle {pdf_number(face.italicAngle)} "
+                                                  f"/Ascent {pdf_number(face.ascent)} /Descent {pdf_number(face.descent)} "
+                                                  f"/CapHeight {pdf_number(face.capHeight)} /StemV {pdf_number(face.stemV)} "
+                                                  f"/FontFile2 {font_file_id} 0 R >>")
+
+                to_unicode_id = self._reserve_id()
+                cmap = makeToUnicodeCMap(base_font, subset).encode("ascii")
+                self._write_stream(to_unicode_id, "/Filter /FlateDecode", zlib.compress(cmap))
+
+                widths = " ".join(pdf_number(face.getCharWidth(code)) for code in subset)
+                name = self._subset_names[(font.fontName, subset_index)]
+                self._write_object(self._font_ids[name], f"<< /Type /Font /Subtype /TrueType /BaseFont /{base_font} "
+                                                         f"/FirstChar 0 /LastChar {len(subset) - 1} /Widths [{widths}] "
+                                                         f"/FontDescriptor {descriptor_id} 0 R "
+                                                         f"/ToUnicode {to_unicode_id} 0 R >>")
+        self._ttf_fonts.clear()
+
+    def begin_page(self):
+        """
+        Returns:
+            StreamingPage: 新页面
+        """
+        return StreamingPage(self)
+
+    def end_page(self, page):
+        """写出页面的内容流和页面对象，并把已写内容刷新到磁盘"""
+        resources = []
+        if page.xobjects:
+            resources.append("/XObject << " + " ".join(f"/{name} {self._xobject_ids[name]} 0 R"
+                                                       for name in sorted(page.xobjects)) + " >>")
+        if page.fonts:
+            resources.append("/Font << " + " ".join(f"/{name} {self._font_resource(name)} 0 R"
+                                                   for name in sorted(page.fonts)) + " >>")
+
+        content = b"\n".join(op if isinstance(op, bytes) else op.encode("ascii") for op in page.operators)
+        content_id = self._reserve_id()
+        self._write_stream(content_id, "/Filter /FlateDecode", zlib.compress(content))
+
+        page_id = self._reserve_id()
+        width, height = self.page_size
+        self._write_object(page_id, f"<< /Type /Page /Parent {_PAGES_ID} 0 R "
+                                    f"/MediaBox [0 0 {pdf_number(width)} {pdf_number(height)}] "
+                                    f"/Resources << {' '.join(resources)} >> /Contents {content_id} 0 R >>")
+        self._page_ids.append(page_id)
+        self._file.flush()
+
+    def close(self):
+        """写出字体子集、页面树、目录、交叉引用表和文件尾"""
+        self._write_font_subsets()
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(_PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>")
+        self._write_object(_CATALOG_ID, f"<< /Type /Catalog /Pages {_PAGES_ID} 0 R >>")
+
+        xref_offset = self._file.tell()
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        for object_id in range(1, self._next_id):
+            lines.append(f"{self._offsets[object_id]:010d} 00000 n \n")
+        self._file.write("".join(lines).encode("ascii"))
+        self._file.write(f"trailer\n<< /Size {self._next_id} /Root {_CATALOG_ID} 0 R >>\n"
+                         f"startxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """出错时关闭并删除临时文件，输出路径保持原样"""
+        for font in self._ttf_fonts.values():
+            font.state.pop(self, None)
+        self._ttf_fonts.clear()
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
@@ -0,0 +1,105 @@
+"""
+常驻LibreOffice实例的UNO桥接脚本
+
+应用自身的Python环境通常无法导入 uno（它随LibreOffice一起发布），这个脚本由
+LibreOffice自带的Python运行，连接到已在监听的常驻实例，再从标准输入逐行读取JSON命令、
+向标准输出逐行写回JSON结果：
+
+    {"cmd": "convert", "input": "...", "output": "..."}  ->  {"ok": true}
+    {"cmd": "ping"}                                      ->  {"ok": true}
+    {"cmd": "terminate"}                                 ->  {"ok": true}，随后退出
+
+启动时连接成功输出 {"ok": true}，超时则输出 {"ok": false, "error": "..."} 并退出。
+脚本只使用标准库和 uno，不能导入项目中的其他模块。
+
+用法: python uno_bridge.py <端口> <连接超时秒数>
+"""
+import json
+import os
+import sys
+import time
+
+
+def _reply(ok, error=None):
+    message = {"ok": ok}
+    if error:
+        message["error"] = error
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def _props(**kwargs):
+    from com.sun.star.beans import PropertyValue  # type: ignore
+
+    values = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        values.append(prop)
+    return tuple(values)
+
+
+def _connect(port, timeout):
+    """连接到常驻实例，返回Desktop对象"""
+    import uno  # type: ignore
+
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_ctx)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext")
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except Exception:
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.25)
+
+
+def _convert(desktop, input_path, output_path):
+    import uno  # type: ignore
+
+    doc = desktop.loadComponentFromURL(uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+                                       _props(Hidden=True, ReadOnly=True))
+    if doc is None:
+        return False
+    try:
+        doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_path)), _props(FilterName="impress_pdf_Export"))
+    finally:
+        doc.close(True)
+    return True
+
+
+def main(argv):
+    port, timeout = int(argv[1]), float(argv[2])
+    try:
+        desktop = _connect(port, timeout)
+    except Exception as e:
+        _reply(False, f"无法连接到LibreOffice实例: {e}")
+        return 1
+    _reply(True)
+
+    for line in sys.stdin:
+        try:
+            command = json.loads(line)
+            if command["cmd"] == "convert":
+                _reply(_convert(desktop, command["input"], command["output"]))
+            elif command["cmd"] == "ping":
+                desktop.getComponents()
+                _reply(True)
+            elif command["cmd"] == "terminate":
+                try:
+                    desktop.terminate()
+                finally:
+                    _reply(True)
+                return 0
+            else:
+                _reply(False, f"未知命令: {command['cmd']}")
+        except Exception as e:
+            _reply(False, str(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
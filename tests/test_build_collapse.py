@@ -0,0 +1,53 @@
+import os
+
+import reportlab
+from PIL import Image, ImageDraw, ImageFont
+
+from src.utils.build_collapse import collapse_builds, compute_slide_signatures
+
+FONT_PATH = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+SLIDE_SIZE = (1280, 720)
+
+
+def _slide(title=None, bullets=()):
+    image = Image.new("RGB", SLIDE_SIZE, "white")
+    draw = ImageDraw.Draw(image)
+    if title:
+        draw.text((80, 60), title, fill="black", font=ImageFont.truetype(FONT_PATH, 56))
+    body_font = ImageFont.truetype(FONT_PATH, 36)
+    for line, text in enumerate(bullets):
+        draw.text((100, 200 + line * 70), f"- {text}", fill="black", font=body_font)
+    return image
+
+
+def _kept(slides):
+    collapsed = collapse_builds(slides, compute_slide_signatures(slides))
+    return collapsed.indices
+
+
+def test_same_title_different_numbers_are_kept():
+    slides = [
+        _slide("Results", ["Accuracy 91%", "Latency 20ms"]),
+        _slide("Results", ["Accuracy 93%", "Latency 18ms"]),
+    ]
+    assert _kept(slides) == [0, 1]
+
+
+def test_blank_slide_before_content_is_kept():
+    slides = [_slide(), _slide("Results", ["Accuracy 91%", "Latency 20ms"])]
+    assert _kept(slides) == [0, 1]
+
+
+def test_identical_slides_are_kept():
+    slides = [_slide("Agenda", ["Intro"]), _slide("Agenda", ["Intro"])]
+    assert _kept(slides) == [0, 1]
+
+
+def test_build_steps_are_collapsed():
+    slides = [
+        _slide("Results", ["Accuracy 91%"]),
+        _slide("Results", ["Accuracy 91%", "Latency 20ms"]),
+        _slide("Results", ["Accuracy 91%", "Latency 20ms", "Memory 2GB"]),
+        _slide("Summary", ["Done"]),
+    ]
+    assert _kept(slides) == [2, 3]
@@ -0,0 +1,92 @@
+import os
+import time
+
+from src.utils import conversion_cache
+from src.utils.conversion_cache import ConversionCache, MANIFEST_NAME, STAGING_PREFIX, STALE_STAGING_SECONDS
+
+
+def _write_pdf(path, size):
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n" + os.urandom(size))
+    return str(path)
+
+
+def _staging_dirs(cache_dir):
+    return [name for bucket in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, bucket))
+            for name in os.listdir(os.path.join(cache_dir, bucket)) if name.startswith(STAGING_PREFIX)]
+
+
+def test_failed_store_removes_staging(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    assert cache.store_pdf("ab" * 32, str(tmp_path / "missing.pdf")) is None
+    assert _staging_dirs(cache.cache_dir) == []
+
+
+def test_stale_staging_removed_on_startup(tmp_path):
+    cache_dir = tmp_path / "cache"
+    stale = cache_dir / "ab" / (STAGING_PREFIX + "old")
+    fresh = cache_dir / "ab" / (STAGING_PREFIX + "new")
+    stale.mkdir(parents=True)
+    fresh.mkdir()
+    past = time.time() - STALE_STAGING_SECONDS - 60
+    os.utime(stale, (past, past))
+
+    ConversionCache(str(cache_dir))
+    assert _staging_dirs(str(cache_dir)) == [fresh.name]
+
+
+def test_entry_in_use_is_not_evicted(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"), max_size_mb=1)
+    source = _write_pdf(tmp_path / "a.pdf", 700 * 1024)
+    old_key, new_key = "aa" * 32, "bb" * 32
+
+    assert cache.store_pdf(old_key, source)
+    cache.acquire(old_key)
+    try:
+        assert cache.store_pdf(new_key, source)
+        assert cache.get_manifest(old_key) is not None
+    finally:
+        cache.release(old_key)
+
+    cache.evict(keep=(new_key,))
+    assert cache.get_manifest(old_key) is None
+    assert cache.get_manifest(new_key) is not None
+
+
+def test_get_pdf_checks_stat_and_hashes_only_on_mismatch(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    key = "cc" * 32
+    cached = cache.store_pdf(key, _write_pdf(tmp_path / "a.pdf", 4096))
+    manifest_path = os.path.join(cache.entry_dir(key), MANIFEST_NAME)
+    with open(manifest_path, "rb") as f:
+        manifest_bytes = f.read()
+    past = time.time() - 600
+    os.utime(manifest_path, (past, past))
+
+    hashed = []
+    real_hash_file = conversion_cache.hash_file
+    monkeypatch.setattr(conversion_cache, "hash_file", lambda path: hashed.append(path) or real_hash_file(path))
+
+    # 大小和修改时间与清单一致时直接命中，只更新清单文件的访问时间，不重写清单
+    assert cache.get_pdf(key) == cached
+    assert hashed == []
+    assert os.path.getmtime(manifest_path) > past
+    with open(manifest_path, "rb") as f:
+        assert f.read() == manifest_bytes
+
+    # 按需校验时计算哈希
+    assert cache.get_pdf(key, verify=True) == cached
+    assert hashed == [cached]
+
+    # 只改动了修改时间：校验一次哈希后记下新的修改时间
+    os.utime(cached, (past, past))
+    assert cache.get_pdf(key) == cached
+    assert cache.get_pdf(key) == cached
+    assert len(hashed) == 2
+
+    # 大小不变但内容被改动：修改时间不一致，校验失败后丢弃条目
+    with open(cached, "r+b") as f:
+        f.seek(100)
+        f.write(b"corrupt")
+    assert cache.get_pdf(key) is None
+    assert cache.get_manifest(key) is None
@@ -0,0 +1,75 @@
+import os
+import threading
+
+import pytest
+import reportlab
+from reportlab.pdfbase import ttfonts
+
+from src.utils import font_registry
+from src.utils.font_registry import FontRegistry, FALLBACK_FONT_NAME, get_font_registry
+
+VERA_PATH = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """把自带字体指向Vera，记录字体文件被解析的次数"""
+    monkeypatch.setattr(font_registry, "BUNDLED_FONT_PATH", VERA_PATH)
+    calls = []
+    real_ttfont = ttfonts.TTFont
+
+    def counting_ttfont(name, path, *args, **kwargs):
+        calls.append(path)
+        return real_ttfont(name, path, *args, **kwargs)
+
+    monkeypatch.setattr(ttfonts, "TTFont", counting_ttfont)
+    return calls
+
+
+def test_font_is_parsed_once_across_threads(parses):
+    registry = FontRegistry()
+    names = []
+    threads = [threading.Thread(target=lambda: names.append(registry.cjk_font())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert names == ["SourceHanSans"] * 8
+    assert parses == [VERA_PATH]
+    assert registry.cjk_font() == "SourceHanSans"
+    assert parses == [VERA_PATH]
+
+
+def test_preload_parses_in_background(parses):
+    registry = FontRegistry()
+    thread = registry.preload()
+    assert thread is not None
+    # 预加载期间再次调用不会另起线程
+    assert registry.preload() is None
+    thread.join()
+
+    assert parses == [VERA_PATH]
+    assert registry.cjk_font() == "SourceHanSans"
+    assert parses == [VERA_PATH]
+    assert registry.preload() is None
+
+
+def test_missing_fonts_fall_back_to_builtin(monkeypatch, tmp_path, parses):
+    monkeypatch.setattr(font_registry, "BUNDLED_FONT_PATH", str(tmp_path / "missing.ttf"))
+    monkeypatch.setattr(font_registry, "SYSTEM_FONT_PATHS", (str(tmp_path / "also-missing.ttc"),))
+    registry = FontRegistry()
+    assert registry.cjk_font() == FALLBACK_FONT_NAME
+    assert parses == []
+
+    # 字体文件损坏时同样退回内置字体
+    broken = tmp_path / "broken.ttf"
+    broken.write_bytes(b"not a font")
+    monkeypatch.setattr(font_registry, "SYSTEM_FONT_PATHS", (str(broken),))
+    assert FontRegistry().cjk_font() == FALLBACK_FONT_NAME
+
+
+def test_default_registry_is_shared(monkeypatch):
+    monkeypatch.setattr(font_registry, "_default_registry", None)
+    registry = get_font_registry()
+    assert get_font_registry() is registry
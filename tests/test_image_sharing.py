@@ -0,0 +1,47 @@
+import re
+
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG
+from src.utils.ppt_processor import PPTProcessor
+
+
+def _slide(color):
+    image = Image.new("RGB", (160, 90), (255, 255, 255))
+    image.paste(color, (20, 20, 140, 70))
+    return image
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_repeated_slides_share_one_image_xobject(tmp_path, streaming):
+    # 章节页和相同的动画步骤重复出现，内容相同但是不同的图像对象
+    colors = [(200, 0, 0), (0, 120, 0), (200, 0, 0), (0, 0, 200), (200, 0, 0), (0, 120, 0), (0, 0, 200)]
+    slides = [_slide(color) for color in colors]
+    config = dict(DEFAULT_LAYOUT_CONFIG, show_ppt_numbers=False, show_page_numbers=False)
+    plan = LayoutCalculator().plan(slides, config)
+    output_path = str(tmp_path / "out.pdf")
+
+    processor = PPTProcessor()
+    processor.encode_workers = 1
+    try:
+        generate = processor.generate_pdf_streaming if streaming else processor.generate_pdf
+        assert generate(slides, output_path, plan, config)
+    finally:
+        processor.cleanup_temp_files()
+
+    reader = PdfReader(output_path)
+    assert len(reader.pages) == plan["pages_needed"] > 1
+    placed = []
+    for page in reader.pages:
+        # 按内容流中的绘制顺序取出每张幻灯片使用的图像对象
+        xobjects = page["/Resources"]["/XObject"]
+        for name in re.findall(rb"(/[^\s/]+) Do", page.get_contents().get_data()):
+            placed.append(xobjects.raw_get(name.decode("ascii")).idnum)
+    assert len(placed) == len(slides)
+    # 每种内容只写入一个图像对象，跨页共用
+    assert len(set(placed)) == len(set(colors))
+    by_color = {}
+    for color, idnum in zip(colors, placed):
+        assert by_color.setdefault(color, idnum) == idnum
@@ -0,0 +1,63 @@
+from PIL import Image
+
+from src.utils.layout_calculator import DEFAULT_LAYOUT_CONFIG, LayoutCalculator
+from src.utils.layout_optimizer import (OBJECTIVE_MAX_AREA, OBJECTIVE_MIN_SHEETS, DEFAULT_MIN_SPACING,
+                                        search_layouts)
+from src.utils.placement import SLIDE_LABEL_BAND_MM
+
+WIDE = 16 / 9
+
+
+def _config(**overrides):
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    config.update(overrides)
+    return config
+
+
+def test_labels_keep_vertical_gap():
+    candidates = search_layouts(40, WIDE, _config(show_ppt_numbers=True))
+    assert candidates
+    for candidate in candidates:
+        assert candidate["config"]["v_spacing"] >= SLIDE_LABEL_BAND_MM
+        assert candidate["config"]["h_spacing"] >= DEFAULT_MIN_SPACING
+
+
+def test_without_labels_only_minimum_gap():
+    candidates = search_layouts(40, WIDE, _config(show_ppt_numbers=False))
+    assert min(c["config"]["v_spacing"] for c in candidates) < SLIDE_LABEL_BAND_MM
+    assert all(c["config"]["v_spacing"] >= DEFAULT_MIN_SPACING for c in candidates)
+
+
+def test_min_sheets_respects_width_and_ranks_by_pages():
+    candidates = search_layouts(40, WIDE, _config(), objective=OBJECTIVE_MIN_SHEETS, min_slide_width=80)
+    assert candidates
+    assert all(c["item_width"] >= 80 for c in candidates)
+    pages = [c["pages_needed"] for c in candidates]
+    assert pages == sorted(pages)
+    # 每种（列数, 方向）只出现一次
+    assert len({(c["config"]["columns"], c["config"]["is_landscape"]) for c in candidates}) == len(candidates)
+
+
+def test_max_area_respects_budget_and_ranks_by_size():
+    candidates = search_layouts(40, WIDE, _config(), objective=OBJECTIVE_MAX_AREA, sheet_budget=5)
+    assert candidates
+    assert all(c["pages_needed"] <= 5 for c in candidates)
+    areas = [c["item_width"] * c["item_height"] for c in candidates]
+    assert areas == sorted(areas, reverse=True)
+
+
+def test_candidates_match_layout_calculator():
+    config = _config()
+    slides = [Image.new("RGB", (160, 90)) for _ in range(40)]
+    for candidate in search_layouts(40, WIDE, config):
+        layout = LayoutCalculator().calculate_layout(slides, dict(config, **candidate["config"]))
+        assert layout["rows"] == candidate["rows"]
+        assert layout["pages_needed"] == candidate["pages_needed"]
+        assert abs(layout["item_width"] - candidate["item_width"]) < 1e-6
+
+
+def test_infeasible_constraints_return_nothing():
+    assert search_layouts(40, WIDE, _config(), min_slide_width=500) == []
+    assert search_layouts(40, WIDE, _config(), objective=OBJECTIVE_MAX_AREA, sheet_budget=1,
+                          min_slide_width=200) == []
+    assert search_layouts(0, WIDE, _config()) == []
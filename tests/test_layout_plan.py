@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils import layout_calculator
+from src.utils.layout_calculator import DEFAULT_LAYOUT_CONFIG, LayoutCalculator
+from src.utils.layout_plan import slide_labels
+
+
+class NumberedSlides(list):
+    """带原编号的幻灯片列表，如合并动画步骤后的子集"""
+
+    def __init__(self, images, slide_numbers):
+        super().__init__(images)
+        self.slide_numbers = slide_numbers
+
+
+def _slides(count, size=(160, 90)):
+    return [Image.new("RGB", size) for _ in range(count)]
+
+
+def test_plan_is_immutable():
+    plan = LayoutCalculator().plan(_slides(5), dict(DEFAULT_LAYOUT_CONFIG))
+    with pytest.raises(TypeError):
+        plan["rows"] = 1
+    with pytest.raises(AttributeError):
+        plan.labels = ()
+    with pytest.raises(AttributeError):
+        del plan.config
+    with pytest.raises(TypeError):
+        plan.config["columns"] = 5
+    with pytest.raises(ValueError):
+        plan.placements["x"][0] = 0.0
+    # 只保留影响几何的配置项
+    assert "show_page_numbers" not in plan.config
+    assert dict(plan)["rows"] == plan["rows"]
+
+
+def test_slide_labels_follow_sheet_and_position():
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    plan = LayoutCalculator().plan(_slides(9), config)
+    per_sheet = plan["rows"] * plan["columns"]
+    assert plan.labels[0] == "1-1"
+    assert plan.labels[1] == "1-2"
+    assert plan.labels[per_sheet] == "2-1"
+    assert plan.slide_count == 9
+
+    numbered = LayoutCalculator().plan(NumberedSlides(_slides(3), [2, 5, 9]), config)
+    assert numbered.labels == ("1-1  P2", "1-2  P5", "1-3  P9")
+    assert slide_labels(numbered.placements, numbered["columns"]) == ("1-1", "1-2", "1-3")
+
+
+def test_plan_cache_reuses_source_metadata(monkeypatch):
+    calculator = LayoutCalculator()
+    slides = _slides(6) + _slides(2, (120, 90))
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+
+    reads = []
+    real_aspect_ratios = layout_calculator.slide_aspect_ratios
+    monkeypatch.setattr(layout_calculator, "slide_aspect_ratios",
+                        lambda images: reads.append(len(images)) or real_aspect_ratios(images))
+
+    plan = calculator.plan(slides, config)
+    assert calculator.plan(slides, config) is plan
+    # 同一来源只读取一次宽高比，切换设置后再切回时直接命中缓存
+    wide = calculator.plan(slides, dict(config, columns=3))
+    assert wide is not plan and wide["columns"] == 3
+    assert calculator.plan(slides, dict(config)) is plan
+    assert reads == [8]
+
+    # 元数据相同的另一个来源得到同一个方案
+    assert calculator.plan(list(slides), config) is plan
+    assert reads == [8, 8]
+
+    # 长度或元数据版本变化时重新读取
+    slides.append(Image.new("RGB", (160, 90)))
+    longer = calculator.plan(slides, config)
+    assert longer.slide_count == 9
+    assert reads == [8, 8, 9]
+
+    numbered = NumberedSlides(slides, list(range(1, 10)))
+    numbered.metadata_version = 1
+    first = calculator.plan(numbered, config)
+    numbered.slide_numbers = list(range(2, 11))
+    assert calculator.plan(numbered, config) is first
+    numbered.metadata_version = 2
+    assert calculator.plan(numbered, config).labels[0].endswith("P2")
+    assert reads == [8, 8, 9, 9, 9]
+    assert np.array_equal(first.placements, longer.placements)
@@ -0,0 +1,113 @@
+import sys
+
+import pytest
+
+from src.utils.libreoffice_pool import LibreOfficePool, _has_output
+
+# 用shell脚本代替soffice和解释器
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="需要 /bin/sh")
+
+
+class FlakyRestartInstance:
+    """转换总是成功、重启总是失败的实例"""
+
+    def __init__(self):
+        self.jobs_done = 0
+
+    def is_healthy(self):
+        return True
+
+    def convert(self, input_path, output_path, timeout=120):
+        self.jobs_done += 1
+        with open(output_path, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        return True
+
+    def restart(self, reset_profile=False):
+        raise RuntimeError("soffice did not start")
+
+
+def test_failed_restart_keeps_successful_result(tmp_path):
+    pool = LibreOfficePool(size=1, max_jobs_per_instance=1, soffice_path="soffice")
+    instance = FlakyRestartInstance()
+    pool._idle.put(instance)
+
+    assert pool._run_job("deck.pptx", str(tmp_path / "deck.pdf")) is True
+    assert pool._idle.get_nowait() is instance
+
+
+def test_empty_output_is_not_success(tmp_path):
+    output_path = tmp_path / "deck.pdf"
+    output_path.touch()
+    assert not _has_output(str(output_path))
+
+    output_path.write_bytes(b"%PDF-1.4\n")
+    assert _has_output(str(output_path))
+
+
+def _write_script(path, body):
+    path.write_text("#!/bin/sh\n" + body + "\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+@posix_only
+def test_find_uno_python_prefers_bundled_interpreter(tmp_path, monkeypatch):
+    import shutil
+
+    from src.utils.libreoffice_pool import find_uno_python
+
+    program_dir = tmp_path / "program"
+    program_dir.mkdir()
+    soffice = _write_script(program_dir / "soffice", "exit 0")
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+
+    # 自带的Python不能导入uno时不使用
+    _write_script(program_dir / "python", "exit 1")
+    assert find_uno_python(soffice) is None
+
+    bundled = _write_script(program_dir / "python", "exit 0")
+    assert find_uno_python(soffice) == bundled
+
+
+@posix_only
+def test_bridge_instance_round_trip(tmp_path, monkeypatch):
+    import time
+
+    from src.utils import libreoffice_pool
+    from src.utils.libreoffice_pool import LibreOfficeInstance
+
+    # 用不依赖uno的脚本代替桥接脚本和soffice，只验证命令的收发和进程的管理
+    bridge = tmp_path / "bridge.py"
+    bridge.write_text(
+        "import json, sys\n"
+        "print(json.dumps({'ok': True}), flush=True)\n"
+        "for line in sys.stdin:\n"
+        "    cmd = json.loads(line)\n"
+        "    if cmd['cmd'] == 'convert':\n"
+        "        open(cmd['output'], 'wb').write(b'%PDF-1.4\\n')\n"
+        "    print(json.dumps({'ok': True}), flush=True)\n"
+        "    if cmd['cmd'] == 'terminate':\n"
+        "        break\n"
+    )
+    monkeypatch.setattr(libreoffice_pool, "UNO_BRIDGE_SCRIPT", str(bridge))
+    soffice = _write_script(tmp_path / "soffice", "sleep 30")
+
+    instance = LibreOfficeInstance(soffice, str(tmp_path / "profile"), use_uno=False, bridge_python=sys.executable)
+    instance.start()
+    try:
+        assert instance.resident
+        assert instance.is_healthy()
+        output_path = str(tmp_path / "deck.pdf")
+        assert instance.convert(str(tmp_path / "deck.pptx"), output_path, timeout=10)
+        assert _has_output(output_path)
+    finally:
+        bridge_process = instance._bridge
+        instance.kill()
+        instance.stop()
+
+    deadline = time.time() + 5
+    while bridge_process.poll() is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert bridge_process.poll() is not None
+    assert not instance.is_healthy()
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from src.ui.main_window import MainWindow  # noqa: E402
+from src.ui.worker import Worker  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def window(app, monkeypatch):
+    # 不检查更新，不弹出对话框
+    monkeypatch.setattr(MainWindow, "initial_checks", lambda self: None)
+    window = MainWindow("test")
+    yield window
+    for worker in window._workers:
+        worker.wait()
+    window.ppt_processor.cleanup_temp_files()
+
+
+def _build_steps():
+    slides = []
+    for step in range(1, 4):
+        image = Image.new("RGB", (640, 360), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(step):
+            draw.rectangle((40, 40 + line * 80, 600, 90 + line * 80), fill="black")
+        slides.append(image)
+    return slides
+
+
+def _wait_until(app, condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("等待超时")
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_collapse_started_from_conversion_callback(app, window):
+    slides = _build_steps()
+    refreshed = []
+    window.refresh_preview = lambda: refreshed.append(len(window.slide_images))
+    window.layout_config["collapse_builds"] = True
+    window.stacked_widget.setCurrentIndex(2)
+    _wait_until(app, lambda: window.stacked_widget.currentIndex() == 2)
+
+    # 与选择文件时相同：转换线程的 finished 信号在 run() 返回前触发合并任务
+    conversion = Worker(lambda: slides)
+    conversion.finished.connect(window._on_ppt_conversion_finished)
+    window.worker = conversion
+    window._start_worker(conversion)
+    del conversion
+
+    _wait_until(app, lambda: len(window.slide_images) == 1
+                and not any(worker.isRunning() for worker in window._workers))
+    assert len(window.source_slide_images) == 3
+    assert refreshed == [1]
+
+
+def test_preview_thumbnails_load_off_ui_thread(app, window, monkeypatch):
+    import threading
+
+    from src.ui import main_window
+
+    on_ui_thread = []
+    real_iter = main_window.iter_slide_images
+
+    def tracking_iter(*args, **kwargs):
+        on_ui_thread.append(threading.current_thread() is threading.main_thread())
+        yield from real_iter(*args, **kwargs)
+
+    monkeypatch.setattr(main_window, "iter_slide_images", tracking_iter)
+    drawn = []
+    draw_preview = window._draw_preview
+    window._draw_preview = lambda layout_result, thumbnails: (drawn.append(len(thumbnails)),
+                                                              draw_preview(layout_result, thumbnails))
+    window.slide_images = _build_steps()
+
+    # 与进入第三步时相同：覆盖层在缩略图完成后才隐藏
+    window.loading_overlay.show()
+    window._preview_owns_overlay = True
+    assert window.refresh_preview()
+    # 第二次刷新使第一次的结果过期，过期的缩略图不再绘制
+    assert window.refresh_preview()
+    assert drawn == [0, 0]
+    assert window.next_btn.isEnabled()
+
+    _wait_until(app, lambda: not any(worker.isRunning() for worker in window._workers) and len(drawn) == 3)
+    app.processEvents()
+    assert drawn == [0, 0, 3]
+    assert on_ui_thread == [False, False]
+    assert not window.loading_overlay.isVisible()
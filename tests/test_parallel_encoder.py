@@ -0,0 +1,96 @@
+from concurrent.futures import Future
+
+import pytest
+from PIL import Image
+
+from src.utils import parallel_encoder, ppt_processor
+from src.utils.parallel_encoder import iter_encoded_images, PARALLEL_ENCODE_MIN_SLIDES
+from src.utils.pdf_images import EncodedImageCache
+from src.utils.ppt_processor import PPTProcessor
+from src.utils.slide_store import write_slide_store
+
+
+def _slides(count):
+    # 每张颜色不同，编码结果互不相同
+    return [Image.new("RGB", (32, 18), (index * 7 % 256, index * 13 % 256, 60)) for index in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    slides = _slides(11)
+    store = write_slide_store(str(tmp_path / "slides.store"), slides)
+    yield store, slides
+    store.close()
+
+
+def test_parallel_results_keep_slide_order(store):
+    store, slides = store
+    expected = [EncodedImageCache("lossless").encode(image).key for image in slides]
+    encoded = list(iter_encoded_images(store, compression="lossless", workers=2, batch_size=3))
+    assert [image.key for image in encoded] == expected
+
+    # 只编码一段时同样按顺序
+    encoded = list(iter_encoded_images(store, compression="lossless", workers=2, batch_size=2, start=3, stop=8))
+    assert [image.key for image in encoded] == expected[3:8]
+
+
+class RecordingExecutor:
+    """在当前进程中同步执行任务，记录提交的批次"""
+
+    submitted = []
+
+    def __init__(self, max_workers, mp_context=None):
+        self.max_workers = max_workers
+
+    def submit(self, fn, source, first, last, *args):
+        future = Future()
+        self.submitted.append((first, last))
+        if first == 4:
+            future.set_exception(RuntimeError("worker died"))
+        else:
+            future.set_result(fn(source, first, last, *args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_in_flight_batches_are_bounded(store, monkeypatch):
+    store, slides = store
+    RecordingExecutor.submitted = []
+    monkeypatch.setattr(parallel_encoder, "ProcessPoolExecutor", RecordingExecutor)
+
+    workers, batch_size = 2, 2
+    encoded_iter = iter_encoded_images(store, compression="lossless", workers=workers, batch_size=batch_size)
+    consumed = []
+    for encoded in encoded_iter:
+        consumed.append(encoded)
+        # 已取走的批次之外，最多还有 workers * 2 个批次在途
+        finished_batches = (len(consumed) - 1) // batch_size + 1
+        assert len(RecordingExecutor.submitted) <= finished_batches + workers * 2
+
+    # 失败的批次在当前进程中重做，结果仍然完整且有序
+    expected = [EncodedImageCache("lossless").encode(image).key for image in slides]
+    assert [image.key for image in consumed] == expected
+    assert RecordingExecutor.submitted == [(first, min(first + batch_size, 11)) for first in range(0, 11, batch_size)]
+
+
+@pytest.mark.parametrize("count,parallel", [(PARALLEL_ENCODE_MIN_SLIDES - 1, False), (PARALLEL_ENCODE_MIN_SLIDES, True)])
+def test_small_decks_encode_in_process(monkeypatch, count, parallel):
+    calls = []
+
+    def fake_iter_encoded_images(source, dpi, compression, jpeg_quality, workers, start, stop):
+        calls.append((start, stop, workers))
+        cache = EncodedImageCache(compression, jpeg_quality)
+        return (cache.encode(source[index]) for index in range(start, stop))
+
+    monkeypatch.setattr(ppt_processor, "iter_encoded_images", fake_iter_encoded_images)
+    processor = PPTProcessor()
+    processor.encode_workers = 2
+    try:
+        encoded = list(processor._iter_encoded_slides(_slides(count), None, "lossless", 85))
+    finally:
+        processor.cleanup_temp_files()
+
+    assert len(encoded) == count and all(encoded)
+    assert calls == ([(0, count, 2)] if parallel else [])
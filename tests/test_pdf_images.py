@@ -0,0 +1,142 @@
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+
+from src.utils import pdf_images
+from src.utils.pdf_images import (encode_image, draw_encoded_image, decode_encoded_image, reduce_colors,
+                                  strip_alpha, PALETTE_MAX_COLORS)
+
+
+def _photo(size=(96, 64)):
+    """颜色很多的渐变图像，自动模式下按照片处理"""
+    image = Image.new("RGB", size)
+    image.putdata([(x * 2 % 256, y * 3 % 256, (x * y) % 256) for y in range(size[1]) for x in range(size[0])])
+    return image
+
+
+def _draw_to_pdf(path, encoded_images):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path), pagesize=(400, 200))
+    for index, encoded in enumerate(encoded_images):
+        draw_encoded_image(c, encoded, 10 + index * 120, 10, 96, 64)
+    c.showPage()
+    c.save()
+    xobjects = PdfReader(str(path)).pages[0]["/Resources"]["/XObject"]
+    return [ref.get_object() for _, ref in sorted(xobjects.items())]
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    """用户提供的JPEG和PNG文件，打开后未经修改"""
+    jpeg_path = tmp_path / "photo.jpg"
+    _photo().save(jpeg_path, format="JPEG", quality=80)
+    png_path = tmp_path / "flat.png"
+    flat = Image.new("RGB", (96, 64), (255, 255, 255))
+    flat.paste((200, 30, 30), (10, 10, 50, 40))
+    flat.save(png_path, format="PNG")
+    return jpeg_path, png_path
+
+
+@pytest.mark.parametrize("internals", [True, False])
+def test_passthrough_sources_survive_drawing(tmp_path, source_files, monkeypatch, internals):
+    jpeg_path, png_path = source_files
+    jpeg = encode_image(Image.open(jpeg_path))
+    png = encode_image(Image.open(png_path))
+    # 源文件的压缩数据原样复用
+    assert jpeg.filters == ("DCTDecode",) and jpeg.data == jpeg_path.read_bytes()
+    assert png.filters == ("FlateDecode",) and png.decode_parms["Predictor"] == 15
+
+    if not internals:
+        # 模拟缺少画布内部接口的reportlab版本，改走公开的 drawImage
+        monkeypatch.setattr(pdf_images._ReportlabImageAdapter, "_DOC_METHODS", ("noSuchMethod",))
+
+    images = _draw_to_pdf(tmp_path / "out.pdf", [jpeg, png])
+    assert len(images) == 2
+    jpeg_objects = [image for image in images if "/DCTDecode" in str(image["/Filter"])]
+    assert len(jpeg_objects) == 1
+    # JPEG两种方式下都不重新编码
+    assert jpeg_objects[0].get_data() == jpeg.data
+
+    (png_object,) = [image for image in images if image is not jpeg_objects[0]]
+    assert (png_object["/Width"], png_object["/Height"]) == (96, 64)
+    assert decode_encoded_image(png).convert("RGB").tobytes() == Image.open(png_path).convert("RGB").tobytes()
+
+
+def test_decode_encoded_image_round_trips_all_encodings():
+    flat = Image.new("RGB", (40, 30), (255, 255, 255))
+    flat.paste((0, 90, 200), (5, 5, 20, 20))
+    gray = Image.new("L", (40, 30), 40)
+    gray.paste(200, (0, 0, 20, 30))
+    for image in (flat, gray, _photo((40, 30)).convert("RGB")):
+        encoded = encode_image(image, "lossless")
+        decoded = decode_encoded_image(encoded)
+        assert decoded.size == image.size
+        assert decoded.convert(image.mode).tobytes() == image.tobytes()
+
+
+def _flat_slide():
+    """纯色块和文字为主的幻灯片：只有几种颜色"""
+    image = Image.new("RGB", (120, 68), (255, 255, 255))
+    image.paste((20, 60, 160), (0, 0, 120, 12))
+    image.paste((230, 120, 20), (10, 20, 60, 50))
+    image.paste((0, 0, 0), (70, 30, 110, 32))
+    return image
+
+
+def test_flat_slide_becomes_indexed_without_loss():
+    image = _flat_slide()
+    reduced = reduce_colors(image)
+    assert reduced.mode == "P"
+    assert reduced.convert("RGB").tobytes() == image.tobytes()
+
+    encoded = encode_image(image)
+    assert isinstance(encoded.color_space, tuple) and encoded.color_space[0] == "Indexed"
+    assert encoded.color_space[2] < PALETTE_MAX_COLORS
+
+
+def test_photo_stays_rgb():
+    image = _photo()
+    assert image.getcolors(maxcolors=PALETTE_MAX_COLORS) is None
+    assert reduce_colors(image) is image
+    assert encode_image(image, "lossless").color_space == "DeviceRGB"
+    assert encode_image(image).filters == ("DCTDecode",)
+
+
+def test_gray_content_drops_color_channels():
+    # 灰度内容颜色较多时存为单通道灰度，很少时改为调色板
+    ramp = Image.new("RGB", (64, 8))
+    ramp.putdata([(x * 4, x * 4, x * 4) for _ in range(8) for x in range(64)])
+    reduced = reduce_colors(ramp)
+    assert reduced.mode == "L"
+    assert reduced.tobytes() == ramp.getchannel("R").tobytes()
+    assert encode_image(ramp, "lossless").color_space == "DeviceGray"
+
+    two_tone = Image.new("L", (32, 8), 255)
+    two_tone.paste(0, (0, 0, 16, 8))
+    assert reduce_colors(two_tone).mode == "P"
+
+
+def test_strip_alpha_decisions():
+    opaque = Image.new("RGBA", (8, 8), (10, 20, 30, 255))
+    stripped = strip_alpha(opaque)
+    assert stripped.mode == "RGB" and stripped.getpixel((0, 0)) == (10, 20, 30)
+
+    # 半透明像素合成到白色背景上
+    translucent = Image.new("RGBA", (8, 8), (0, 0, 0, 0))
+    translucent.putpixel((0, 0), (0, 0, 0, 255))
+    stripped = strip_alpha(translucent)
+    assert stripped.mode == "RGB"
+    assert stripped.getpixel((0, 0)) == (0, 0, 0) and stripped.getpixel((1, 1)) == (255, 255, 255)
+
+    gray = strip_alpha(Image.new("LA", (4, 4), (100, 0)))
+    assert gray.mode == "L" and gray.getpixel((0, 0)) == 255
+
+    palette = Image.new("P", (4, 4), 1)
+    palette.putpalette([0, 0, 0, 200, 10, 10])
+    palette.info["transparency"] = 1
+    assert strip_alpha(palette).getpixel((0, 0)) == (255, 255, 255)
+
+    assert strip_alpha(Image.new("CMYK", (4, 4))).mode == "RGB"
+    rgb = Image.new("RGB", (4, 4))
+    assert strip_alpha(rgb) is rgb
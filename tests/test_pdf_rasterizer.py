@@ -0,0 +1,138 @@
+import io
+import subprocess
+import sys
+
+import pdf2image
+import pytest
+from PIL import Image
+
+from src.utils.pdf_rasterizer import PDFSlideStream, read_ppm_frames, RECENT_PAGES
+
+
+@pytest.fixture
+def make_stream(monkeypatch):
+    """不调用poppler的幻灯片流：页数和页面尺寸直接给定"""
+    def make(pages=3, page_size="720 x 405 pts", **kwargs):
+        monkeypatch.setattr(pdf2image, "pdfinfo_from_path",
+                            lambda path: {"Pages": pages, "Page size": page_size})
+        return PDFSlideStream("deck.pdf", **kwargs)
+    return make
+
+
+def test_chunk_size_follows_memory_budget(make_stream):
+    # 720x405pt 在 200dpi 下为 2000x1125 像素，每页约 6.4 MB
+    stream = make_stream(dpi=200, memory_budget_mb=64)
+    assert stream.size == (2000, 1125)
+    assert stream.chunk_size() == 9
+
+    # 分辨率减半，每页内存为四分之一
+    assert stream.chunk_size(100) == 39
+
+    # 预算不足一页时仍然每次栅格化一页
+    assert make_stream(dpi=200, memory_budget_mb=1).chunk_size() == 1
+
+
+def test_getitem_reads_cache_without_rendering(make_stream, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "raster"
+    cache_dir.mkdir()
+    Image.new("RGB", (200, 112), "red").save(cache_dir / "slide_00001@20.png")
+    stream = make_stream(dpi=10, cache_dir=str(cache_dir))
+
+    rendered = []
+
+    def render_range(first, last, dpi):
+        rendered.append((first, last, dpi))
+        return [Image.new("RGB", stream.size_at(dpi), "blue") for _ in range(first, last)]
+
+    monkeypatch.setattr(stream, "_render_range", render_range)
+
+    # 缓存分辨率更高时直接缩小缓存，不调用poppler
+    image = stream[1]
+    assert image.size == stream.size_at(10)
+    assert image.getpixel((0, 0)) == (255, 0, 0)
+    assert rendered == []
+
+    # 没有缓存的页面单独栅格化一次，之后从最近读取的页面中取出
+    assert stream[0] is stream[0]
+    assert rendered == [(0, 1, 10)]
+    assert stream.cached_dpi(0) == 10
+
+
+def test_getitem_keeps_only_recent_pages(make_stream, monkeypatch):
+    stream = make_stream(pages=RECENT_PAGES + 2, dpi=10)
+    rendered = []
+
+    def render_range(first, last, dpi):
+        rendered.append(first)
+        return [Image.new("RGB", stream.size_at(dpi))]
+
+    monkeypatch.setattr(stream, "_render_range", render_range)
+
+    for index in range(RECENT_PAGES + 1):
+        stream[index]
+    assert len(stream._recent) == RECENT_PAGES
+
+    # 最早读取的一页已被淘汰，需要重新栅格化
+    stream[0]
+    assert rendered == list(range(RECENT_PAGES + 1)) + [0]
+    with pytest.raises(IndexError):
+        stream[RECENT_PAGES + 2]
+
+
+def test_read_ppm_frames_parses_header_comments():
+    pixels = bytes([255, 0, 0, 0, 255, 0])
+    data = b"P6\n# pdftoppm\n2 1\n255\n" + pixels
+    (image,) = read_ppm_frames(io.BytesIO(data))
+    assert image.mode == "RGB"
+    assert image.size == (2, 1)
+    assert image.getpixel((1, 0)) == (0, 255, 0)
+
+    with pytest.raises(ValueError):
+        list(read_ppm_frames(io.BytesIO(data[:-1])))
+    with pytest.raises(ValueError):
+        list(read_ppm_frames(io.BytesIO(b"P3\n1 1\n255\n0 0 0\n")))
+
+
+def _frame(magic, width, height, pixels, comment=b""):
+    return magic + b"\n" + comment + f"{width} {height}\n255\n".encode("ascii") + pixels
+
+
+def test_read_ppm_frames_splits_mixed_frames_from_pipe():
+    # 像素数据以空白和 # 开头，解析器不能把它们当作头部的一部分
+    rgb = bytes([0x23, 0x0A, 0x20, 9, 10, 11, 12, 13, 14, 255, 0, 128])
+    gray = bytes([0x20, 0x23, 0x0A, 0, 1, 2])
+    frames = [
+        _frame(b"P6", 2, 2, rgb, b"# page 1\n"),
+        _frame(b"P5", 3, 2, gray),
+        _frame(b"P6", 1, 1, bytes([7, 8, 9]), b"#c\n#d\n"),
+    ]
+    data = b"".join(frames)
+    # 子进程逐字节写入并刷新，模拟poppler分段写出的管道数据
+    writer = ("import sys\n"
+              "data = sys.stdin.buffer.read()\n"
+              "for i in range(len(data)):\n"
+              "    sys.stdout.buffer.write(data[i:i + 1]); sys.stdout.buffer.flush()\n")
+    process = subprocess.Popen([sys.executable, "-c", writer], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    process.stdin.write(data)
+    process.stdin.close()
+    try:
+        images = list(read_ppm_frames(process.stdout))
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    assert [(image.mode, image.size) for image in images] == [("RGB", (2, 2)), ("L", (3, 2)), ("RGB", (1, 1))]
+    assert images[0].tobytes() == rgb
+    assert images[0].getpixel((0, 0)) == (0x23, 0x0A, 0x20)
+    assert images[1].tobytes() == gray
+    assert images[2].getpixel((0, 0)) == (7, 8, 9)
+
+
+def test_read_ppm_frames_rejects_truncated_and_16bit_frames():
+    good = _frame(b"P5", 2, 1, bytes([1, 2]))
+    frames = read_ppm_frames(io.BytesIO(good + b"P6\n4 4"))
+    assert next(frames).tobytes() == bytes([1, 2])
+    with pytest.raises(ValueError):
+        next(frames)
+    with pytest.raises(ValueError):
+        list(read_ppm_frames(io.BytesIO(b"P5\n1 1\n65535\n" + bytes(2))))
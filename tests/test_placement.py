@@ -0,0 +1,61 @@
+import numpy as np
+from PIL import Image
+
+from src.utils.layout_calculator import DEFAULT_LAYOUT_CONFIG, LayoutCalculator
+from src.utils.placement import slide_aspect_ratios, dominant_aspect_ratio, sheet_placements
+
+
+def _mixed_slides():
+    """16:9 为主，夹杂几张 4:3 的幻灯片"""
+    sizes = [(160, 90)] * 7 + [(120, 90)] * 3
+    order = [0, 7, 1, 2, 8, 3, 4, 9, 5, 6]
+    return [Image.new("RGB", sizes[index]) for index in order]
+
+
+def test_mixed_aspect_ratios_keep_shape_and_centre():
+    slides = _mixed_slides()
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    plan = LayoutCalculator().plan(slides, config)
+    ratios = slide_aspect_ratios(slides)
+    placements = plan.placements
+    cell_width, cell_height = plan["item_width"], plan["item_height"]
+
+    # 格子按出现最多的 16:9 计算
+    assert dominant_aspect_ratio(ratios) == 160 / 90
+    assert np.isclose(cell_width / cell_height, 16 / 9)
+
+    # 每张幻灯片保持原宽高比，且不超出格子
+    assert np.allclose(placements["w"] / placements["h"], ratios)
+    assert np.all(placements["w"] <= cell_width + 1e-9)
+    assert np.all(placements["h"] <= cell_height + 1e-9)
+
+    # 幻灯片在格子内居中：4:3 的左右留白相等，16:9 的占满格子
+    left = placements["x"] - placements["cell_x"]
+    right = placements["cell_x"] + cell_width - (placements["x"] + placements["w"])
+    top = placements["y"] - placements["cell_y"]
+    bottom = placements["cell_y"] + cell_height - (placements["y"] + placements["h"])
+    assert np.allclose(left, right) and np.allclose(top, bottom)
+    narrow = np.isclose(ratios, 4 / 3)
+    assert np.all(left[narrow] > 0) and np.allclose(placements["h"][narrow], cell_height)
+    assert np.allclose(left[~narrow], 0) and np.allclose(top[~narrow], 0)
+
+
+def test_sheet_placements_index_each_sheet():
+    slides = _mixed_slides() * 3
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    plan = LayoutCalculator().plan(slides, config)
+    per_sheet = plan["rows"] * plan["columns"]
+    assert plan["pages_needed"] == -(-len(slides) // per_sheet)
+
+    seen = []
+    for sheet in range(plan["pages_needed"]):
+        first, rows = sheet_placements(plan.placements, sheet)
+        assert first == sheet * per_sheet
+        assert np.all(rows["sheet"] == sheet)
+        # 纸内按行优先排列
+        assert list(rows["row"] * plan["columns"] + rows["column"]) == list(range(len(rows)))
+        seen.extend(range(first, first + len(rows)))
+    assert seen == list(range(len(slides)))
+
+    first, rows = sheet_placements(plan.placements, plan["pages_needed"])
+    assert first == len(slides) and len(rows) == 0
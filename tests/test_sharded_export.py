@@ -0,0 +1,85 @@
+import os
+
+from PIL import Image
+from PyPDF2 import PdfReader
+
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG
+from src.utils.pdf_images import EncodedImageCache
+from src.utils.sharded_export import plan_shards, merge_shards, render_shard
+from src.utils.slide_store import write_slide_store
+from src.utils.streaming_pdf import StreamingPDFWriter
+
+
+def test_plan_shards_covers_sheets_in_order():
+    for total, workers, max_sheets in ((100, 2, 48), (3, 8, 48), (10, 3, 4), (1, 1, 48)):
+        shards = plan_shards(total, workers, max_sheets)
+        assert shards[0][0] == 0 and shards[-1][1] == total
+        assert all(first < last for first, last in shards)
+        assert all(shards[i][1] == shards[i + 1][0] for i in range(len(shards) - 1))
+        assert max(last - first for first, last in shards) <= max_sheets
+        assert len(shards) >= min(workers, total)
+    assert plan_shards(0, 4) == []
+
+
+def _write_shard(path, page_texts, shared, cache):
+    writer = StreamingPDFWriter(str(path), (200, 100))
+    for text in page_texts:
+        page = writer.begin_page()
+        page.draw_image(cache.encode(shared), 10, 30, 64, 36)
+        # 每页另有一张只出现一次的图像
+        page.draw_image(cache.encode(Image.new("RGB", (16, 9), (len(text) * 10, 0, 0))), 100, 30, 64, 36)
+        page.draw_text(10, 10, text, 12)
+        writer.end_page(page)
+    writer.close()
+
+
+def test_merge_shards_dedups_resources_and_keeps_order(tmp_path):
+    shared = Image.new("RGB", (64, 36), (10, 120, 200))
+    shard_paths = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    # 每段使用自己的编码缓存，与各自在工作进程中生成时相同
+    _write_shard(shard_paths[0], ["page 1", "page 22"], shared, EncodedImageCache("lossless", 85))
+    _write_shard(shard_paths[1], ["page 333", "page 4444"], shared, EncodedImageCache("lossless", 85))
+
+    output_path = str(tmp_path / "merged.pdf")
+    # 第二段中的共享图像和Helvetica字体各合并掉一份
+    assert merge_shards([str(path) for path in shard_paths], output_path) == 2
+
+    reader = PdfReader(output_path)
+    assert [page.extract_text().strip() for page in reader.pages] == ["page 1", "page 22", "page 333", "page 4444"]
+
+    # 每页的图像资源与所在分段中的原图像一致
+    source_pages = [page for path in shard_paths for page in PdfReader(str(path)).pages]
+    images = set()
+    for page, source_page in zip(reader.pages, source_pages):
+        xobjects = page["/Resources"]["/XObject"]
+        source_xobjects = source_page["/Resources"]["/XObject"]
+        assert sorted(xobjects) == sorted(source_xobjects)
+        for name, ref in xobjects.items():
+            image, source_image = ref.get_object(), source_xobjects[name].get_object()
+            assert image["/Subtype"] == "/Image"
+            assert (image["/Width"], image["/Height"]) == (source_image["/Width"], source_image["/Height"])
+            assert image.get_data() == source_image.get_data()
+            images.add(ref.idnum)
+    # 一张共享图像加四张各不相同的图像
+    assert len(images) == 5
+    assert os.listdir(tmp_path) and not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+def test_render_shard_writes_only_its_sheets(tmp_path):
+    slides = [Image.new("RGB", (160, 90), (index * 20, 0, 0)) for index in range(10)]
+    store = write_slide_store(str(tmp_path / "slides.store"), slides)
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    plan = LayoutCalculator().plan(slides, config)
+    items_per_page = plan["rows"] * plan["columns"]
+    try:
+        output_path = str(tmp_path / "shard.pdf")
+        assert render_shard(store, output_path, plan, config, (1, 2))
+    finally:
+        store.close()
+
+    reader = PdfReader(output_path)
+    assert len(reader.pages) == 1
+    text = reader.pages[0].extract_text()
+    # 页码和定位标记仍按整份文档编号
+    assert "2" in text and plan.labels[items_per_page] in text
+    assert len(reader.pages[0]["/Resources"]["/XObject"]) == min(items_per_page, len(slides) - items_per_page)
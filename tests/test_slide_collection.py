@@ -0,0 +1,52 @@
+import os
+import pickle
+
+from PIL import Image
+
+from src.utils.pdf_images import INTERMEDIATE_RASTER_KEY
+from src.utils.slide_collection import SlideCollection
+
+
+def _slides(count):
+    return [Image.new("RGB", (64, 36), (index * 30, 255 - index * 30, 90)) for index in range(count)]
+
+
+def test_evicted_images_spill_and_reload(tmp_path):
+    slides = _slides(5)
+    # 预算只够驻留一张（每张约 6.75 KB）
+    collection = SlideCollection(str(tmp_path / "spill"), memory_budget_mb=0.01)
+    for image in slides:
+        collection.add_image(image.copy())
+
+    assert len(collection._resident) == 1
+    spilled = sorted(os.listdir(tmp_path / "spill"))
+    assert spilled == [f"slide_{index:05d}.png" for index in range(4)]
+    assert collection.handles[4].path is None
+
+    # 按顺序和随机顺序读取，像素都与原图一致
+    for index in (0, 3, 1, 4, 2, 0):
+        image = collection[index]
+        assert image.tobytes() == slides[index].tobytes()
+        assert len(collection._resident) == 1
+    assert [image.tobytes() for image in collection] == [image.tobytes() for image in slides]
+    # 溢出文件只做了低级别压缩，编码时不复用
+    assert collection[0].info.get(INTERMEDIATE_RASTER_KEY)
+
+    collection.close()
+    assert collection[2].tobytes() == slides[2].tobytes()
+
+
+def test_pickled_collection_reloads_from_spill(tmp_path):
+    slides = _slides(3)
+    collection = SlideCollection(str(tmp_path / "spill"), memory_budget_mb=64)
+    for image in slides:
+        collection.add_image(image.copy())
+    # 预算充足时全部驻留，不写溢出文件
+    assert not (tmp_path / "spill").exists()
+
+    # 序列化时先把驻留的内存图像写入溢出目录，工作进程从文件读取
+    restored = pickle.loads(pickle.dumps(collection))
+    assert all(handle.path for handle in collection.handles)
+    assert len(restored._resident) == 0
+    assert [image.tobytes() for image in restored] == [image.tobytes() for image in slides]
+    assert restored.aspect_ratios() == collection.aspect_ratios()
@@ -0,0 +1,79 @@
+import io
+import zipfile
+
+from PIL import Image
+from pptx import Presentation
+from pptx.oxml import parse_xml
+from pptx.util import Inches
+
+from src.utils.slide_fingerprint import (fingerprint_slides, match_unchanged_slides, numbered_slide_indices,
+                                        save_partial_deck)
+
+SLIDE_NUMBER_FIELD = (
+    '<a:fld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'id="{B6F15528-21DE-4FAA-801E-634DDDAF4B2B}" type="slidenum"><a:t>&#8249;#&#8250;</a:t></a:fld>'
+)
+
+
+def _build_deck(titles, numbered):
+    presentation = Presentation()
+    layout = presentation.slide_layouts[6]
+    for title in titles:
+        slide = presentation.slides.add_slide(layout)
+        box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1))
+        box.text_frame.text = title
+        if title in numbered:
+            box.text_frame.paragraphs[0]._p.append(parse_xml(SLIDE_NUMBER_FIELD))
+    return presentation
+
+
+def test_slide_number_field_is_detected():
+    deck = _build_deck(["A", "B", "C"], numbered={"B"})
+    assert numbered_slide_indices(deck, range(3)) == [1]
+
+
+def test_moved_numbered_slide_is_not_reused():
+    before = fingerprint_slides(_build_deck(["A", "B", "C"], numbered={"B"}))
+    # 在最前面插入一张幻灯片，其余幻灯片后移一位
+    after = fingerprint_slides(_build_deck(["New", "A", "B", "C"], numbered={"B"}))
+
+    reused, changed = match_unchanged_slides(after, before)
+    assert reused == {1: 0, 3: 2}
+    assert changed == [0, 2]
+
+
+def test_numbered_slide_in_place_is_reused():
+    before = fingerprint_slides(_build_deck(["A", "B", "C"], numbered={"B"}))
+    after = fingerprint_slides(_build_deck(["A", "B", "C2"], numbered={"B"}))
+
+    reused, changed = match_unchanged_slides(after, before)
+    assert reused == {0: 0, 1: 1}
+    assert changed == [2]
+
+
+def test_save_partial_deck_keeps_only_selected_slides(tmp_path):
+    deck = _build_deck(["A", "B", "C", "D", "E"], numbered=set())
+    # 保留的幻灯片带有图片和备注，删除的幻灯片带有另一张图片
+    for index, color in ((1, (200, 30, 30)), (4, (30, 30, 200))):
+        picture = io.BytesIO()
+        Image.new("RGB", (32, 32), color).save(picture, format="PNG")
+        picture.seek(0)
+        deck.slides[index].shapes.add_picture(picture, Inches(5), Inches(1))
+    deck.slides[3].notes_slide.notes_text_frame.text = "notes"
+    source_path = str(tmp_path / "deck.pptx")
+    deck.save(source_path)
+    expected = fingerprint_slides(Presentation(source_path))
+
+    partial_path = str(tmp_path / "partial.pptx")
+    save_partial_deck(Presentation(source_path), [1, 3], partial_path)
+
+    partial = Presentation(partial_path)
+    assert [slide.shapes[0].text_frame.text for slide in partial.slides] == ["B", "D"]
+    # 保留的幻灯片内容（含图片、版式和母版）与原演示文稿中相同
+    assert fingerprint_slides(partial) == [expected[1], expected[3]]
+    assert partial.slides[1].notes_slide.notes_text_frame.text == "notes"
+
+    with zipfile.ZipFile(partial_path) as package:
+        names = package.namelist()
+    assert len([name for name in names if name.startswith("ppt/slides/slide") and name.endswith(".xml")]) == 2
+    assert len([name for name in names if name.startswith("ppt/media/")]) == 1
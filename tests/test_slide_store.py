@@ -0,0 +1,81 @@
+import os
+import pickle
+
+import pytest
+from PIL import Image
+
+from src.utils.slide_store import SlideStore, SlideStoreWriter, write_slide_store, ALIGNMENT
+
+
+def _slides():
+    rgb = Image.new("RGB", (33, 17), (200, 40, 10))
+    rgb.putpixel((32, 16), (1, 2, 3))
+    gray = Image.new("L", (20, 11), 128)
+    rgba = Image.new("RGBA", (9, 5), (0, 0, 255, 100))
+    cmyk = Image.new("CMYK", (7, 3), (0, 255, 0, 0))
+    return [rgb, gray, rgba, cmyk]
+
+
+def test_store_round_trips_pixels(tmp_path):
+    slides = _slides()
+    store = write_slide_store(str(tmp_path / "slides.store"), slides)
+    try:
+        assert len(store) == 4
+        assert [store.size(index) for index in range(4)] == [image.size for image in slides]
+        for index, image in enumerate(slides[:3]):
+            assert store[index].mode == image.mode
+            assert store[index].tobytes() == image.tobytes()
+        # 不支持的颜色模式按RGB存储
+        assert store[3].mode == "RGB" and store[3].tobytes() == slides[3].convert("RGB").tobytes()
+        assert store[-1].size == (7, 3)
+        with pytest.raises(IndexError):
+            store[4]
+
+        # 像素数据按64字节对齐
+        offsets = [entry[0] for entry in store._entries]
+        assert all(offset % ALIGNMENT == 0 for offset in offsets)
+        assert store.aspect_ratios() == [image.width / image.height for image in slides]
+
+        # 序列化时只传路径，重新映射后内容相同
+        restored = pickle.loads(pickle.dumps(store))
+        try:
+            assert [image.tobytes() for image in restored] == [image.tobytes() for image in store]
+        finally:
+            restored.close()
+    finally:
+        store.close()
+
+
+def test_store_scales_down_to_requested_dpi(tmp_path):
+    path = str(tmp_path / "slides.store")
+    with SlideStoreWriter(path, 1, dpi=200, page_size_pts=(720, 405)) as writer:
+        writer.add(Image.new("RGB", (2000, 1125), "white"))
+    store = SlideStore(path)
+    try:
+        assert store.page_size_pts == (720, 405)
+        assert store.dpi_for_pixel_width(1000) == 100
+        (image,) = store.iter_images(dpi=100)
+        assert image.size == (1000, 562)
+        # 目标分辨率高于存储的分辨率时不放大
+        (image,) = store.iter_images(dpi=300)
+        assert image.size == (2000, 1125)
+    finally:
+        store.close()
+
+
+def test_incomplete_store_is_not_published(tmp_path):
+    path = str(tmp_path / "slides.store")
+    writer = SlideStoreWriter(path, 2)
+    writer.add(Image.new("RGB", (4, 4)))
+    with pytest.raises(ValueError):
+        writer.close()
+    assert os.listdir(tmp_path) == []
+
+    with pytest.raises(RuntimeError):
+        with SlideStoreWriter(path, 1) as writer:
+            raise RuntimeError("interrupted")
+    assert os.listdir(tmp_path) == []
+
+    (tmp_path / "bogus.store").write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        SlideStore(str(tmp_path / "bogus.store"))
@@ -0,0 +1,81 @@
+import os
+
+from PyPDF2 import PdfReader
+
+from src.utils.streaming_pdf import StreamingPDFWriter
+
+
+def test_close_writes_complete_pdf(tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    writer = StreamingPDFWriter(output_path, (200, 100))
+    for label in ("1", "2"):
+        page = writer.begin_page()
+        page.draw_text(10, 10, label, 12)
+        writer.end_page(page)
+    writer.close()
+
+    assert len(PdfReader(output_path).pages) == 2
+    assert os.listdir(tmp_path) == ["out.pdf"]
+
+
+def test_abort_leaves_no_partial_file(tmp_path):
+    output_path = str(tmp_path / "out.pdf")
+    writer = StreamingPDFWriter(output_path, (200, 100))
+    page = writer.begin_page()
+    page.draw_text(10, 10, "1", 12)
+    writer.end_page(page)
+    writer.abort()
+
+    assert os.listdir(tmp_path) == []
+
+
+def _register_vera():
+    import reportlab
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont("Vera", os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")))
+    return "Vera"
+
+
+def test_truetype_labels_embed_searchable_subset(tmp_path):
+    from reportlab.pdfbase import pdfmetrics
+
+    output_path = str(tmp_path / "out.pdf")
+    font_name = _register_vera()
+    writer = StreamingPDFWriter(output_path, (200, 100))
+    for index in range(2):
+        page = writer.begin_page()
+        page.draw_text(10, 30, f"{index + 1}-1  P5", 8, font_name)
+        page.draw_text(10, 10, f"第 {index + 1} 页", 10, font_name)
+        writer.end_page(page)
+    writer.close()
+
+    reader = PdfReader(output_path)
+    for index, page in enumerate(reader.pages):
+        text = page.extract_text()
+        assert f"{index + 1}-1  P5" in text
+        assert f"第 {index + 1} 页" in text
+
+    # 两页共用同一个子集字体，字体只写入一次且只嵌入用到的字形
+    fonts = [page["/Resources"]["/Font"] for page in reader.pages]
+    font_refs = {ref.idnum for resources in fonts for ref in resources.values()}
+    assert len(font_refs) == 1
+    font = reader.get_object(font_refs.pop())
+    assert font["/Subtype"] == "/TrueType"
+    assert font["/BaseFont"].startswith("/AAAAAA+")
+    font_program = font["/FontDescriptor"]["/FontFile2"].get_data()
+    assert font_program[:4] == b"\x00\x01\x00\x00"
+    assert len(font_program) < os.path.getsize(pdfmetrics.getFont(font_name).face.filename)
+
+
+def test_abort_releases_font_subset_state(tmp_path):
+    from reportlab.pdfbase import pdfmetrics
+
+    font_name = _register_vera()
+    writer = StreamingPDFWriter(str(tmp_path / "out.pdf"), (200, 100))
+    page = writer.begin_page()
+    page.draw_text(10, 10, "第 1 页", 10, font_name)
+    writer.abort()
+
+    assert writer not in pdfmetrics.getFont(font_name).state
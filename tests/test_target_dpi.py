@@ -0,0 +1,76 @@
+import pdf2image
+import pytest
+from PIL import Image
+from PyPDF2 import PdfReader
+
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG, MM_PER_INCH
+from src.utils.pdf_rasterizer import PDFSlideStream
+from src.utils.ppt_processor import PPTProcessor
+from src.utils.sheet_drawing import export_dpi
+from src.utils.slide_collection import SlideCollection
+
+PAGE_SIZE_PTS = (720, 405)
+
+
+def _plan(columns, count=8, print_dpi=300):
+    config = dict(DEFAULT_LAYOUT_CONFIG, columns=columns, print_dpi=print_dpi)
+    return LayoutCalculator().plan([Image.new("RGB", (160, 90))] * count, config), config
+
+
+def test_required_pixel_size_follows_cell_and_print_dpi():
+    plan, _ = _plan(2)
+    width, height = LayoutCalculator.required_pixel_size(plan, 300)
+    assert width == round(plan["item_width"] / MM_PER_INCH * 300)
+    assert height == round(plan["item_height"] / MM_PER_INCH * 300)
+    assert LayoutCalculator.required_pixel_size(plan, 150)[0] == pytest.approx(width / 2, abs=1)
+
+    # 列数越多格子越小，所需像素越少
+    narrow, _ = _plan(4)
+    assert LayoutCalculator.required_pixel_size(narrow, 300)[0] < width
+
+
+def test_export_dpi_matches_layout(monkeypatch):
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_path", lambda path: {"Pages": 8, "Page size": "720 x 405 pts"})
+    stream = PDFSlideStream("deck.pdf", dpi=200)
+
+    dpis = {}
+    for columns in (2, 4):
+        plan, config = _plan(columns)
+        dpi = export_dpi(stream, plan, config)
+        target_width, _ = LayoutCalculator.required_pixel_size(plan, 300)
+        # 栅格化宽度刚好不小于打印所需的宽度
+        assert stream.size_at(dpi)[0] >= target_width
+        assert stream.size_at(dpi - 1)[0] < target_width
+        dpis[columns] = dpi
+    assert dpis[4] < dpis[2]
+
+    # 普通图像列表分辨率未知，按原尺寸使用
+    plan, config = _plan(2)
+    assert export_dpi([Image.new("RGB", (160, 90))], plan, config) is None
+
+
+@pytest.mark.parametrize("columns", [2, 4])
+def test_exported_images_use_target_resolution(tmp_path, columns):
+    # 200dpi 的幻灯片，导出时缩小到布局所需的分辨率
+    collection = SlideCollection(str(tmp_path / "spill"), page_size_pts=PAGE_SIZE_PTS)
+    for index in range(4):
+        collection.add_image(Image.new("RGB", (2000, 1125), (index * 50, 80, 160)))
+    plan, config = _plan(columns, count=4)
+    config.update(show_ppt_numbers=False, show_page_numbers=False)
+    output_path = str(tmp_path / "out.pdf")
+
+    processor = PPTProcessor()
+    processor.encode_workers = 1
+    try:
+        assert processor.generate_pdf(collection, output_path, plan, config)
+    finally:
+        processor.cleanup_temp_files()
+
+    target_width, _ = LayoutCalculator.required_pixel_size(plan, config["print_dpi"])
+    widths = {ref.get_object()["/Width"]
+              for page in PdfReader(output_path).pages
+              for ref in page["/Resources"]["/XObject"].values()}
+    assert len(widths) == 1
+    (width,) = widths
+    assert target_width <= width < 2000
+    assert width == round(2000 * export_dpi(collection, plan, config) / 200)
@@ -0,0 +1,78 @@
+from PIL import Image
+from PyPDF2 import PdfReader
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from src.utils.layout_calculator import LayoutCalculator, DEFAULT_LAYOUT_CONFIG
+from src.utils.ppt_processor import PPTProcessor
+
+SLIDE_SIZE = (10 * inch, 5.625 * inch)
+
+
+def _make_source_pdf(path, pages):
+    c = canvas.Canvas(str(path), pagesize=SLIDE_SIZE)
+    for index in range(pages):
+        c.setFont("Helvetica", 36)
+        c.drawString(72, 200, f"Slide {index + 1}")
+        c.rect(36, 36, 200, 100, fill=1)
+        c.showPage()
+    c.save()
+
+
+def test_vector_export_keeps_form_dictionaries(tmp_path):
+    source = tmp_path / "source.pdf"
+    output = tmp_path / "vector.pdf"
+    _make_source_pdf(source, 7)
+
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    slides = [Image.new("RGB", (160, 90)) for _ in range(7)]
+    plan = LayoutCalculator().plan(slides, config)
+
+    processor = PPTProcessor()
+    try:
+        assert processor.generate_vector_pdf(str(source), str(output), plan, config)
+    finally:
+        processor.cleanup_temp_files()
+
+    reader = PdfReader(str(output))
+    assert len(reader.pages) == plan["pages_needed"]
+    placed = 0
+    for page in reader.pages:
+        xobjects = page["/Resources"]["/XObject"]
+        for name, ref in xobjects.items():
+            if not name.startswith("/Slide"):
+                continue
+            form = ref.get_object()
+            assert form["/Subtype"] == "/Form"
+            assert len(form["/BBox"]) == 4
+            assert "/Font" in form["/Resources"]
+            assert b"Slide" in form.get_data()
+            placed += 1
+    assert placed == 7
+
+
+def test_page_numbers_stay_searchable(tmp_path, monkeypatch):
+    import os
+
+    import reportlab
+    from src.utils import font_registry
+
+    monkeypatch.setattr(font_registry, "BUNDLED_FONT_PATH",
+                        os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf"))
+    monkeypatch.setattr(font_registry, "_default_registry", font_registry.FontRegistry())
+
+    source = tmp_path / "source.pdf"
+    output = tmp_path / "vector.pdf"
+    _make_source_pdf(source, 3)
+    config = dict(DEFAULT_LAYOUT_CONFIG)
+    plan = LayoutCalculator().plan([Image.new("RGB", (160, 90)) for _ in range(3)], config)
+
+    processor = PPTProcessor()
+    try:
+        assert processor.generate_vector_pdf(str(source), str(output), plan, config)
+    finally:
+        processor.cleanup_temp_files()
+
+    text = PdfReader(str(output)).pages[0].extract_text()
+    assert "第 1 页" in text
+    assert plan.labels[0] in text